@@ -0,0 +1,136 @@
+import asyncio, base64, hmac, hashlib, json
+import aiohttp # type: ignore
+from urllib.parse import urlencode
+from typing import Any, Iterable
+from datetime import datetime, timedelta, timezone
+from api.data import OkxApiData, OrderDataOutput
+from api.throttle import okx_error
+from configs.provider import ConfigsProvider
+from metrics.methods import span
+
+
+OKX_URL = 'https://www.okx.com'
+
+
+class AsyncOkxApi:
+    def __init__(self, base_url:str=OKX_URL, max_connections:int=100):
+        settings = ConfigsProvider()
+        self.api_settings = settings.load_api_okx_configs()
+        self.user_settings = settings.load_user_settings()
+        self.base_url = base_url
+        self.max_connections = max_connections
+        self.session: aiohttp.ClientSession|None = None
+
+    async def __aenter__(self) -> 'AsyncOkxApi':
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info:Any) -> None:
+        await self.close()
+
+    async def open(self) -> None:
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                base_url=self.base_url,
+                connector=aiohttp.TCPConnector(limit=self.max_connections, ttl_dns_cache=300)
+            )
+
+    async def close(self) -> None:
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def __check_result(self, result:dict) -> dict[str, Any]:
+        if result['code'] != '0':
+            raise okx_error(result)
+        return result
+
+    def __check_pos_side(self, data:OkxApiData) -> str:
+        if data.posSide == 'long':
+            return 'sell'
+        if data.posSide == 'short':
+            return 'buy'
+        raise ValueError(f'Invalid posSide: {data.posSide}')
+
+    def __sign_headers(self, method:str, path:str, body:str) -> dict[str, str]:
+        timestamp = datetime.now(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+        message = f'{timestamp}{method}{path}{body}'.encode()
+        signature = hmac.new(self.api_settings.secret_key.encode(), message, hashlib.sha256).digest()
+        return {
+            'OK-ACCESS-KEY': self.api_settings.api_key,
+            'OK-ACCESS-SIGN': base64.b64encode(signature).decode(),
+            'OK-ACCESS-TIMESTAMP': timestamp,
+            'OK-ACCESS-PASSPHRASE': self.api_settings.passphrase
+        }
+
+    async def __request(self, method:str, path:str, params:dict[str, Any]|None=None,
+                        body:dict[str, Any]|None=None, private:bool=False) -> dict[str, Any]:
+        await self.open()
+        query = urlencode({key: value for key, value in (params or {}).items() if value is not None})
+        path = f'{path}?{query}' if query else path
+        payload = json.dumps(body) if body is not None else ''
+        headers = {'Content-Type': 'application/json'}
+        if self.api_settings.flag in ('1', True):
+            headers['x-simulated-trading'] = '1'
+        if private:
+            headers.update(self.__sign_headers(method, path, payload))
+        with span('okx_api_async', method=method, path=path.split('?', 1)[0]):
+            async with self.session.request(method, path, data=payload or None, headers=headers) as response: #type: ignore
+                return self.__check_result(await response.json(content_type=None))
+
+    async def get_market_data(self, data:OkxApiData) -> dict:
+        return await self.__request('GET', '/api/v5/market/candles', {
+            'instId': data.instId, 'bar': data.timeframe, 'after': data.after,
+            'before': data.before, 'limit': data.lengths
+        })
+
+    async def get_market_data_history(self, data:OkxApiData) -> dict:
+        return await self.__request('GET', '/api/v5/market/history-candles', {
+            'instId': data.instId, 'bar': data.timeframe, 'after': data.after,
+            'before': data.before, 'limit': data.lengths
+        })
+
+    async def check_instrument_price(self, data:OkxApiData) -> float:
+        result = await self.__request('GET', '/api/v5/market/ticker', {'instId': data.instId})
+        return float(result['data'][0]['last'])
+
+    async def check_balance(self) -> float:
+        result = await self.__request('GET', '/api/v5/account/balance', private=True)
+        return float(result["data"][0]["details"][0]["availBal"])
+
+    async def construct_market_order(self, data:OkxApiData) -> OrderDataOutput:
+        return await self.__place_order(data, {'ordType': 'market'})
+
+    async def construct_limit_order(self, data:OkxApiData, price:float) -> OrderDataOutput:
+        return await self.__place_order(data, {'ordType': 'limit', 'px': str(price)})
+
+    async def __place_order(self, data:OkxApiData, order:dict[str, str]) -> OrderDataOutput:
+        result = await self.__request('POST', '/api/v5/trade/order', body={
+            'instId': data.instId,
+            'tdMode': self.user_settings.mgnMode,
+            'side': self.__check_pos_side(data),
+            'posSide': data.posSide,
+            'sz': str(data.size),
+            **order
+        }, private=True)
+        return OrderDataOutput(
+            result = result,
+            orderId = result['data'][0]['ordId'],
+            outTime = datetime.fromtimestamp(int(result['outTime'])/1000000) + timedelta(hours=3)
+        )
+
+    async def check_position(self, data:OkxApiData, ordId:str) -> float:
+        result = await self.__request('GET', '/api/v5/trade/order', {'instId': data.instId, 'ordId': ordId}, private=True)
+        return float(result["data"][0]["avgPx"])
+
+    async def get_all_order_list(self) -> dict:
+        return await self.__request('GET', '/api/v5/trade/orders-pending', private=True)
+
+    async def gather_market_data(self, requests:Iterable[OkxApiData], history:bool=False) -> list[dict|BaseException]:
+        method = self.get_market_data_history if history else self.get_market_data
+        return await asyncio.gather(*(method(data) for data in requests), return_exceptions=True)
+
+    async def gather_instrument_prices(self, instIds:Iterable[str]) -> dict[str, float]:
+        instIds = list(instIds)
+        prices = await asyncio.gather(*(self.check_instrument_price(OkxApiData(instId=instId)) for instId in instIds))
+        return dict(zip(instIds, prices))
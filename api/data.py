@@ -1,25 +1,41 @@
-from pydantic import BaseModel # type: ignore
+from pydantic import BaseModel, ConfigDict # type: ignore
 from datetime import datetime
 import pandas as pd
 from typing import Optional
 
 
 class OkxApiData(BaseModel):
-    instId = Optional[str]
-    timeframe = Optional[str]
-    lengths = Optional[int]
-    before = Optional[str]
-    after = Optional[str]
-    posSide = Optional[str]
-    slPrice = Optional[int|float]
-    tpPrice = Optional[int|float]
-    size = Optional[int]
-    key = Optional[str]
-    channel = Optional[str]
-    data = Optional[pd.DataFrame]
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+    instId: Optional[str] = None
+    timeframe: Optional[str] = None
+    lengths: Optional[int] = None
+    before: Optional[str] = None
+    after: Optional[str] = None
+    posSide: Optional[str] = None
+    slPrice: Optional[int|float] = None
+    tpPrice: Optional[int|float] = None
+    size: Optional[int|float] = None
+    key: Optional[str] = None
+    channel: Optional[str] = None
+    data: Optional[pd.DataFrame] = None
 
 
 class OrderDataOutput(BaseModel):
-    result = dict
-    orderId = str|int
-    outTime = datetime
\ No newline at end of file
+    result: dict
+    orderId: str|int
+    outTime: datetime
+
+# Длительность бара OKX в миллисекундах
+TIMEFRAME_MS = {
+    '1m': 60_000, '3m': 180_000, '5m': 300_000, '15m': 900_000, '30m': 1_800_000,
+    '1H': 3_600_000, '2H': 7_200_000, '4H': 14_400_000, '6H': 21_600_000, '12H': 43_200_000,
+    '1D': 86_400_000, '1W': 604_800_000
+}
+
+
+class InstrumentSpec(BaseModel):
+    instId: str
+    ctVal: float
+    tickSz: float
+    lotSz: float
+    minSz: float
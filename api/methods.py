@@ -1,11 +1,80 @@
+import logging, threading, time
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, Future
 from datetime import datetime
+from typing import Any
 from api.okx_api import OkxApi
 from api.data import OkxApiData, OrderDataOutput 
 from datasets.methods import PriceDbMethods
 from datasets.data import InstrumentTimeframeOrderData
 
 
+# Общий пул для параллельных запросов TP/SL и записи в БД вне критического пути
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='orders')
+
+logger = logging.getLogger(__name__)
+
+
+def _log_save_failure(future:Future) -> None:
+    # Запись ордера идёт в фоне: её ошибка иначе осталась бы в db_future незамеченной
+    error = future.exception()
+    if error is not None:
+        logger.error('Failed to save order data', exc_info=error)
+
+
+class OrderContext:
+    # Прогретое состояние для быстрого выставления ордеров: баланс обновляется в фоне,
+    # режим позиций и плечо выставляются один раз на процесс/инструмент
+    def __init__(self, api:OkxApi, refresh_interval:float=5.0):
+        self.api = api
+        self.refresh_interval = refresh_interval
+        self.balance:float|None = None
+        self.balance_time = 0.0
+        self.leveraged:set[str] = set()
+        self.lock = threading.Lock()
+        self.__stop = threading.Event()
+        self.__thread:threading.Thread|None = None
+
+    def start(self) -> None:
+        self.api.set_trading_mode()
+        self.refresh_balance()
+        if self.__thread is None:
+            self.__stop.clear()
+            self.__thread = threading.Thread(target=self.__run, name='order-context', daemon=True)
+            self.__thread.start()
+
+    def stop(self) -> None:
+        self.__stop.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+    def __run(self) -> None:
+        while not self.__stop.wait(self.refresh_interval):
+            try:
+                self.refresh_balance()
+            except Exception:
+                # Оставляем последнее известное значение, следующая попытка через refresh_interval
+                continue
+
+    def refresh_balance(self) -> float:
+        balance = self.api.check_balance()
+        with self.lock:
+            self.balance, self.balance_time = balance, time.monotonic()
+        return balance
+
+    def get_balance(self) -> float:
+        return self.balance if self.balance is not None else self.refresh_balance()
+
+    def ensure_leverage(self, order:OkxApi) -> int:
+        instId = order.configs.instId
+        if instId not in self.leveraged:
+            order.set_leverage_inst()
+            with self.lock:
+                self.leveraged.add(instId)
+        return order.user_settings.leverage
+
+
 class PlaceOrders(OkxApi):    
     def __init__(self, configs:OkxApiData):
         super().__init__(configs)
@@ -15,7 +84,7 @@ class PlaceOrders(OkxApi):
         orderType = 'market'
         balance = self.check_balance()
         contract_price = self.check_contract_price_cache(self.configs)
-        size = self.calculate_posSize(contract_price)
+        size = self.calculate_posSize(contract_price, balance)
         result:OrderDataOutput = self.construct_market_order(self.configs.posSide)
         enter_price = self.check_position(result.orderId)
         data = InstrumentTimeframeOrderData(
@@ -34,7 +103,8 @@ class PlaceOrders(OkxApi):
             tpOrderId = None if self.configs.tpPrice is None else self.construct_takeprofit_order(),
             tpPrice = self.configs.tpPrice,
             slOrderId = None if self.configs.slPrice is None else self.construct_stoploss_order(),
-            slPrice = self.configs.slPrice
+            slPrice = self.configs.slPrice,
+            contractValue = contract_price
         )
         PriceDbMethods().save_new_order_data(data)
         return str(result['order_id'])
@@ -43,7 +113,7 @@ class PlaceOrders(OkxApi):
         orderType = 'market'
         balance = self.check_balance()
         contract_price = self.check_contract_price_cache(self.configs)
-        size = self.calculate_posSize(contract_price)
+        size = self.calculate_posSize(contract_price, balance)
         result:OrderDataOutput = self.construct_limit_order(price)
         data = InstrumentTimeframeOrderData(
             orderId = result.orderId,
@@ -61,7 +131,82 @@ class PlaceOrders(OkxApi):
             tpOrderId = None if self.configs.tpPrice is None else self.construct_takeprofit_order(),
             tpPrice = self.configs.tpPrice,
             slOrderId = None if self.configs.slPrice is None else self.construct_stoploss_order(),
-            slPrice = self.configs.slPrice
+            slPrice = self.configs.slPrice,
+            contractValue = contract_price
         )
         PriceDbMethods().save_new_order_data(data)
-        return str(result['order_id'])
\ No newline at end of file
+        return str(result['order_id'])
+
+class FastPlaceOrders(PlaceOrders):
+    # Быстрый путь: баланс и плечо из OrderContext, TP/SL и цена входа запрашиваются параллельно,
+    # запись в БД уходит в фон. Длительность каждого этапа (мс) сохраняется в self.timings
+    def __init__(self, configs:OkxApiData, context:OrderContext):
+        super().__init__(configs)
+        self.context = context
+        self.timings:dict[str, float] = {}
+        self.db_future:Future|None = None
+
+    def place_market_order(self, tick_time:float|None=None) -> str:
+        start = tick_time if tick_time is not None else time.perf_counter()
+        self.timings = {}
+        mark = time.perf_counter()
+        balance = self.context.get_balance()
+        contract_price = self.check_contract_price_cache(self.configs)
+        size = self.calculate_posSize(contract_price, balance)
+        self.configs.size = size
+        leverage = self.context.ensure_leverage(self)
+        mark = self.__stage('prepare', mark)
+        result:OrderDataOutput = self.construct_market_order(self.configs.posSide)
+        mark = self.__stage('entry', mark)
+        self.timings['tick_to_ack'] = (mark - start) * 1000
+        futures = {'enterPrice': _executor.submit(self.check_position, result.orderId)}
+        if self.configs.tpPrice is not None:
+            futures['tpOrderId'] = _executor.submit(self.construct_takeprofit_order)
+        if self.configs.slPrice is not None:
+            futures['slOrderId'] = _executor.submit(self.construct_stoploss_order)
+        # Вход уже исполнен: позиция сохраняется даже при сбое TP/SL или запроса цены входа,
+        # ошибки записываются в history_of_trade и пробрасываются после постановки записи в БД
+        values, errors = self.__collect(futures)
+        data = InstrumentTimeframeOrderData(
+            orderId = result.orderId,
+            orderType = 'market',
+            status = True,
+            orderVolume = size,
+            tpOrderVolume = size,
+            slOrderVolume = size,
+            balance = balance,
+            instId = self.configs.instId,
+            leverage = leverage,
+            sideOfTrade = self.configs.posSide,
+            enterPrice = values.get('enterPrice'),
+            time = datetime.now(),
+            tpOrderId = values.get('tpOrderId'),
+            tpPrice = self.configs.tpPrice,
+            slOrderId = values.get('slOrderId'),
+            slPrice = self.configs.slPrice,
+            contractValue = contract_price,
+            history_of_trade = {'errors': {name: repr(e) for name, e in errors.items()}} if errors else None
+        )
+        mark = self.__stage('tp_sl', mark)
+        self.db_future = _executor.submit(PriceDbMethods().save_new_order_data, data)
+        self.db_future.add_done_callback(_log_save_failure)
+        _executor.submit(self.context.refresh_balance)
+        self.timings['total'] = (mark - start) * 1000
+        if errors:
+            raise next(iter(errors.values()))
+        return str(result.orderId)
+
+    def __collect(self, futures:dict[str, Future]) -> tuple[dict[str, Any], dict[str, Exception]]:
+        values:dict[str, Any] = {}
+        errors:dict[str, Exception] = {}
+        for name, future in futures.items():
+            try:
+                values[name] = future.result()
+            except Exception as e:
+                errors[name] = e
+        return values, errors
+
+    def __stage(self, name:str, mark:float) -> float:
+        now = time.perf_counter()
+        self.timings[name] = (now - mark) * 1000
+        return now
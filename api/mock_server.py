@@ -0,0 +1,222 @@
+import asyncio, itertools, json, math
+from aiohttp import web # type: ignore
+from typing import Any
+from api.data import TIMEFRAME_MS
+
+
+class OkxMockServer:
+    # Локальная подмена REST API OKX для офлайн-проверки клиентов: детерминированные свечи,
+    # тикер, баланс и ордера
+    def __init__(self, host:str='127.0.0.1', port:int=0, latency:float=0.0, now_ms:int=1_700_000_000_000):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.now_ms = now_ms
+        self.orders: dict[str, dict[str, Any]] = {}
+        self.requests = 0
+        self.__order_ids = itertools.count(1)
+        self.__runner: web.AppRunner|None = None
+
+    @property
+    def url(self) -> str:
+        return f'http://{self.host}:{self.port}'
+
+    async def start(self) -> str:
+        app = web.Application(middlewares=[self.__middleware])
+        app.router.add_get('/api/v5/market/candles', self.__candles)
+        app.router.add_get('/api/v5/market/history-candles', self.__candles)
+        app.router.add_get('/api/v5/market/ticker', self.__ticker)
+        app.router.add_get('/api/v5/account/balance', self.__balance)
+        app.router.add_post('/api/v5/trade/order', self.__place_order)
+        app.router.add_get('/api/v5/trade/order', self.__get_order)
+        app.router.add_get('/api/v5/trade/orders-pending', self.__orders_pending)
+        self.__runner = web.AppRunner(app)
+        await self.__runner.setup()
+        site = web.TCPSite(self.__runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1] #type: ignore
+        return self.url
+
+    async def stop(self) -> None:
+        if self.__runner is not None:
+            await self.__runner.cleanup()
+            self.__runner = None
+
+    async def __aenter__(self) -> 'OkxMockServer':
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info:Any) -> None:
+        await self.stop()
+
+    @web.middleware
+    async def __middleware(self, request:web.Request, handler:Any) -> web.StreamResponse:
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return await handler(request)
+
+    def price(self, instId:str, ts:int) -> float:
+        base = 100 + sum(map(ord, instId)) % 100
+        return round(base + 5 * math.sin(ts / 3_600_000), 4)
+
+    def candles(self, instId:str, bar:str, after:int|None, before:int|None, limit:int) -> list[list[str]]:
+        step = TIMEFRAME_MS[bar]
+        last = self.now_ms // step * step
+        ts = min(last, (after - 1) // step * step) if after else last
+        rows = []
+        while len(rows) < limit and (before is None or ts > before) and ts >= 0:
+            _open, close = self.price(instId, ts), self.price(instId, ts + step)
+            rows.append([
+                str(ts), str(_open), str(max(_open, close) + 0.1), str(min(_open, close) - 0.1), str(close),
+                '10', '1', str(round(10 * close, 4)), '1' if ts < last else '0'
+            ])
+            ts -= step
+        return rows
+
+    def __response(self, data:list[Any]) -> web.Response:
+        return web.json_response({'code': '0', 'msg': '', 'data': data, 'outTime': str(self.now_ms * 1000)})
+
+    async def __candles(self, request:web.Request) -> web.Response:
+        query = request.query
+        return self.__response(self.candles(
+            query['instId'], query.get('bar', '1m'),
+            int(query['after']) if 'after' in query else None,
+            int(query['before']) if 'before' in query else None,
+            min(int(query.get('limit', 100)), 300)
+        ))
+
+    async def __ticker(self, request:web.Request) -> web.Response:
+        instId = request.query['instId']
+        return self.__response([{'instId': instId, 'last': str(self.price(instId, self.now_ms)), 'ts': str(self.now_ms)}])
+
+    async def __balance(self, request:web.Request) -> web.Response:
+        return self.__response([{'details': [{'ccy': 'USDT', 'availBal': '1000'}]}])
+
+    async def __place_order(self, request:web.Request) -> web.Response:
+        body = json.loads(await request.text())
+        ordId = str(next(self.__order_ids))
+        self.orders[ordId] = {**body, 'ordId': ordId, 'avgPx': str(self.price(body['instId'], self.now_ms))}
+        return self.__response([{'ordId': ordId, 'sCode': '0'}])
+
+    async def __get_order(self, request:web.Request) -> web.Response:
+        order = self.orders.get(request.query.get('ordId', ''))
+        if order is None:
+            return web.json_response({'code': '51603', 'msg': 'Order does not exist', 'data': []})
+        return self.__response([order])
+
+    async def __orders_pending(self, request:web.Request) -> web.Response:
+        return self.__response(list(self.orders.values()))
+
+
+class OkxWsReplayServer:
+    # Локальная подмена WebSocket API OKX: после подписки отдаёт записанные кадры (по одному
+    # JSON-сообщению на строку файла) для подписанных каналов. drop_after закрывает первое
+    # соединение после указанного числа кадров, чтобы проверить переподключение клиента
+    def __init__(self, frames:list[dict[str, Any]], host:str='127.0.0.1', port:int=0,
+                 interval:float=0.0, drop_after:int|None=None):
+        self.frames = frames
+        self.host = host
+        self.port = port
+        self.interval = interval
+        self.drop_after = drop_after
+        self.connections = 0
+        self.subscriptions: list[dict[str, str]] = []
+        self.__sent: set[int] = set()
+        self.__runner: web.AppRunner|None = None
+
+    @classmethod
+    def from_file(cls, path:str, **kwargs:Any) -> 'OkxWsReplayServer':
+        with open(path) as file:
+            return cls([json.loads(line) for line in file if line.strip()], **kwargs)
+
+    @staticmethod
+    def record(path:str, frames:list[dict[str, Any]]) -> None:
+        with open(path, 'w') as file:
+            file.writelines(json.dumps(frame) + '\n' for frame in frames)
+
+    @staticmethod
+    def candle_frames(server:OkxMockServer, instId:str, bar:str, count:int) -> list[dict[str, Any]]:
+        # Кадры канала candle{bar}: незакрытое обновление и закрытие для каждой из count свечей
+        frames = []
+        for row in reversed(server.candles(instId, bar, None, None, count + 1)[1:]):
+            arg = {'channel': f'candle{bar}', 'instId': instId}
+            frames.append({'arg': arg, 'data': [row[:8] + ['0']]})
+            frames.append({'arg': arg, 'data': [row[:8] + ['1']]})
+        return frames
+
+    @property
+    def url(self) -> str:
+        return f'ws://{self.host}:{self.port}/ws/v5'
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_get('/ws/v5/{kind}', self.__websocket)
+        self.__runner = web.AppRunner(app)
+        await self.__runner.setup()
+        site = web.TCPSite(self.__runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1] #type: ignore
+        return self.url
+
+    async def stop(self) -> None:
+        if self.__runner is not None:
+            await self.__runner.cleanup()
+            self.__runner = None
+
+    async def __aenter__(self) -> 'OkxWsReplayServer':
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info:Any) -> None:
+        await self.stop()
+
+    async def __websocket(self, request:web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.connections += 1
+        drop = self.drop_after if self.connections == 1 else None
+        replay: asyncio.Task|None = None
+        async for message in ws:
+            if message.type != web.WSMsgType.TEXT:
+                break
+            if message.data == 'ping':
+                await ws.send_str('pong')
+                continue
+            body = json.loads(message.data)
+            if body.get('op') != 'subscribe':
+                await ws.send_json({'event': 'error', 'code': '60012', 'msg': f'Invalid request: {message.data}'})
+                continue
+            for arg in body['args']:
+                self.subscriptions.append(arg)
+                await ws.send_json({'event': 'subscribe', 'arg': arg, 'connId': str(self.connections)})
+            if replay is None:
+                replay = asyncio.create_task(self.__replay(ws, body['args'], drop))
+        if replay is not None:
+            replay.cancel()
+        return ws
+
+    async def __replay(self, ws:web.WebSocketResponse, args:list[dict[str, str]], drop:int|None) -> None:
+        # Кадры, отправленные до обрыва, повторно не отдаются - как у биржи после переподключения
+        sent = 0
+        for index, frame in enumerate(self.frames):
+            if index in self.__sent or frame['arg'] not in args:
+                continue
+            if drop is not None and sent >= drop:
+                await ws.close()
+                return
+            if self.interval:
+                await asyncio.sleep(self.interval)
+            await ws.send_json(frame)
+            self.__sent.add(index)
+            sent += 1
+
+
+async def serve_forever(port:int=8081) -> None:
+    async with OkxMockServer(port=port) as server:
+        print(f'OKX mock server on {server.url}')
+        await asyncio.Event().wait()
+
+
+if __name__ == '__main__':
+    asyncio.run(serve_forever())
@@ -1,14 +1,21 @@
-from typing import Any
+from typing import Any, Callable, Iterable
 import okx.Account as Account # type: ignore
 import okx.MarketData as MarketData # type: ignore
 import okx.Trade as Trade # type: ignore
 from datetime import datetime, timedelta
-from api.data import OkxApiData, OrderDataOutput
+from api.data import OkxApiData, OrderDataOutput, InstrumentSpec
 from configs.provider import ConfigsProvider
 from cache.redis_cache import RedisCache
+from cache.instrument_specs import InstrumentSpecStore
+from cache.price_snapshot import PriceSnapshotCache
+from api.throttle import RequestThrottle, okx_error
+from metrics.methods import timed
 
 
 class OkxApi:
+    # Общий на процесс: лимиты и объединение запросов действуют для всех экземпляров (стратегий)
+    _throttle = RequestThrottle()
+
     def __init__(self, configs:OkxApiData):
         settings = ConfigsProvider()
         self.api_settings = settings.load_api_okx_configs()
@@ -16,6 +23,9 @@ class OkxApi:
         self.key = 'contracts_prices'
         self.configs = configs
         self.cache = RedisCache(configs)
+        self.specs = InstrumentSpecStore(self.cache)
+        system_settings = settings.load_system_settings()
+        self.prices = PriceSnapshotCache(self.cache, system_settings.price_cache_ttl, system_settings.price_max_staleness)
         self.marketDataAPI:MarketData.MarketAPI = self.__create_marketAPI()
         self.accountAPI:Account.AccountAPI = self.__create_accountAPI()
         self.tradeAPI:Trade.TradeAPI = self.__create_trade_api()
@@ -44,9 +54,15 @@ class OkxApi:
 
     def __check_result(self, result:dict) -> dict[str, Any]:
         if result['code'] != '0':
-            raise ValueError(f'Error, code: {result['code']}')
+            raise okx_error(result)
         return result
 
+    def __call(self, family:str, func:Callable[..., dict], *args:Any, coalesce:bool=False, **kwargs:Any) -> dict[str, Any]:
+        # coalesce - только для читающих запросов: одинаковые одновременные вызовы получают один ответ
+        key = (family, self.api_settings.api_key, self.api_settings.flag, args, tuple(sorted(kwargs.items()))) \
+            if coalesce else None
+        return OkxApi._throttle.call(family, lambda: self.__check_result(func(*args, **kwargs)), key)
+
     def __check_pos_side(self):
         if self.configs.posSide == 'long':
                     side = 'sell'
@@ -54,79 +70,115 @@ class OkxApi:
                     side = 'buy'
         return side
 
+    @timed('okx_api')
     def get_market_data(self, data:OkxApiData) -> dict:
-        result = self.marketDataAPI.get_candlesticks(
+        return self.__call(
+                'market_candles', self.marketDataAPI.get_candlesticks,
                 instId=self.configs.instId,
                 after=data.after,
                 before=data.before,
                 bar=self.configs.timeframe,
-                limit=data.lengths
+                limit=data.lengths,
+                coalesce=True
             )
-        return self.__check_result(result)
 
+    @timed('okx_api')
     def get_market_data_history(self, data:OkxApiData) -> dict:
-        result = self.marketDataAPI.get_history_candlesticks(
+        return self.__call(
+                'market_history_candles', self.marketDataAPI.get_history_candlesticks,
                 instId=self.configs.instId,
                 after=data.after,
                 before=data.before,
                 bar=self.configs.timeframe,
-                limit=data.lengths
+                limit=data.lengths,
+                coalesce=True
             )
-        return self.__check_result(result)
 
+    @timed('okx_api')
     def check_balance(self) -> float:
-        result = self.accountAPI.get_account_balance()
-        self.__check_result(result)
+        result = self.__call('account_balance', self.accountAPI.get_account_balance, coalesce=True)
         return float(result["data"][0]["details"][0]["availBal"])
 
+    @timed('okx_api')
     def set_leverage_inst(self) -> int:
-        result = self.accountAPI.set_leverage(
+        self.__call(
+            'account_set_leverage', self.accountAPI.set_leverage,
             instId=self.configs.instId,
             lever=self.user_settings.leverage,
             mgnMode=self.user_settings.mgnMode
         )
-        result = self.__check_result(result)
         return self.user_settings.leverage
 
+    @timed('okx_api')
     def set_leverage_short_long(self, data:OkxApiData) -> None:
-        result = self.accountAPI.set_leverage(
+        self.__call(
+            'account_set_leverage', self.accountAPI.set_leverage,
             instId = self.configs.instId,
             lever = self.user_settings.leverage,
             posSide = data.posSide,
             mgnMode = self.user_settings.mgnMode
         )
-        result = self.__check_result(result)
 
+    @timed('okx_api')
     def set_trading_mode(self) -> None:
-        result = self.accountAPI.set_position_mode(
+        self.__call(
+            'account_position_mode', self.accountAPI.set_position_mode,
             posMode="long_short_mode"
         )
-        result = self.__check_result(result)
 
-    def check_contract_price(self) -> None:
-        result = self.accountAPI.get_instruments(instType="SWAP")
-        result = self.__check_result(result)
-        if self.key:
-            self.cache.send_redis_command(result, self.key)
-        raise ValueError('Key is not setted')
+    @timed('okx_api')
+    def check_contract_price(self) -> dict:
+        result = self.__fetch_instruments()
+        self.specs.refresh(result)
+        return result
 
     def check_contract_price_cache(self, data: OkxApiData) -> float:
-        result = self.cache.load_message_from_cache()
-        if result is None:
-            raise ValueError("No data found in cache")
-        try:
-            return float(next(instrument['ctVal'] for instrument in result['data'] if instrument['instId'] == data.instId))
-        except (StopIteration, KeyError, TypeError) as e:
-            raise ValueError("Instrument ID not found or invalid data format") from e
+        return self.get_instrument_spec(data.instId).ctVal
+
+    def get_instrument_spec(self, instId:str) -> InstrumentSpec:
+        # Без запущенного обновления спецификации загружаются при первом промахе
+        return self.specs.get(instId, self.__fetch_instruments)
+
+    def start_instrument_specs_refresher(self, interval:float=3600.0) -> None:
+        self.specs.start_refresher(self.__fetch_instruments, interval)
 
+    def __fetch_instruments(self) -> dict[str, Any]:
+        return self.__call('account_instruments', self.accountAPI.get_instruments, instType="SWAP", coalesce=True)
 
-    def check_instrument_price(self, data:OkxApiData) -> float:
-        result = self.marketDataAPI.get_ticker(data.instId)
-        self.__check_result(result)
-        return float(result['data'][0]['last'])
+    @timed('okx_api')
+    def check_instrument_price(self, data:OkxApiData, max_staleness:float|None=None) -> float:
+        # max_staleness - допустимый возраст цены в секундах (None - из настроек, 0 - всегда REST)
+        price = self.prices.get(data.instId, max_staleness)
+        return price if price is not None else self.__fetch_ticker(data.instId)
 
+    @timed('okx_api')
+    def check_instrument_prices(self, instIds:Iterable[str], max_staleness:float|None=None,
+                                instType:str='SWAP') -> dict[str, float]:
+        # Промахи кэша закрываются одним запросом tickers по всему instType вместо запроса на инструмент
+        instIds = list(dict.fromkeys(instIds))
+        prices = self.prices.get_many(instIds, max_staleness)
+        missing = {instId: None for instId in instIds if instId not in prices}
+        if len(missing) > 1:
+            tickers = self.__call('market_tickers', self.marketDataAPI.get_tickers, instType=instType, coalesce=True)
+            prices.update({instId: price for instId, price in self.__store_tickers(tickers['data']).items() if instId in missing})
+        for instId in missing:
+            if instId not in prices:
+                prices[instId] = self.__fetch_ticker(instId)
+        return {instId: prices[instId] for instId in instIds}
+
+    def __fetch_ticker(self, instId:str) -> float:
+        result = self.__call('market_ticker', self.marketDataAPI.get_ticker, instId, coalesce=True)
+        return self.__store_tickers(result['data'])[instId]
+
+    def __store_tickers(self, tickers:list[dict[str, str]]) -> dict[str, float]:
+        snapshots = {item['instId']: (float(item['last']), int(item['ts'])) for item in tickers}
+        self.prices.put_many(snapshots)
+        return {instId: price for instId, (price, ts) in snapshots.items()}
+
+    @timed('okx_api')
     def construct_market_order(self, side:str) -> OrderDataOutput:
-        result = self.tradeAPI.place_order(
+        result = self.__call(
+            'trade_order', self.tradeAPI.place_order,
             instId = self.configs.instId,
             tdMode = self.user_settings.mgnMode,
             side = self.__check_pos_side(),
@@ -134,7 +186,6 @@ class OkxApi:
             ordType = 'market',
             sz = str(self.configs.size)
         )
-        self.__check_result(result)
         return OrderDataOutput(
             result = result,
             orderId = result['data'][0]['ordId'], 
@@ -142,8 +193,10 @@ class OkxApi:
         )
 
 
+    @timed('okx_api')
     def construct_stoploss_order(self) -> str:
-        result = self.tradeAPI.place_algo_order(
+        result = self.__call(
+            'trade_algo_order', self.tradeAPI.place_algo_order,
             instId = self.configs.instId,
             tdMode = self.user_settings.mgnMode,
             side = self.__check_pos_side(),
@@ -154,20 +207,22 @@ class OkxApi:
             slOrdPx = '-1',
             slTriggerPxType = 'last'
         )
-        self.__check_result(result)
         return result['data'][0]['ordId']
 
+    @timed('okx_api')
     def change_stoploss_order(self, slPrice:float, orderId:str) -> None:
-        result = self.tradeAPI.amend_algo_order(
+        result = self.__call(
+            'trade_amend_algo', self.tradeAPI.amend_algo_order,
             instId=self.configs.instId,
             algoId=orderId,
             newSlTriggerPx=str(slPrice)
         )
-        self.__check_result(result)
         return result
 
+    @timed('okx_api')
     def construct_takeprofit_order(self) -> str:
-        result = self.tradeAPI.place_algo_order(
+        result = self.__call(
+            'trade_algo_order', self.tradeAPI.place_algo_order,
             instId = self.configs.instId,
             tdMode = self.user_settings.mgnMode,
             side = self.__check_pos_side(),
@@ -178,21 +233,23 @@ class OkxApi:
             tpOrdPx = '-1',
             tpTriggerPxType = 'last'
         )
-        self.__check_result(result)
         return result['data'][0]['ordId']
 
+    @timed('okx_api')
     def change_takeprofit_order(self, tpPrice:float, orderId:str):
-        result = self.tradeAPI.amend_algo_order(
+        result = self.__call(
+            'trade_amend_algo', self.tradeAPI.amend_algo_order,
             instId = self.configs.instId,
             algoId = orderId,
             newTpTriggerPx = str(tpPrice)
         )
-        self.__check_result(result)
         return result
 
+    @timed('okx_api')
     def construct_limit_order(self, price) -> OrderDataOutput:
         side = self.__check_pos_side()
-        result = self.tradeAPI.place_order(
+        result = self.__call(
+            'trade_order', self.tradeAPI.place_order,
             instId = self.configs.instId,
             tdMode = self.user_settings.mgnMode,
             side = side,
@@ -201,36 +258,35 @@ class OkxApi:
             px = price,
             sz = str(self.configs.size)
         )
-        self.__check_result(result)
         return OrderDataOutput(
             result = result,
             orderId = result['data'][0]['ordId'], 
             outTime =  datetime.fromtimestamp(int(result['outTime'])/1000000) + timedelta(hours=3)
         )
 
-    def calculate_posSize(self, contract_price:float|int) -> float:
+    def calculate_posSize(self, contract_price:float|int, balance:float|None=None) -> float:
         if self.user_settings.leverage is not None and self.user_settings.risk is not None and self.configs.slPrice is not None: 
-            return ((self.check_balance()) * self.user_settings.leverage * self.user_settings.risk) / self.configs.slPrice #type: ignore
+            balance = self.check_balance() if balance is None else balance
+            return (balance * self.user_settings.leverage * self.user_settings.risk) / self.configs.slPrice #type: ignore
         raise ValueError('Check leverage, risk, and slPrice configs for posSize calculating')
 
+    @timed('okx_api')
     def check_position(self, ordId) -> float:
-        result = self.tradeAPI.get_order(
+        result = self.__call(
+            'trade_get_order', self.tradeAPI.get_order,
             instId=self.configs.instId,
-            ordId=ordId)
-        self.__check_result(result)
+            ordId=ordId,
+            coalesce=True)
         return float(result["data"][0]["avgPx"])
 
+    @timed('okx_api')
     def get_all_order_list(self) -> dict:
-        result = self.tradeAPI.get_order_list()
-        self.__check_result(result)
-        return result
+        return self.__call('trade_orders_pending', self.tradeAPI.get_order_list, coalesce=True)
 
+    @timed('okx_api')
     def get_all_opened_positions(self) -> dict:
-        result = self.accountAPI.get_positions()
-        self.__check_result(result)
-        return result
+        return self.__call('account_positions', self.accountAPI.get_positions, coalesce=True)
 
+    @timed('okx_api')
     def get_history(self) -> dict:
-        result = self.tradeAPI.get_fills(instType = 'SWAP')
-        self.__check_result(result)
-        return result
\ No newline at end of file
+        return self.__call('trade_fills', self.tradeAPI.get_fills, instType = 'SWAP', coalesce=True)
\ No newline at end of file
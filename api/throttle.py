@@ -0,0 +1,116 @@
+import random, threading, time
+from concurrent.futures import Future
+from typing import Any, Callable, Hashable
+from metrics.methods import count
+
+
+# Семейство эндпоинтов -> (запросов, за секунд), лимиты OKX на ключ/IP
+OKX_RATE_LIMITS: dict[str, tuple[int, float]] = {
+    'market_candles': (40, 2.0),
+    'market_history_candles': (20, 2.0),
+    'market_ticker': (20, 2.0),
+    'market_tickers': (20, 2.0),
+    'account_balance': (10, 2.0),
+    'account_positions': (10, 2.0),
+    'account_instruments': (20, 2.0),
+    'account_set_leverage': (20, 2.0),
+    'account_position_mode': (5, 2.0),
+    'trade_order': (60, 2.0),
+    'trade_get_order': (60, 2.0),
+    'trade_orders_pending': (60, 2.0),
+    'trade_algo_order': (20, 2.0),
+    'trade_amend_algo': (20, 2.0),
+    'trade_fills': (60, 2.0)
+}
+# 50011 - превышен лимит запросов, 50061 - превышен лимит субаккаунта
+RATE_LIMIT_CODES = frozenset({'50011', '50061'})
+
+
+class OkxApiError(ValueError):
+    def __init__(self, code:str, msg:str=''):
+        super().__init__(f'Error, code: {code}' + (f', {msg}' if msg else ''))
+        self.code = code
+        self.msg = msg
+
+
+class RateLimitError(OkxApiError):
+    pass
+
+
+def okx_error(result:dict[str, Any]) -> OkxApiError:
+    code, msg = str(result.get('code')), str(result.get('msg') or '')
+    return RateLimitError(code, msg) if code in RATE_LIMIT_CODES else OkxApiError(code, msg)
+
+
+class TokenBucket:
+    # Токен резервируется под локом, ожидание - вне лока: очередь потоков обслуживается
+    # по порядку резервирования, баланс токенов может уходить в минус на длину очереди
+    def __init__(self, rate:float, capacity:float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> float:
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate) - 1
+            self.updated = now
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+class RequestThrottle:
+    # Ограничение частоты по семействам эндпоинтов, объединение одинаковых одновременных
+    # запросов и повтор с jitter-паузой при кодах лимита. Объединённые вызовы получают
+    # один и тот же объект ответа - его нельзя изменять на месте
+    def __init__(self, limits:dict[str, tuple[int, float]]=OKX_RATE_LIMITS, retries:int=3,
+                 backoff:float=0.5, max_backoff:float=8.0):
+        self.buckets = {family: TokenBucket(requests / period, requests) for family, (requests, period) in limits.items()}
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.inflight: dict[Hashable, Future] = {}
+        self.lock = threading.Lock()
+
+    def call(self, family:str, func:Callable[[], Any], key:Hashable|None=None) -> Any:
+        if key is None:
+            return self.__execute(family, func)
+        with self.lock:
+            future = self.inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self.inflight[key] = Future()
+        if not leader:
+            count('okx_api_coalesced', family=family)
+            return future.result()
+        try:
+            result = self.__execute(family, func)
+        except BaseException as e:
+            self.__finish(key)
+            future.set_exception(e)
+            raise
+        self.__finish(key)
+        future.set_result(result)
+        return result
+
+    def __finish(self, key:Hashable) -> None:
+        # Ключ снимается до публикации результата: следующий вызов уйдёт в сеть за свежими данными
+        with self.lock:
+            self.inflight.pop(key, None)
+
+    def __execute(self, family:str, func:Callable[[], Any]) -> Any:
+        bucket = self.buckets[family]
+        for attempt in range(self.retries + 1):
+            bucket.acquire()
+            try:
+                return func()
+            except RateLimitError:
+                if attempt == self.retries:
+                    raise
+                count('okx_api_rate_limited', family=family)
+                # Full jitter: случайная пауза до экспоненциальной границы, чтобы потоки не повторяли синхронно
+                time.sleep(random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt)))
@@ -0,0 +1,26 @@
+import pandas as pd
+from pydantic import BaseModel, ConfigDict # type: ignore
+
+
+class BacktestConfigs(BaseModel):
+    model_config = ConfigDict(frozen=True)
+    initial_balance: float = 1000.0
+    leverage: int = 1
+    risk: float = 0.01
+    order_type: str = 'market'
+    reward_ratio: float = 2.0
+    limit_offset: float = 0.001
+    limit_ttl: int = 3
+    taker_fee: float = 0.0005
+    maker_fee: float = 0.0002
+    ctVal: float = 1.0
+
+
+class BacktestResult(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+    equity: pd.Series
+    trades: pd.DataFrame
+    final_balance: float
+    total_return: float
+    max_drawdown: float
+    win_rate: float
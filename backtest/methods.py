@@ -0,0 +1,210 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Callable
+from configs.provider import ConfigsProvider
+from datasets.methods import PriceDbMethods
+from indicators.data import PriceDataFrame
+from indicators.panel import PricePanel, PanelIndicators
+from backtest.data import BacktestConfigs, BacktestResult
+
+
+# Колонки таблицы POSITIONS_AND_ORDERS (модель Orders) без pk
+ORDER_COLUMNS = (
+    'order_id', 'order_type', 'instrument', 'side_of_trade', 'leverage', 'open_time', 'close_time', 'status',
+    'price_of_conrats', 'number_of_conrats', 'money_in_deal', 'enter_price', 'order_volume',
+    'takeprofit_price', 'takeprofit_order_id', 'takeprofit_order_volume', 'stoploss_price',
+    'stoploss_order_id', 'stoploss_order_volume', 'risk_coefficient', 'close_price', 'fee',
+    'money_income', 'percent_money_income', 'history_of_trade'
+)
+
+
+def _first_hit(condition:Callable[[int, int], np.ndarray], start:int, end:int, window:int=64) -> int:
+    # Первый бар в [start, end), где выполнено условие. Окна удваиваются, поэтому поиск
+    # стоит пропорционально длительности сделки, а не длине всей истории
+    while start < end:
+        stop = min(start + window, end)
+        hits = condition(start, stop)
+        if hits.any():
+            return start + int(hits.argmax())
+        start, window = stop, window * 2
+    return -1
+
+
+class Backtester:
+    # Сигналы ADX/AVSL/CloudsRsi считаются один раз по всей истории (векторный расчёт PanelIndicators),
+    # после чего run() можно вызывать для любого числа BacktestConfigs.
+    # Вход: пересечение MACD по RSI в сторону сделки, ADX выше trigger и цена по нужную сторону AVSL.
+    # Стоп - уровень AVSL на баре сигнала, тейк - reward_ratio стопов. Рыночный вход по open следующего
+    # бара, лимитный - по close сигнала со сдвигом limit_offset в течение limit_ttl баров. Если на баре
+    # задеты и тейк, и стоп, считается стоп
+    def __init__(self, data:PriceDataFrame, instId:str, _type:str='close'):
+        self.instId = instId
+        self.index = data.index
+        self.open = data['open'].to_numpy(np.float64)
+        self.high = data['high'].to_numpy(np.float64)
+        self.low = data['low'].to_numpy(np.float64)
+        self.close = data['close'].to_numpy(np.float64)
+        self.data = data
+        self._type = _type
+        self.__signals: tuple[np.ndarray, np.ndarray]|None = None
+
+    @classmethod
+    def from_db(cls, instId:str, timeframe:str, _from:datetime|None=None, to:datetime|None=None,
+                _type:str='close') -> 'Backtester':
+        return cls(PriceDbMethods().get_marketdata_columnar(instId, timeframe, _from, to), instId, _type)
+
+    @property
+    def signals(self) -> tuple[np.ndarray, np.ndarray]:
+        # (направление: 1 лонг, -1 шорт, 0 нет сигнала; уровень стопа)
+        if self.__signals is None:
+            self.__signals = self.compute_signals(PanelIndicators(PricePanel.from_frames({self.instId: self.data})))
+        return self.__signals
+
+    def set_signals(self, direction:np.ndarray, stop:np.ndarray) -> None:
+        self.__signals = (np.asarray(direction, dtype=np.int8), np.asarray(stop, dtype=np.float64))
+
+    def compute_signals(self, indicators:PanelIndicators) -> tuple[np.ndarray, np.ndarray]:
+        indicators.calculate_rsi_macd(self._type)
+        indicators.calculate_avsl()
+        indicators.calculate_adx()
+        cross = indicators.macd_cross_signal[self.instId].to_numpy()
+        avsl = indicators.avsl[self.instId].to_numpy(np.float64)
+        adx = indicators.adx[self.instId].to_numpy(np.float64)
+        trend = adx > indicators.adx_configs.trigger
+        direction = np.where(
+            (cross == 1) & trend & (self.close > avsl), 1,
+            np.where((cross == -1) & trend & (self.close < avsl), -1, 0)
+        ).astype(np.int8)
+        return direction, avsl
+
+    def run(self, configs:BacktestConfigs|None=None) -> BacktestResult:
+        configs = configs or self.__default_configs()
+        direction, stop = self.signals
+        entries = np.flatnonzero(direction)
+        n = len(self.close)
+        realized = np.zeros(n)
+        unrealized = np.zeros(n)
+        balance = configs.initial_balance
+        records: list[tuple] = []
+        position = 0
+        while balance > 0:
+            k = np.searchsorted(entries, position)
+            if k >= entries.size:
+                break
+            signal = int(entries[k])
+            side = int(direction[signal])
+            position = signal + 1
+            fill = self.__fill(configs, signal, side)
+            if fill is None:
+                continue
+            bar, price, scan_from, entry_fee = fill
+            risk_per_unit = side * (price - stop[signal])
+            if not risk_per_unit > 0:
+                continue
+            takeprofit = price + side * configs.reward_ratio * risk_per_unit
+            size = min(balance * configs.risk / risk_per_unit, balance * configs.leverage / price)
+            close_bar, close_price, exit_fee = self.__exit(configs, side, stop[signal], takeprofit, scan_from)
+            fee = (entry_fee * price + (exit_fee * close_price if close_bar >= 0 else 0.0)) * size
+            realized[bar] -= entry_fee * price * size
+            last = close_bar if close_bar >= 0 else n
+            unrealized[bar:last] = side * size * (self.close[bar:last] - price)
+            income = -fee
+            if close_bar >= 0:
+                gross = side * size * (close_price - price)
+                realized[close_bar] += gross - exit_fee * close_price * size
+                income += gross
+                balance += income
+            records.append((side, bar, close_bar, price, close_price, size, takeprofit, stop[signal], fee, income))
+            if close_bar < 0:
+                break
+            position = max(position, close_bar)
+        equity = pd.Series(configs.initial_balance + np.cumsum(realized) + unrealized, index=self.index)
+        return self.__result(configs, equity, self.__orders(configs, records))
+
+    def __fill(self, configs:BacktestConfigs, signal:int, side:int) -> tuple[int, float, int, float]|None:
+        n = len(self.close)
+        if configs.order_type == 'market':
+            if signal + 1 >= n:
+                return None
+            return signal + 1, float(self.open[signal + 1]), signal + 1, configs.taker_fee
+        if configs.order_type != 'limit':
+            raise ValueError(f"Unsupported order type: {configs.order_type}")
+        price = float(self.close[signal] * (1 - side * configs.limit_offset))
+        if side > 0:
+            bar = _first_hit(lambda a, b: self.low[a:b] <= price, signal + 1, min(signal + 1 + configs.limit_ttl, n))
+        else:
+            bar = _first_hit(lambda a, b: self.high[a:b] >= price, signal + 1, min(signal + 1 + configs.limit_ttl, n))
+        if bar < 0:
+            return None
+        # Порядок цен внутри бара исполнения неизвестен - выходы проверяются со следующего бара
+        return bar, price, bar + 1, configs.maker_fee
+
+    def __exit(self, configs:BacktestConfigs, side:int, stop:float, takeprofit:float, start:int) -> tuple[int, float, float]:
+        if side > 0:
+            hit = lambda a, b: (self.low[a:b] <= stop) | (self.high[a:b] >= takeprofit)
+        else:
+            hit = lambda a, b: (self.high[a:b] >= stop) | (self.low[a:b] <= takeprofit)
+        bar = _first_hit(hit, start, len(self.close))
+        if bar < 0:
+            return -1, float('nan'), 0.0
+        stopped = self.low[bar] <= stop if side > 0 else self.high[bar] >= stop
+        if stopped:
+            # Стоп-маркет при гэпе исполняется по open
+            price = min(self.open[bar], stop) if side > 0 else max(self.open[bar], stop)
+            return bar, float(price), configs.taker_fee
+        return bar, float(takeprofit), configs.maker_fee
+
+    def __orders(self, configs:BacktestConfigs, records:list[tuple]) -> pd.DataFrame:
+        # Колонки сделок собираются массивами, без построчного создания словарей
+        columns = np.array(records, dtype=np.float64).reshape(-1, 10).T
+        side, bar, close_bar, price, close_price, size, takeprofit, stop, fee, income = columns
+        bar, close_bar = bar.astype(np.int64), close_bar.astype(np.int64)
+        closed = close_bar >= 0
+        contracts = size / configs.ctVal
+        margin = size * price / configs.leverage
+        numbers = np.arange(len(records)).astype(str)
+        return pd.DataFrame({
+            'order_id': np.char.add('backtest-', numbers),
+            'order_type': configs.order_type,
+            'instrument': self.instId,
+            'side_of_trade': np.where(side > 0, 'long', 'short'),
+            'leverage': configs.leverage,
+            'open_time': self.index[bar],
+            'close_time': self.index[np.where(closed, close_bar, 0)].where(closed),
+            'status': ~closed,
+            'price_of_conrats': configs.ctVal * price,
+            'number_of_conrats': contracts,
+            'money_in_deal': margin,
+            'enter_price': price,
+            'order_volume': contracts,
+            'takeprofit_price': takeprofit,
+            'takeprofit_order_id': None,
+            'takeprofit_order_volume': contracts,
+            'stoploss_price': stop,
+            'stoploss_order_id': np.char.add(np.char.add('backtest-', numbers), '-sl'),
+            'stoploss_order_volume': contracts,
+            'risk_coefficient': configs.risk,
+            'close_price': np.where(closed, close_price, np.nan),
+            'fee': fee,
+            'money_income': np.where(closed, income, np.nan),
+            'percent_money_income': np.where(closed, income / margin * 100, np.nan),
+            'history_of_trade': None
+        }, columns=list(ORDER_COLUMNS))
+
+    def __result(self, configs:BacktestConfigs, equity:pd.Series, trades:pd.DataFrame) -> BacktestResult:
+        values = equity.to_numpy()
+        peak = np.maximum.accumulate(values) if values.size else values
+        closed = trades['money_income'].dropna()
+        return BacktestResult(
+            equity=equity,
+            trades=trades,
+            final_balance=float(values[-1]) if values.size else 0.0,
+            total_return=float(values[-1] / configs.initial_balance - 1) if values.size else 0.0,
+            max_drawdown=float(((peak - values) / peak).max()) if values.size else 0.0,
+            win_rate=float((closed > 0).mean()) if len(closed) else 0.0
+        )
+
+    def __default_configs(self) -> BacktestConfigs:
+        user_settings = ConfigsProvider().load_user_settings()
+        return BacktestConfigs(leverage=user_settings.leverage, risk=user_settings.risk)
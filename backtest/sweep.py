@@ -0,0 +1,176 @@
+import hashlib, itertools, json, os, random
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Iterable, Iterator
+from pydantic import BaseModel # type: ignore
+from configs.provider import ConfigsProvider
+from configs.data import AvslConfigs, RsiCloudsConfigs, AdxConfigs
+from indicators.data import PriceDataFrame
+from indicators.panel import PricePanel, PanelIndicators
+from backtest.data import BacktestConfigs
+from backtest.methods import Backtester
+
+
+# Префикс параметра -> модель настроек: 'avsl.lengthsFast', 'rsi.rsi_period', 'adx.timeperiod'
+SWEEP_MODELS: dict[str, type[BaseModel]] = {'avsl': AvslConfigs, 'rsi': RsiCloudsConfigs, 'adx': AdxConfigs}
+SWEEP_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+METRICS = ('final_balance', 'total_return', 'max_drawdown', 'win_rate', 'trades')
+
+# Состояние процесса-исполнителя: цены из общей памяти и базовые настройки
+_state: dict[str, Any] = {}
+
+
+def grid(space:dict[str, Iterable[Any]]) -> list[dict[str, Any]]:
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(list(space[name]) for name in names))]
+
+
+def random_samples(space:dict[str, Any], samples:int, seed:int|None=None) -> list[dict[str, Any]]:
+    # Кортеж (low, high) - равномерная выборка из диапазона (целые для целых границ), иначе - выбор из списка
+    rng = random.Random(seed)
+    result = []
+    for _ in range(samples):
+        params = {}
+        for name, values in space.items():
+            if isinstance(values, tuple) and len(values) == 2:
+                low, high = values
+                params[name] = rng.randint(low, high) if isinstance(low, int) and isinstance(high, int) \
+                    else rng.uniform(low, high)
+            else:
+                params[name] = rng.choice(list(values))
+        result.append(params)
+    return result
+
+
+def _init_worker(name:str, length:int, instId:str, _type:str, base:dict[str, BaseModel],
+                 backtest:BacktestConfigs) -> None:
+    shared = SharedMemory(name=name)
+    _state.update(shared=shared)
+    _init_state(np.ndarray((len(SWEEP_COLUMNS) + 1, length), dtype=np.float64, buffer=shared.buf),
+                instId, _type, base, backtest)
+
+
+def _init_state(buffer:np.ndarray, instId:str, _type:str, base:dict[str, BaseModel], backtest:BacktestConfigs) -> None:
+    buffer.flags.writeable = False
+    index = pd.DatetimeIndex(buffer[0].view(np.int64).view('datetime64[ns]'), name='date', copy=False)
+    columns = {name: buffer[i + 1] for i, name in enumerate(SWEEP_COLUMNS)}
+    data = PriceDataFrame(columns, index=index, copy=False)
+    panel = PricePanel(**{name: pd.DataFrame({instId: values}, index=index, copy=False) for name, values in columns.items()})
+    _state.update(backtester=Backtester(data, instId, _type), panel=panel, base=base, backtest=backtest)
+
+
+def _evaluate(params:dict[str, Any]) -> dict[str, float]:
+    configs = {
+        group: type(model).model_validate({
+            **model.model_dump(),
+            **{name.split('.', 1)[1]: value for name, value in params.items() if name.split('.', 1)[0] == group}
+        })
+        for group, model in _state['base'].items()
+    }
+    backtester: Backtester = _state['backtester']
+    backtester.set_signals(*backtester.compute_signals(
+        PanelIndicators(_state['panel'], configs['rsi'], configs['avsl'], configs['adx'])
+    ))
+    result = backtester.run(_state['backtest'])
+    return {
+        'final_balance': result.final_balance, 'total_return': result.total_return,
+        'max_drawdown': result.max_drawdown, 'win_rate': result.win_rate, 'trades': len(result.trades)
+    }
+
+
+class ParameterSweep:
+    # Перебор настроек индикаторов с оценкой бэктестом. Цены один раз копируются в общую память
+    # (SharedMemory), процессы пула подключаются к ней только для чтения - в задачи уходят лишь
+    # параметры. Результаты дописываются в cache_path (JSONL) по мере готовности, повторный
+    # запуск пропускает уже посчитанные наборы
+    def __init__(self, data:PriceDataFrame, instId:str, _type:str='close', backtest:BacktestConfigs|None=None,
+                 processes:int|None=None, cache_path:str='sweep_cache.jsonl'):
+        provider = ConfigsProvider()
+        self.data = data
+        self.instId = instId
+        self._type = _type
+        self.base: dict[str, BaseModel] = {
+            'avsl': provider.load_avsl_settings(),
+            'rsi': provider.load_rsi_clouds_settings(),
+            'adx': provider.load_adx_configs()
+        }
+        if backtest is None:
+            user_settings = provider.load_user_settings()
+            backtest = BacktestConfigs(leverage=user_settings.leverage, risk=user_settings.risk)
+        self.backtest = backtest
+        self.processes = processes if processes is not None else os.cpu_count() or 1
+        self.cache_path = cache_path
+        self.cache: dict[str, dict[str, Any]] = self.__load_cache()
+
+    def run(self, parameters:Iterable[dict[str, Any]]) -> pd.DataFrame:
+        parameters = [self.__validate(params) for params in parameters]
+        keys = [self.__key(params) for params in parameters]
+        pending = {key: params for key, params in zip(keys, parameters) if key not in self.cache}
+        for key, metrics in self.__evaluate(pending):
+            self.cache[key] = {'params': pending[key], 'metrics': metrics}
+            self.__save(key)
+        rows = [{**self.cache[key]['params'], **self.cache[key]['metrics']} for key in dict.fromkeys(keys)]
+        return pd.DataFrame(rows).sort_values('total_return', ascending=False, ignore_index=True) if rows \
+            else pd.DataFrame(columns=list(METRICS))
+
+    def __evaluate(self, pending:dict[str, dict[str, Any]]) -> Iterator[tuple[str, dict[str, float]]]:
+        if not pending:
+            return
+        buffer = np.empty((len(SWEEP_COLUMNS) + 1, len(self.data)), dtype=np.float64)
+        buffer[0] = pd.DatetimeIndex(self.data.index).as_unit('ns').asi8.view(np.float64)
+        for i, name in enumerate(SWEEP_COLUMNS):
+            buffer[i + 1] = self.data[name].to_numpy(np.float64)
+        if self.processes <= 1 or len(pending) == 1:
+            _init_state(buffer, self.instId, self._type, self.base, self.backtest)
+            for key, params in pending.items():
+                yield key, _evaluate(params)
+            return
+        shared = SharedMemory(create=True, size=buffer.nbytes)
+        try:
+            np.ndarray(buffer.shape, dtype=np.float64, buffer=shared.buf)[:] = buffer
+            del buffer
+            initargs = (shared.name, len(self.data), self.instId, self._type, self.base, self.backtest)
+            with ProcessPoolExecutor(min(self.processes, len(pending)), initializer=_init_worker, initargs=initargs) as pool:
+                futures = {pool.submit(_evaluate, params): key for key, params in pending.items()}
+                for future in as_completed(futures):
+                    yield futures[future], future.result()
+        finally:
+            shared.close()
+            shared.unlink()
+
+    def __validate(self, params:dict[str, Any]) -> dict[str, Any]:
+        for name in params:
+            group, _, field = name.partition('.')
+            if group not in SWEEP_MODELS or field not in SWEEP_MODELS[group].model_fields:
+                raise ValueError(f"Unknown sweep parameter: {name}")
+        return dict(sorted(params.items()))
+
+    def __key(self, params:dict[str, Any]) -> str:
+        # Ключ учитывает и данные, и настройки бэктеста, чтобы кэш разных прогонов не смешивался
+        index = self.data.index
+        fingerprint = [self.instId, self._type, len(index), str(index[0]) if len(index) else None,
+                       str(index[-1]) if len(index) else None]
+        payload = json.dumps({
+            'params': params, 'base': {group: model.model_dump() for group, model in self.base.items()},
+            'backtest': self.backtest.model_dump(), 'data': fingerprint
+        }, sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode()).hexdigest()
+
+    def __load_cache(self) -> dict[str, dict[str, Any]]:
+        cache: dict[str, dict[str, Any]] = {}
+        if os.path.exists(self.cache_path):
+            with open(self.cache_path) as file:
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Строка, оборванная при аварийной остановке
+                        continue
+                    cache[record['key']] = {'params': record['params'], 'metrics': record['metrics']}
+        return cache
+
+    def __save(self, key:str) -> None:
+        with open(self.cache_path, 'a') as file:
+            file.write(json.dumps({'key': key, **self.cache[key]}) + '\n')
@@ -0,0 +1,62 @@
+import time
+import numpy as np
+import pandas as pd
+import pandas_ta as ta #type: ignore
+from indicators.avsl.methods import avsl_price
+
+
+def reference_avsl_price(low: np.ndarray, vpc: np.ndarray, vpr: np.ndarray, vpci: np.ndarray) -> np.ndarray:
+    # Побарный расчёт по формуле из Pine Script, используется как эталон
+    result = np.empty(low.size)
+    for i in range(low.size):
+        if np.isnan(vpci[i]):
+            result[i] = low[i]
+            continue
+        lenV = int(np.round(abs(vpci[i] - 3)) if vpc[i] < 0 else np.round(vpci[i] + 3))
+        if lenV <= 0:
+            result[i] = low[i]
+            continue
+        if i + 1 < lenV:
+            result[i] = np.nan
+            continue
+        price = 0.0
+        for j in range(i - lenV + 1, i + 1):
+            vpcc = -1 if -1 < vpc[j] < 0 else 1 if 0 <= vpc[j] < 1 else vpc[j]
+            price += low[j] / vpcc / vpr[j]
+        result[i] = price / lenV / 100
+    return result
+
+
+def prepare_inputs(bars: int, fast: int = 12, slow: int = 26, seed: int = 0) -> tuple[np.ndarray, ...]:
+    rng = np.random.default_rng(seed)
+    close = pd.Series(100 + np.cumsum(rng.normal(0, 1, bars)))
+    low = close - rng.uniform(0, 1, bars)
+    volume = pd.Series(rng.uniform(1, 1000, bars))
+    vpc = ta.vwma(close, volume, length=slow) - ta.sma(close, length=slow)
+    vpr = ta.vwma(close, volume, length=fast) / ta.sma(close, length=fast)
+    vm = ta.sma(volume, length=fast) / ta.sma(volume, length=slow)
+    vpci = vpc * vpr * vm
+    return tuple(np.asarray(x, dtype=np.float64) for x in (low, vpc, vpr, vpci))
+
+
+def run(bars: int = 100_000) -> dict[str, float]:
+    inputs = prepare_inputs(bars)
+    start = time.perf_counter()
+    vectorized = avsl_price(*inputs)
+    vectorized_time = time.perf_counter() - start
+    start = time.perf_counter()
+    reference = reference_avsl_price(*inputs)
+    reference_time = time.perf_counter() - start
+    if not np.allclose(vectorized, reference, rtol=1e-9, atol=1e-9, equal_nan=True):
+        raise ValueError('Vectorized AVSL price differs from reference')
+    return {
+        'bars': bars,
+        'vectorized_ms': vectorized_time * 1000,
+        'reference_ms': reference_time * 1000,
+        'speedup': reference_time / vectorized_time
+    }
+
+
+if __name__ == '__main__':
+    for bars in (1_000, 100_000):
+        print(run(bars))
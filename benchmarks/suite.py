@@ -0,0 +1,276 @@
+import argparse, json, os, sys, tempfile, time, traceback
+from typing import Any, Callable
+
+
+BENCH_SIZES = (1_000, 100_000, 1_000_000)
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+BENCH_INSTID = 'BENCH-USDT-SWAP'
+BENCH_TIMEFRAME = '1m'
+# Настройки для запуска без .env файлов. БД и список инструментов подменяются всегда: бенчмарк
+# пишет только во временную SQLite, остальные значения берутся из окружения, если заданы
+FORCED_ENV = {'INSTIDS': BENCH_INSTID, 'TIMEFRAMES': BENCH_TIMEFRAME}
+DEFAULT_ENV = {
+    'LEVERAGE': '1', 'RISK': '0.01', 'MGNMODE': 'isolated',
+    'RSI_LENGHTS': '14', 'RSI_SCALAR': '100', 'RSI_DRIFT': '1', 'RSI_OFFSET': '0', 'MA_MODE': 'rma',
+    'RSI_TALIB_CONFIG': '', 'MACD_FAST': '12', 'MACD_SLOW': '26', 'MACD_SIGNAL': '9', 'MACD_OFFSET': '0',
+    'CALC_DATA': 'close', 'MACD_TALIB_CONFIG': '',
+    'LENGHTS_FAST': '12', 'LENGHTS_SLOW': '26', 'LEN_T': '9', 'STAND_DIV': '2', 'OFFSET': '0',
+    'TIMEPERIOD': '14', 'LENGHTS_SIG': '14', 'ADXRLENGHTS': '0', 'SCALAR': '100', 'TALIB': '', 'TVMODE': '',
+    'MAMODE': 'rma', 'DRIFT': '1', 'TRIGGER': '25',
+    'FLAG': '1', 'API_KEY': 'benchmark', 'PASSPHRASE': 'benchmark', 'SECRET_KEY': 'benchmark'
+}
+
+# Имя -> (подготовка, максимальный размер). Подготовка вызывается перед каждым замером
+# и возвращает функцию, время которой измеряется
+_benchmarks: dict[str, tuple[Callable[[int], Callable[[], Any]], int|None]] = {}
+
+
+def benchmark(name:str, max_bars:int|None=None) -> Callable:
+    def decorator(setup:Callable[[int], Callable[[], Any]]) -> Callable[[int], Callable[[], Any]]:
+        _benchmarks[name] = (setup, max_bars)
+        return setup
+    return decorator
+
+
+@benchmark('prepare_data_to_dataframe')
+def _prepare_data_to_dataframe(bars:int) -> Callable[[], Any]:
+    from benchmarks.synthetic import generate_okx_response
+    from indicators.data import prepare_data_to_dataframe
+    response = generate_okx_response(bars)
+    return lambda: prepare_data_to_dataframe(response)
+
+
+@benchmark('parse_candles')
+def _parse_candles(bars:int) -> Callable[[], Any]:
+    from benchmarks.synthetic import generate_okx_response
+    from indicators.data import parse_candles
+    response = generate_okx_response(bars)
+    return lambda: parse_candles(response)
+
+
+@benchmark('create_dataframe')
+def _create_dataframe(bars:int) -> Callable[[], Any]:
+    from benchmarks.synthetic import generate_okx_response
+    from indicators.data import prepare_data_to_dataframe, create_dataframe
+    price_data = prepare_data_to_dataframe(generate_okx_response(bars))
+    return lambda: create_dataframe(price_data)
+
+
+# Построчные pydantic-схемы и ORM-вставка: 1M строк занимают минуты, по умолчанию до 100k
+@benchmark('dataframe_to_schema_list+add_data', max_bars=100_000)
+def _add_data(bars:int) -> Callable[[], Any]:
+    from benchmarks.synthetic import generate_candles
+    from datasets.methods import PriceDbMethods
+    db = PriceDbMethods(layout='dynamic')
+    df = generate_candles(bars)
+    _clear_table()
+    return lambda: db.add_data(BENCH_INSTID, BENCH_TIMEFRAME, db.dataframe_to_schema_list(df, BENCH_INSTID, BENCH_TIMEFRAME))
+
+
+@benchmark('add_data_bulk')
+def _add_data_bulk(bars:int) -> Callable[[], Any]:
+    from benchmarks.synthetic import generate_candles
+    from datasets.methods import PriceDbMethods
+    db = PriceDbMethods(layout='dynamic')
+    df = generate_candles(bars)
+    _clear_table()
+    return lambda: db.add_data_bulk(BENCH_INSTID, BENCH_TIMEFRAME, df)
+
+
+@benchmark('get_marketdata')
+def _get_marketdata(bars:int) -> Callable[[], Any]:
+    db = _filled_db(bars)
+    return lambda: db.get_marketdata(BENCH_INSTID, BENCH_TIMEFRAME)
+
+
+@benchmark('get_marketdata_columnar')
+def _get_marketdata_columnar(bars:int) -> Callable[[], Any]:
+    db = _filled_db(bars)
+    return lambda: db.get_marketdata_columnar(BENCH_INSTID, BENCH_TIMEFRAME)
+
+
+@benchmark('SecurePickle.serialize')
+def _serialize(bars:int) -> Callable[[], Any]:
+    from benchmarks.synthetic import generate_candles
+    from configs.utils import SecurePickle
+    pickler, df = SecurePickle(), generate_candles(bars)
+    return lambda: pickler.serialize(df)
+
+
+@benchmark('SecurePickle.deserialize')
+def _deserialize(bars:int) -> Callable[[], Any]:
+    from benchmarks.synthetic import generate_candles
+    from configs.utils import SecurePickle
+    pickler = SecurePickle()
+    data = pickler.serialize(generate_candles(bars))
+    return lambda: pickler.deserialize(data)
+
+
+@benchmark('CloudsRsi.calculate_rsi_macd')
+def _clouds_rsi(bars:int) -> Callable[[], Any]:
+    from benchmarks.synthetic import generate_candles
+    from indicators.rsi_clouds.methods import CloudsRsi
+    indicator = CloudsRsi(generate_candles(bars), 'close')
+    return indicator.calculate_rsi_macd
+
+
+@benchmark('AVSLIndicator.calculate_avsl')
+def _avsl(bars:int) -> Callable[[], Any]:
+    from benchmarks.synthetic import generate_candles
+    from indicators.avsl.methods import AVSLIndicator
+    return AVSLIndicator(generate_candles(bars)).calculate_avsl
+
+
+@benchmark('ADXTrend.calculate_adx')
+def _adx(bars:int) -> Callable[[], Any]:
+    from benchmarks.synthetic import generate_candles
+    from indicators.adx.methods import ADXTrend
+    return ADXTrend(generate_candles(bars)).calculate_adx
+
+
+@benchmark('PanelIndicators.evaluate')
+def _panel(bars:int) -> Callable[[], Any]:
+    from benchmarks.synthetic import generate_candles
+    from indicators.panel import PricePanel, PanelIndicators
+    panel = PricePanel.from_frames({BENCH_INSTID: generate_candles(bars)})
+    return lambda: PanelIndicators(panel).evaluate('close')
+
+
+def _clear_table() -> None:
+    from datasets.models import DynamicClassProvider, get_session
+    with get_session() as session:
+        session.query(DynamicClassProvider().get_class(BENCH_INSTID, BENCH_TIMEFRAME)).delete()
+
+
+def _filled_db(bars:int) -> Any:
+    from benchmarks.synthetic import generate_candles
+    from datasets.methods import PriceDbMethods
+    db = PriceDbMethods(layout='dynamic')
+    _clear_table()
+    db.add_data_bulk(BENCH_INSTID, BENCH_TIMEFRAME, generate_candles(bars))
+    return db
+
+
+def prepare_environment(directory:str|None=None) -> str:
+    # Вызывается до первого импорта datasets: движок БД создаётся при импорте datasets.models
+    directory = directory or tempfile.mkdtemp(prefix='benchmarks-')
+    os.environ['DB_URI'] = f"sqlite:///{os.path.join(directory, 'benchmarks.db')}"
+    os.environ.update(FORCED_ENV)
+    for key, value in DEFAULT_ENV.items():
+        os.environ.setdefault(key, value)
+    return directory
+
+
+def measure(setup:Callable[[int], Callable[[], Any]], bars:int, repeat:int) -> float:
+    # Лучшее время из repeat замеров, подготовка данных в замер не входит
+    best = float('inf')
+    for _ in range(repeat):
+        function = setup(bars)
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(names:list[str]|None=None, sizes:tuple[int, ...]=BENCH_SIZES, repeat:int=3,
+        limits:bool=True) -> tuple[dict[str, dict[str, float|None]], dict[str, str]]:
+    # Результат: (имя -> размер -> секунды, имя -> причина сбоя). None - размер не замерен:
+    # пропущен из-за ограничения max_bars или бенчмарк упал / пропущен (тогда он есть во втором словаре)
+    results: dict[str, dict[str, float|None]] = {}
+    failures: dict[str, str] = {}
+    for name in names or list(_benchmarks):
+        if name not in _benchmarks:
+            raise ValueError(f"Unknown benchmark: {name}")
+        setup, max_bars = _benchmarks[name]
+        results[name] = {}
+        for bars in sizes:
+            if limits and max_bars is not None and bars > max_bars:
+                results[name][str(bars)] = None
+                continue
+            try:
+                # На больших размерах один замер, чтобы полный прогон занимал минуты, а не часы
+                results[name][str(bars)] = measure(setup, bars, repeat if bars <= 100_000 else 1)
+            except ImportError as e:
+                # Необязательная зависимость не установлена (например, pandas_ta): бенчмарк пропускается,
+                # но прогон считается неуспешным - иначе регрессия могла бы спрятаться за пропуском
+                failures[name] = f'skipped at {bars} bars, {e}'
+            except Exception as e:
+                traceback.print_exc()
+                failures[name] = f'failed at {bars} bars, {e!r}'
+            if name in failures:
+                print(f'{name}: {failures[name]}', file=sys.stderr)
+                results[name] = {str(size): None for size in sizes}
+                break
+    return results, failures
+
+
+def load_baseline(path:str=BASELINE_PATH) -> dict[str, dict[str, float|None]]:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as file:
+        return json.load(file)
+
+
+def save_baseline(results:dict[str, dict[str, float|None]], path:str=BASELINE_PATH) -> None:
+    # Новые замеры дополняют базовую линию, а не заменяют её целиком
+    baseline = load_baseline(path)
+    for name, sizes in results.items():
+        baseline.setdefault(name, {}).update({bars: value for bars, value in sizes.items() if value is not None})
+    with open(path, 'w') as file:
+        json.dump(baseline, file, indent=2, sort_keys=True)
+
+
+def compare(results:dict[str, dict[str, float|None]], baseline:dict[str, dict[str, float|None]],
+            tolerance:float=0.2) -> list[str]:
+    # Регрессия - замер медленнее базового больше чем на tolerance (0.2 = на 20%)
+    regressions = []
+    for name, sizes in results.items():
+        for bars, value in sizes.items():
+            reference = baseline.get(name, {}).get(bars)
+            if value is None or reference is None:
+                continue
+            if value > reference * (1 + tolerance):
+                regressions.append(f'{name}@{bars}: {value * 1000:.2f} ms vs baseline {reference * 1000:.2f} ms '
+                                   f'(+{(value / reference - 1) * 100:.0f}%)')
+    return regressions
+
+
+def main(argv:list[str]|None=None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmarks of the hot paths on synthetic candles')
+    parser.add_argument('--only', nargs='*', help='benchmark names to run')
+    parser.add_argument('--sizes', nargs='*', type=int, default=list(BENCH_SIZES))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-limits', action='store_true', help='run slow benchmarks at every size')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    parser.add_argument('--save', action='store_true', help='store the results as the new baseline')
+    args = parser.parse_args(argv)
+    prepare_environment()
+    results, failures = run(args.only, tuple(args.sizes), args.repeat, not args.no_limits)
+    for name, sizes in results.items():
+        if name in failures:
+            print(f'{name}: {failures[name]}')
+            continue
+        timings = ', '.join(f'{bars}: ' + ('skipped' if value is None else f'{value * 1000:.2f} ms')
+                            for bars, value in sizes.items())
+        print(f'{name}: {timings}')
+    for name, reason in failures.items():
+        print(f'FAILED {name}: {reason}')
+    if args.save:
+        # Удачные замеры сохраняются и при сбоях, но код выхода сообщает о неполном прогоне
+        save_baseline(results, args.baseline)
+        return 1 if failures else 0
+    baseline = load_baseline(args.baseline)
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f'REGRESSION {regression}')
+    # Замер без базового значения не сравнивается - об этом сообщается, чтобы пропуск был виден
+    unchecked = [f'{name}@{bars}' for name, sizes in results.items() for bars, value in sizes.items()
+                 if value is not None and baseline.get(name, {}).get(bars) is None]
+    if unchecked:
+        print(f"NO BASELINE {', '.join(unchecked)}")
+    return 1 if regressions or failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+from typing import Any
+from api.data import TIMEFRAME_MS
+from indicators.data import PriceDataFrame, TIME_OFFSET
+
+
+def generate_ohlcv(bars:int, seed:int=0, start_ms:int=1_700_000_000_000, timeframe:str='1m') -> dict[str, np.ndarray]:
+    # Детерминированные свечи: логарифмическое случайное блуждание цены, high/low охватывают open/close,
+    # объём - логнормальный. Одинаковые bars/seed всегда дают одинаковые массивы
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.001, bars)))
+    _open = np.concatenate(([100.0], close[:-1])) * np.exp(rng.normal(0, 0.0002, bars))
+    spread = close * rng.uniform(0, 0.002, bars)
+    volume = rng.lognormal(3, 1, bars)
+    return {
+        'timestamp': start_ms + np.arange(bars, dtype=np.int64) * TIMEFRAME_MS[timeframe],
+        'open': _open,
+        'high': np.maximum(_open, close) + spread,
+        'low': np.minimum(_open, close) - spread,
+        'close': close,
+        'volume': volume,
+        'volume_usdt': volume * close
+    }
+
+
+def generate_candles(bars:int, seed:int=0, start_ms:int=1_700_000_000_000, timeframe:str='1m') -> PriceDataFrame:
+    # Та же форма, что у parse_candles: колонка date и DatetimeIndex во времени хранения (UTC+3)
+    columns = generate_ohlcv(bars, seed, start_ms, timeframe)
+    dates = pd.to_datetime(columns.pop('timestamp'), unit='ms') + TIME_OFFSET
+    df = PriceDataFrame({'date': dates, **columns})
+    df.index = dates
+    return df
+
+
+def generate_okx_response(bars:int, seed:int=0, start_ms:int=1_700_000_000_000, timeframe:str='1m') -> dict[str, Any]:
+    # Ответ REST /market/candles: строки-значения, новые свечи первыми
+    columns = generate_ohlcv(bars, seed, start_ms, timeframe)
+    rows = zip(
+        columns['timestamp'].astype(str), columns['open'].astype(str), columns['high'].astype(str),
+        columns['low'].astype(str), columns['close'].astype(str), columns['volume'].astype(str),
+        columns['volume'].astype(str), columns['volume_usdt'].astype(str)
+    )
+    return {'code': '0', 'msg': '', 'data': [[*row, '1'] for row in rows][::-1]}
@@ -0,0 +1,138 @@
+import asyncio, json, os, time
+import numpy as np
+from datetime import datetime
+from typing import Any, Iterable
+from api.async_okx_api import AsyncOkxApi
+from api.data import OkxApiData, TIMEFRAME_MS
+from datasets.archive import CandleArchive
+from datasets.methods import PriceDbMethods
+from indicators.data import parse_candles, PriceDataFrame, TIME_OFFSET
+
+
+# Лимит OKX для history-candles: 20 запросов за 2 секунды
+HISTORY_REQUESTS_PER_SECOND = 10.0
+HISTORY_PAGE_LIMIT = 100
+
+
+class _RateLimiter:
+    def __init__(self, rate:float):
+        self.interval = 1 / rate
+        self.next_slot = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        async with self.lock:
+            now = time.monotonic()
+            delay = self.next_slot - now
+            self.next_slot = max(now, self.next_slot) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class HistoryBackfill:
+    # Постраничная загрузка истории по курсору after от новых свечей к старым. Пропуски
+    # определяются по уже сохранённым таймстемпам, прогресс пишется в checkpoint-файл
+    # после каждой сохранённой страницы, поэтому повторный запуск продолжает с места остановки
+    def __init__(self, instIds:Iterable[str], timeframes:Iterable[str], start:datetime, end:datetime|None=None,
+                 concurrency:int=4, requests_per_second:float=HISTORY_REQUESTS_PER_SECOND,
+                 checkpoint_path:str='backfill_checkpoint.json', api:AsyncOkxApi|None=None):
+        self.pairs = [(instId, timeframe) for instId in instIds for timeframe in timeframes]
+        self.start_ms = self.__to_ms(start)
+        self.end_ms = self.__to_ms(end) if end else int(time.time() * 1000)
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.limiter = _RateLimiter(requests_per_second)
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint: dict[str, dict[str, Any]] = self.__load_checkpoint()
+        self.api = api or AsyncOkxApi()
+        self.db = PriceDbMethods()
+        self.archive = CandleArchive()
+
+    async def run(self) -> dict[str, int]:
+        async with self.api:
+            counts = await asyncio.gather(*(self.__backfill_pair(instId, timeframe) for instId, timeframe in self.pairs))
+        return {f'{instId}_{timeframe}': count for (instId, timeframe), count in zip(self.pairs, counts)}
+
+    def find_gaps(self, instId:str, timeframe:str) -> list[tuple[int, int]]:
+        step = TIMEFRAME_MS[timeframe]
+        start = -(-self.start_ms // step) * step
+        end = self.end_ms // step * step
+        stored = self.db.get_timestamps(
+            instId, timeframe,
+            _from=self.__from_ms(start), to=self.__from_ms(end)
+        ).astype(np.int64) - self.__offset_ms()
+        bounds = np.concatenate(([start - step], stored, [end + step]))
+        missing = np.flatnonzero(np.diff(bounds) > step)
+        holes = [tuple(hole) for hole in self.checkpoint.get(f'{instId}_{timeframe}', {}).get('holes', [])]
+        gaps = [(int(bounds[i] + step), int(bounds[i + 1] - step)) for i in missing]
+        return [gap for gap in gaps if gap not in holes]
+
+    async def __backfill_pair(self, instId:str, timeframe:str) -> int:
+        async with self.semaphore:
+            inserted = 0
+            gaps = self.__merge_gaps(await asyncio.to_thread(self.find_gaps, instId, timeframe), TIMEFRAME_MS[timeframe])
+            for low, high in reversed(gaps):
+                inserted += await self.__fill_gap(instId, timeframe, low, high)
+            return inserted
+
+    def __merge_gaps(self, gaps:list[tuple[int, int]], step:int) -> list[tuple[int, int]]:
+        # Соседние пропуски, помещающиеся в одну страницу, забираются одним запросом
+        merged: list[tuple[int, int]] = []
+        for low, high in gaps:
+            if merged and high - merged[-1][0] < HISTORY_PAGE_LIMIT * step:
+                merged[-1] = (merged[-1][0], high)
+            else:
+                merged.append((low, high))
+        return merged
+
+    async def __fill_gap(self, instId:str, timeframe:str, low:int, high:int) -> int:
+        key = f'{instId}_{timeframe}'
+        state = self.checkpoint.setdefault(key, {'holes': []})
+        cursor = state['after'] if state.get('gap') == [low, high] else high + TIMEFRAME_MS[timeframe]
+        inserted = 0
+        while cursor > low:
+            await self.limiter.wait()
+            result = await self.api.get_market_data_history(
+                OkxApiData(instId=instId, timeframe=timeframe, after=str(cursor), lengths=HISTORY_PAGE_LIMIT)
+            )
+            if not result['data']:
+                # Биржа не отдаёт данные старше курсора (до листинга) - остаток интервала больше не запрашиваем
+                state['holes'].append([low, cursor - TIMEFRAME_MS[timeframe]])
+                break
+            page = parse_candles(result)
+            page = page[page.index >= self.__from_ms(low)]
+            if len(page):
+                inserted += await asyncio.to_thread(self.__save_page, instId, timeframe, page)
+            cursor = min(int(item[0]) for item in result['data'])
+            state.update(gap=[low, high], after=cursor)
+            self.__save_checkpoint()
+        state.pop('gap', None)
+        state.pop('after', None)
+        self.__save_checkpoint()
+        return inserted
+
+    def __save_page(self, instId:str, timeframe:str, page:PriceDataFrame) -> int:
+        # Страница пишется и в БД, и в колоночный архив: архив вливает свечи старше своего начала
+        report = self.db.add_data_bulk(instId, timeframe, page)
+        self.archive.append(instId, timeframe, page)
+        return report.inserted
+
+    def __load_checkpoint(self) -> dict[str, dict[str, Any]]:
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path) as file:
+                return json.load(file)
+        return {}
+
+    def __save_checkpoint(self) -> None:
+        temp_path = f'{self.checkpoint_path}.tmp'
+        with open(temp_path, 'w') as file:
+            json.dump(self.checkpoint, file)
+        os.replace(temp_path, self.checkpoint_path)
+
+    def __offset_ms(self) -> int:
+        return int(TIME_OFFSET.total_seconds() * 1000)
+
+    def __to_ms(self, date:datetime) -> int:
+        return int(np.datetime64(date, 'ms').astype(np.int64)) - self.__offset_ms()
+
+    def __from_ms(self, ms:int) -> datetime:
+        return np.datetime64(ms + self.__offset_ms(), 'ms').astype(datetime)
@@ -1,10 +1,20 @@
-from pydantic import BaseModel #type: ignore
+from pydantic import BaseModel, ConfigDict #type: ignore
 from indicators.data import PriceDataFrame 
 
 class StreamDataConfigs(BaseModel):
-    instId = str|None
-    timeframe = str|None
-    lenghts = int|None
-    key = str|None
-    channel = str|None
-    data = PriceDataFrame|None
\ No newline at end of file
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+    instId: str|None = None
+    timeframe: str|None = None
+    lenghts: int|None = None
+    key: str|None = None
+    channel: str|None = None
+    data: PriceDataFrame|None = None
+
+class ChannelStats(BaseModel):
+    received: int
+    dispatched: int
+    batches: int
+    errors: int
+    queued: int
+    last_lag: float
+    max_lag: float
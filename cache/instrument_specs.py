@@ -0,0 +1,83 @@
+import json, threading, time
+from typing import Any, Callable
+from redis import Redis
+from api.data import InstrumentSpec
+
+
+class InstrumentSpecStore:
+    # Спецификации инструментов в Redis-хэше instruments_{instType} (instId -> JSON) и в
+    # локальном dict с TTL: поиск ctVal/tickSz/lotSz по instId за O(1) без разбора всего списка
+    _local: dict[tuple[str, str], tuple[float, InstrumentSpec]] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, redis:Redis, instType:str='SWAP', ttl:float=300.0):
+        self.redis = redis
+        self.instType = instType
+        self.ttl = ttl
+        self.key = f'instruments_{instType}'
+        self.__thread:threading.Thread|None = None
+        self.__stop = threading.Event()
+
+    def refresh(self, result:dict[str, Any]) -> int:
+        specs = {item['instId']: self.__parse(item) for item in result['data']}
+        if not specs:
+            return 0
+        temp_key = f'{self.key}_tmp'
+        with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(temp_key)
+            pipe.hset(temp_key, mapping={instId: spec.model_dump_json() for instId, spec in specs.items()})
+            pipe.rename(temp_key, self.key)
+            pipe.execute()
+        expires = time.monotonic() + self.ttl
+        with InstrumentSpecStore._lock:
+            for instId, spec in specs.items():
+                InstrumentSpecStore._local[(self.instType, instId)] = (expires, spec)
+        return len(specs)
+
+    def get(self, instId:str, fetch:Callable[[], dict[str, Any]]|None=None) -> InstrumentSpec:
+        # fetch загружает список инструментов при промахе: в свежем процессе хэш может быть пуст,
+        # а новый инструмент появиться между плановыми обновлениями
+        cached = InstrumentSpecStore._local.get((self.instType, instId))
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+        value = self.redis.hget(self.key, instId)
+        if value is None and fetch is not None:
+            self.refresh(fetch())
+            value = self.redis.hget(self.key, instId)
+        if value is None:
+            raise ValueError(f"Instrument {instId} not found in {self.key}")
+        spec = InstrumentSpec(**json.loads(value)) #type: ignore
+        with InstrumentSpecStore._lock:
+            InstrumentSpecStore._local[(self.instType, instId)] = (time.monotonic() + self.ttl, spec)
+        return spec
+
+    def start_refresher(self, fetch:Callable[[], dict[str, Any]], interval:float=3600.0) -> None:
+        if self.__thread is not None:
+            return
+        self.refresh(fetch())
+        self.__stop.clear()
+        self.__thread = threading.Thread(target=self.__run, args=(fetch, interval), name='instrument-specs', daemon=True)
+        self.__thread.start()
+
+    def stop_refresher(self) -> None:
+        self.__stop.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+    def __run(self, fetch:Callable[[], dict[str, Any]], interval:float) -> None:
+        while not self.__stop.wait(interval):
+            try:
+                self.refresh(fetch())
+            except Exception:
+                # Старые спецификации остаются в силе до следующей успешной загрузки
+                continue
+
+    def __parse(self, item:dict[str, str]) -> InstrumentSpec:
+        return InstrumentSpec(
+            instId = item['instId'],
+            ctVal = float(item.get('ctVal') or 0),
+            tickSz = float(item.get('tickSz') or 0),
+            lotSz = float(item.get('lotSz') or 0),
+            minSz = float(item.get('minSz') or 0)
+        )
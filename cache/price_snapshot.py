@@ -0,0 +1,79 @@
+import json, threading, time
+from typing import Iterable
+from redis import Redis
+
+
+# Хэш последних цен instId -> JSON {last, ts, rt}; его обновляет WebSocketStream по каналу tickers.
+# ts - время биржи, rt - локальное время получения цены (мс)
+TICKERS_KEY = 'tickers'
+
+
+def snapshot_json(last:str|float, ts:str|int, received:int|None=None) -> str:
+    received = int(time.time() * 1000) if received is None else received
+    return json.dumps({'last': str(last), 'ts': str(ts), 'rt': str(received)})
+
+
+class PriceSnapshotCache:
+    # Двухуровневый кэш последней цены: локальный dict процесса с TTL и Redis-хэш tickers.
+    # Возраст цены считается по времени получения (rt), а не по ts биржи, чтобы расхождение часов
+    # с биржей не делало цены вечно свежими или вечно устаревшими; max_staleness одинаково работает
+    # для обоих уровней: запись старше max_staleness секунд считается промахом. ts задаёт только порядок цен
+    _local: dict[str, tuple[float, float, int, int]] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, redis:Redis, ttl:float=1.0, max_staleness:float=5.0):
+        self.redis = redis
+        self.ttl = ttl
+        self.max_staleness = max_staleness
+
+    def get(self, instId:str, max_staleness:float|None=None) -> float|None:
+        return self.get_many([instId], max_staleness).get(instId)
+
+    def get_many(self, instIds:Iterable[str], max_staleness:float|None=None) -> dict[str, float]:
+        # Промахи локального уровня читаются из Redis одним HMGET
+        staleness = self.max_staleness if max_staleness is None else max_staleness
+        if staleness <= 0:
+            return {}
+        limit = int((time.time() - staleness) * 1000)
+        now = time.monotonic()
+        prices: dict[str, float] = {}
+        missing: list[str] = []
+        for instId in dict.fromkeys(instIds):
+            cached = PriceSnapshotCache._local.get(instId)
+            if cached is not None and cached[0] > now and cached[3] >= limit:
+                prices[instId] = cached[1]
+            else:
+                missing.append(instId)
+        if not missing:
+            return prices
+        snapshots = {}
+        for instId, value in zip(missing, self.redis.hmget(TICKERS_KEY, missing)): #type: ignore
+            if value is not None:
+                snapshot = json.loads(value)
+                # Записи без rt (старый формат) стареют по ts биржи
+                snapshots[instId] = (float(snapshot['last']), int(snapshot['ts']), int(snapshot.get('rt', snapshot['ts'])))
+        self.__store(snapshots)
+        for instId in missing:
+            cached = PriceSnapshotCache._local.get(instId)
+            if cached is not None and cached[3] >= limit:
+                prices[instId] = cached[1]
+        return prices
+
+    def put_many(self, snapshots:dict[str, tuple[float, int]]) -> None:
+        # Цены, полученные через REST, попадают в оба уровня и становятся видны другим процессам
+        if not snapshots:
+            return
+        received = int(time.time() * 1000)
+        self.redis.hset(TICKERS_KEY, mapping={
+            instId: snapshot_json(price, ts, received) for instId, (price, ts) in snapshots.items()
+        })
+        self.__store({instId: (price, ts, received) for instId, (price, ts) in snapshots.items()})
+
+    def __store(self, snapshots:dict[str, tuple[float, int, int]]) -> None:
+        expires = time.monotonic() + self.ttl
+        with PriceSnapshotCache._lock:
+            for instId, (price, ts, received) in snapshots.items():
+                cached = PriceSnapshotCache._local.get(instId)
+                # Более старая цена из Redis не затирает свежую локальную, только продлевает её
+                PriceSnapshotCache._local[instId] = (expires, price, ts, received) if cached is None or ts >= cached[2] \
+                    else (expires, cached[1], cached[2], cached[3])
@@ -1,11 +1,23 @@
 import pickle
+import numpy as np
 import pandas as pd
+from datetime import datetime
 from typing import Any, Optional, Dict
 from redis import Redis
+from redis.client import PubSub
 from configs.provider import ConfigsProvider
 from api.data import OkxApiData
 from configs.utils import SecurePickle
 from indicators.data import PriceDataFrame
+from metrics.methods import registry, timed
+
+# Свеча в кольцевом буфере: ts в мс + OHLCV, фиксированная ширина 56 байт
+CANDLE_RECORD = np.dtype([
+    ('ts', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'),
+    ('close', '<f8'), ('volume', '<f8'), ('volume_usdt', '<f8')
+])
+CANDLES_MAXLEN = 5000
+
 
 class RedisCache(Redis): 
     def __init__(self, configs:OkxApiData):
@@ -14,10 +26,26 @@ class RedisCache(Redis):
         self.configs = configs
         super().__init__(host=cache.host, port=cache.port, db=cache.db)
         self.sp = SecurePickle()
+        self.__pubsub:PubSub|None = None
+
+    def execute_command(self, *args:Any, **options:Any) -> Any:
+        # Все команды (кроме конвейеров) проходят здесь: время каждого обращения к Redis
+        if not registry.enabled:
+            return super().execute_command(*args, **options)
+        with registry.span('redis_command', command=str(args[0])):
+            return super().execute_command(*args, **options)
+
+    def __get_pubsub(self) -> PubSub:
+        # Один PubSub на объект: подписки сохраняются между вызовами
+        if self.__pubsub is None:
+            self.__pubsub = self.pubsub()
+        return self.__pubsub
 
+    @timed('redis_cache')
     def add_data_to_cache(self, data:PriceDataFrame) -> None:
         self.set(f'df_{self.configs.instId}_{self.configs.timeframe}', pickle.dumps(data))
 
+    @timed('redis_cache')
     def load_data_from_cache(self) -> pd.DataFrame:
         if self.configs.instId is not None and self.configs.timeframe is not None:
             if data := self.get(f'df_{self.configs.instId}_{self.configs.timeframe}'):
@@ -25,9 +53,48 @@ class RedisCache(Redis):
             return pd.DataFrame()
         raise ValueError('timeframe or instId is not setted')
 
+    @timed('redis_cache')
+    def append_candles(self, data:PriceDataFrame, maxlen:int=CANDLES_MAXLEN) -> None:
+        # Sorted set со score = ts: добавление и обрезка O(log N) на свечу, без перезаписи истории
+        key = self.__candles_key()
+        records = np.empty(len(data), dtype=CANDLE_RECORD)
+        records['ts'] = self.__to_ms(pd.DatetimeIndex(data['date'] if 'date' in data.columns else data.index))
+        for name in CANDLE_RECORD.names[1:]:
+            records[name] = data[name].to_numpy(np.float64)
+        with self.pipeline(transaction=True) as pipe:
+            for record in records:
+                pipe.zremrangebyscore(key, int(record['ts']), int(record['ts']))
+            pipe.zadd(key, {record.tobytes(): int(record['ts']) for record in records})
+            pipe.zremrangebyrank(key, 0, -maxlen - 1)
+            pipe.execute()
+
+    @timed('redis_cache')
+    def load_last_candles(self, n:int) -> PriceDataFrame:
+        return self.__decode_candles(self.zrange(self.__candles_key(), -n, -1))
+
+    @timed('redis_cache')
+    def load_candles_since(self, since:datetime) -> PriceDataFrame:
+        start = int(self.__to_ms(pd.DatetimeIndex([since]))[0])
+        return self.__decode_candles(self.zrangebyscore(self.__candles_key(), f'({start}', '+inf'))
+
+    def __candles_key(self) -> str:
+        if self.configs.instId is not None and self.configs.timeframe is not None:
+            return f'candles_{self.configs.instId}_{self.configs.timeframe}'
+        raise ValueError('timeframe or instId is not setted')
+
+    def __to_ms(self, dates:pd.DatetimeIndex) -> np.ndarray:
+        return dates.as_unit('ms').asi8
+
+    def __decode_candles(self, members:list[bytes]) -> PriceDataFrame:
+        records = np.frombuffer(b''.join(members), dtype=CANDLE_RECORD)
+        dates = pd.to_datetime(records['ts'], unit='ms')
+        df = PriceDataFrame({'date': dates, **{name: records[name] for name in CANDLE_RECORD.names[1:]}})
+        df.index = dates
+        return df
+
     def subscribe_to_redis_channel(self) -> None:
         if self.configs.channel:
-            self.pubsub().subscribe(self.configs.channel)
+            self.__get_pubsub().subscribe(self.configs.channel)
             return
         raise ValueError('Channel not setted')
 
@@ -35,10 +102,10 @@ class RedisCache(Redis):
         for instId in self.user_settings.instIds:
             for timeframe in self.user_settings.timeframes:
                 channel = f'channel_{instId}_{timeframe}'
-                self.pubsub().subscribe(channel)
+                self.__get_pubsub().subscribe(channel)
 
     def check_redis_message(self) -> Optional[Dict[str, str]]:
-        message = self.pubsub().get_message()
+        message = self.__get_pubsub().get_message()
         if message and message['type'] == 'message':
             return self.sp.deserialize(message['data'])
         return None
@@ -46,11 +113,14 @@ class RedisCache(Redis):
     def send_redis_command(self, message: str, key: str) -> None:
         self.set(key, self.sp.serialize(message))
 
-    def publish_message(self, message: str) -> None:
+    @timed('redis_cache')
+    def publish_message(self, message: Any) -> None:
         if self.configs.channel:
-            self.publish(self.configs.channel, self.sp.deserialize(message)) # type: ignore
+            self.publish(self.configs.channel, self.sp.serialize(message))
+            return
         raise ValueError('Channel not setted') 
 
+    @timed('redis_cache')
     def load_message_from_cache(self) -> Optional[Any]:
         if self.configs.key is not None:
             value:bytes = self.get(self.configs.key) # type: ignore
@@ -1,9 +1,14 @@
+import asyncio
 import pandas as pd
+from datetime import datetime
 from typing import NoReturn
 from datasets.methods import PriceDbMethods
-from indicators.data import prepare_data_to_dataframe, create_dataframe, PriceDataFrame
+from datasets.archive import CandleArchive
+from indicators.data import parse_candles, PriceDataFrame
 from api.okx_api import OkxApi, OkxApiData
 from cache.redis_cache import RedisCache
+from cache.backfill import HistoryBackfill
+from cache.websocket_stream import WebSocketStream, CandleHandler
 
 class StreamData:
     def __init__(self, data: OkxApiData):
@@ -12,36 +17,49 @@ class StreamData:
         self.api = OkxApi(data)
         self.cache = RedisCache(data)
         self.db = PriceDbMethods()
+        self.archive = CandleArchive()
         self.data: OkxApiData = data
 
     def load_data(self, data: OkxApiData) -> pd.DataFrame:
-        pr_data = prepare_data_to_dataframe(self.api.get_market_data_history(data))
-        self.data.data = create_dataframe(pr_data)
+        self.data.data = parse_candles(self.api.get_market_data_history(data))
         if self.data.data is not None:
             self.__save(self.data.data)
-            self.cache.add_data_to_cache(PriceDataFrame(self.data.data))
+            self.cache.append_candles(PriceDataFrame(self.data.data))
             return self.data.data
         else:
             self.__error('Data is not set')
 
     def load_data_for_period(self, data: pd.DataFrame) -> pd.DataFrame:
         data = data.drop(data.index[:1])
-        pr_data = prepare_data_to_dataframe(self.api.get_market_data_history(data=self.data))
-        data_point = create_dataframe(pr_data)
+        data_point = parse_candles(self.api.get_market_data_history(data=self.data))
         if data_point is not None:
             self.__save(data_point)
+            self.cache.append_candles(data_point)
             return pd.concat([data, data_point], ignore_index=True)
         else:
             self.__error('Data point is not set')
 
+    def backfill(self, start: datetime, end: datetime|None = None, checkpoint_path: str = 'backfill_checkpoint.json') -> int:
+        instId:str = self.data.instId or self.__error('InstId is not set') #type: ignore
+        timeframe:str = self.data.timeframe or self.__error('Timeframe is not set') #type: ignore
+        backfill = HistoryBackfill([instId], [timeframe], start, end, checkpoint_path=checkpoint_path)
+        return asyncio.run(backfill.run())[f'{instId}_{timeframe}']
+
+    def stream(self, handler: CandleHandler|None = None) -> WebSocketStream:
+        # Замена опроса load_data_for_period: закрытые свечи приходят по WebSocket и сразу
+        # сохраняются в БД и Redis. Запуск - asyncio.run(stream.run())
+        instId:str = self.data.instId or self.__error('InstId is not set') #type: ignore
+        timeframe:str = self.data.timeframe or self.__error('Timeframe is not set') #type: ignore
+        stream = WebSocketStream([instId], [timeframe])
+        if handler is not None:
+            stream.register(handler)
+        return stream
+
     def __save(self, data: pd.DataFrame) -> None:
         instId:str = self.data.instId or self.__error('InstId is not set') #type: ignore
         timeframe:str = self.data.timeframe or self.__error('Timeframe is not set') #type: ignore
-        self.db.add_data(
-            instId=instId,
-            timeframe=timeframe,
-            data_list=self.db.dataframe_to_schema_list(PriceDataFrame(data), instId, timeframe)
-        )
+        self.db.add_data_bulk(instId=instId, timeframe=timeframe, df=PriceDataFrame(data))
+        self.archive.append(instId, timeframe, PriceDataFrame(data))
 
     def __error(self, message: str) -> NoReturn:
         raise ValueError(message)
@@ -0,0 +1,153 @@
+import asyncio, inspect, logging, time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Iterable
+from redis.asyncio import Redis
+from redis.asyncio.client import PubSub
+from configs.provider import ConfigsProvider
+from configs.utils import SecurePickle
+from cache.data import ChannelStats
+from metrics.methods import count
+
+
+logger = logging.getLogger(__name__)
+
+
+Handler = Callable[[str, list[Any]], Awaitable[None]|None]
+
+
+class RedisSubscriber:
+    # Долгоживущий подписчик: одно соединение на все каналы channel_{instId}_{timeframe}.
+    # Сообщения складываются в ограниченные очереди по каналам (полная очередь останавливает
+    # чтение из сокета), расшифровываются пачками в пуле потоков и передаются обработчикам
+    def __init__(self, channels:Iterable[str]|None=None, batch_size:int=100, batch_timeout:float=0.01,
+                 queue_size:int=10_000, decode_workers:int=2):
+        settings = ConfigsProvider()
+        cache = settings.load_cache_settings()
+        if channels is None:
+            user_settings = settings.load_user_settings()
+            channels = [
+                f'channel_{instId}_{timeframe}'
+                for instId in user_settings.instIds for timeframe in user_settings.timeframes
+            ]
+        self.channels = list(channels)
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout
+        self.redis = Redis(host=cache.host, port=cache.port, db=cache.db)
+        self.sp = SecurePickle()
+        self.handlers:dict[str, list[Handler]] = {channel: [] for channel in self.channels}
+        self.queues:dict[str, asyncio.Queue[tuple[float, bytes]]] = {
+            channel: asyncio.Queue(maxsize=queue_size) for channel in self.channels
+        }
+        self.__stats:dict[str, dict[str, float]] = {
+            channel: {'received': 0, 'dispatched': 0, 'batches': 0, 'errors': 0, 'last_lag': 0.0, 'max_lag': 0.0}
+            for channel in self.channels
+        }
+        self.__executor = ThreadPoolExecutor(max_workers=decode_workers, thread_name_prefix='redis-decode')
+        self.__tasks:list[asyncio.Task] = []
+        self.__pubsub:PubSub|None = None
+
+    def register(self, channel:str, handler:Handler) -> None:
+        if channel not in self.handlers:
+            raise ValueError(f'Channel {channel} is not subscribed')
+        self.handlers[channel].append(handler)
+
+    def handler(self, *channels:str) -> Callable[[Handler], Handler]:
+        def decorator(func:Handler) -> Handler:
+            for channel in channels or self.channels:
+                self.register(channel, func)
+            return func
+        return decorator
+
+    def stats(self) -> dict[str, ChannelStats]:
+        return {
+            channel: ChannelStats(
+                received = int(values['received']),
+                dispatched = int(values['dispatched']),
+                batches = int(values['batches']),
+                errors = int(values['errors']),
+                queued = self.queues[channel].qsize(),
+                last_lag = values['last_lag'],
+                max_lag = values['max_lag']
+            )
+            for channel, values in self.__stats.items()
+        }
+
+    async def start(self) -> None:
+        self.__pubsub = self.redis.pubsub()
+        await self.__pubsub.subscribe(*self.channels)
+        self.__tasks = [asyncio.create_task(self.__read(self.__pubsub))]
+        self.__tasks += [asyncio.create_task(self.__dispatch(channel)) for channel in self.channels]
+
+    async def run(self) -> None:
+        await self.start()
+        await asyncio.gather(*self.__tasks)
+
+    async def stop(self) -> None:
+        for task in self.__tasks:
+            task.cancel()
+        await asyncio.gather(*self.__tasks, return_exceptions=True)
+        self.__tasks = []
+        if self.__pubsub is not None:
+            await self.__pubsub.aclose()
+            self.__pubsub = None
+        await self.redis.aclose()
+        self.__executor.shutdown(wait=False)
+
+    async def __read(self, pubsub:PubSub) -> None:
+        async for message in pubsub.listen():
+            if message['type'] != 'message':
+                continue
+            channel = message['channel'].decode()
+            self.__stats[channel]['received'] += 1
+            await self.queues[channel].put((time.monotonic(), message['data']))
+
+    async def __dispatch(self, channel:str) -> None:
+        queue = self.queues[channel]
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.batch_timeout
+            while len(batch) < self.batch_size:
+                if queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    batch.append(queue.get_nowait())
+            messages, failures = await loop.run_in_executor(self.__executor, self.__decode, [data for _, data in batch])
+            lag = time.monotonic() - batch[0][0]
+            stats = self.__stats[channel]
+            stats['dispatched'] += len(messages)
+            stats['batches'] += 1
+            stats['errors'] += len(failures)
+            stats['last_lag'] = lag
+            stats['max_lag'] = max(stats['max_lag'], lag)
+            for error in failures:
+                # Битое сообщение (чужой ключ, повреждённые данные) отбрасывается, остальная пачка доставляется
+                count('redis_decode_errors', channel=channel)
+                logger.error('Failed to decode message from %s: %r', channel, error)
+            if not messages:
+                continue
+            for handler in self.handlers[channel]:
+                try:
+                    result = handler(channel, messages)
+                    if inspect.isawaitable(result):
+                        await result
+                except Exception:
+                    # Ошибка обработчика не должна останавливать доставку по каналу
+                    stats['errors'] += 1
+                    count('redis_handler_errors', channel=channel)
+                    logger.exception('Handler %r failed for %s', handler, channel)
+
+    def __decode(self, payloads:list[bytes]) -> tuple[list[Any], list[Exception]]:
+        messages, failures = [], []
+        for payload in payloads:
+            try:
+                messages.append(self.sp.deserialize(payload))
+            except Exception as e:
+                failures.append(e)
+        return messages, failures
@@ -0,0 +1,175 @@
+import asyncio, json, logging
+import aiohttp # type: ignore
+from typing import Any, Awaitable, Callable, Iterable
+from redis import Redis
+from api.data import OkxApiData
+from configs.provider import ConfigsProvider
+from datasets.archive import CandleArchive
+from datasets.methods import PriceDbMethods
+from indicators.data import parse_candles, PriceDataFrame
+from cache.redis_cache import RedisCache
+from cache.price_snapshot import TICKERS_KEY, snapshot_json
+from metrics.methods import count
+
+
+OKX_WS_PUBLIC = 'wss://ws.okx.com:8443/ws/v5/public'
+OKX_WS_BUSINESS = 'wss://ws.okx.com:8443/ws/v5/business'
+
+CandleHandler = Callable[[str, str, PriceDataFrame], Awaitable[None]|None]
+
+logger = logging.getLogger(__name__)
+
+
+class WebSocketStream:
+    # Подписка на каналы candle{timeframe} (business) и tickers (public) OKX для всех инструментов.
+    # Закрытые свечи (confirm=1) пишутся в БД и кольцевой буфер Redis, последние цены - в хэш tickers.
+    # При обрыве соединение восстанавливается с экспоненциальной задержкой и повторной подпиской.
+    # Ошибки разбора, сохранения и обработчиков логируются по сообщению и не рвут соединение;
+    # отсутствие ответа на ping за pong_timeout секунд считается обрывом
+    def __init__(self, instIds:Iterable[str]|None=None, timeframes:Iterable[str]|None=None,
+                 business_url:str=OKX_WS_BUSINESS, public_url:str=OKX_WS_PUBLIC, ping_interval:float=25.0,
+                 pong_timeout:float=10.0, reconnect_delay:float=1.0, max_reconnect_delay:float=30.0,
+                 save:bool=True):
+        if instIds is None or timeframes is None:
+            user_settings = ConfigsProvider().load_user_settings()
+            instIds = instIds or user_settings.instIds
+            timeframes = timeframes or user_settings.timeframes
+        self.instIds = list(instIds)
+        self.timeframes = list(timeframes)
+        self.business_url = business_url
+        self.public_url = public_url
+        self.ping_interval = ping_interval
+        self.pong_timeout = pong_timeout
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.save = save
+        self.handlers:list[CandleHandler] = []
+        self.reconnects = 0
+        self.__caches:dict[tuple[str, str], RedisCache] = {}
+        self.__db = PriceDbMethods() if save else None
+        self.__archive = CandleArchive() if save else None
+        self.__redis:Redis|None = None
+        self.__stop = asyncio.Event()
+
+    def register(self, handler:CandleHandler) -> None:
+        self.handlers.append(handler)
+
+    async def run(self) -> None:
+        self.__stop.clear()
+        candles = [{'channel': f'candle{timeframe}', 'instId': instId} for instId in self.instIds for timeframe in self.timeframes]
+        tickers = [{'channel': 'tickers', 'instId': instId} for instId in self.instIds]
+        async with aiohttp.ClientSession() as session:
+            await asyncio.gather(
+                self.__connection(session, self.business_url, candles),
+                self.__connection(session, self.public_url, tickers)
+            )
+
+    def stop(self) -> None:
+        self.__stop.set()
+
+    async def __connection(self, session:aiohttp.ClientSession, url:str, args:list[dict[str, str]]) -> None:
+        delay = self.reconnect_delay
+        while not self.__stop.is_set():
+            try:
+                async with session.ws_connect(url, heartbeat=None) as ws:
+                    await ws.send_json({'op': 'subscribe', 'args': args})
+                    delay = self.reconnect_delay
+                    await self.__read(ws)
+            except (aiohttp.ClientError, asyncio.TimeoutError, ConnectionError) as e:
+                logger.warning('WebSocket %s disconnected: %r', url, e)
+            except Exception:
+                logger.exception('WebSocket %s failed', url)
+            if self.__stop.is_set():
+                return
+            self.reconnects += 1
+            try:
+                await asyncio.wait_for(self.__stop.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def __read(self, ws:aiohttp.ClientWebSocketResponse) -> None:
+        # OKX закрывает соединение без трафика 30 секунд: при тишине отправляем ping
+        stop = asyncio.create_task(self.__stop.wait())
+        try:
+            while True:
+                receive = asyncio.create_task(ws.receive())
+                done, _ = await asyncio.wait({receive, stop}, timeout=self.ping_interval, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    await ws.send_str('ping')
+                    done, _ = await asyncio.wait({receive, stop}, timeout=self.pong_timeout, return_when=asyncio.FIRST_COMPLETED)
+                if stop in done:
+                    receive.cancel()
+                    await ws.close()
+                    return
+                if not done:
+                    # Полуоткрытый сокет: ни pong, ни данных - закрываем и переподключаемся
+                    receive.cancel()
+                    count('ws_pong_timeout')
+                    await ws.close()
+                    raise ConnectionError('WebSocket pong timeout')
+                message = receive.result()
+                if message.type != aiohttp.WSMsgType.TEXT:
+                    return
+                if message.data != 'pong':
+                    await self.__dispatch(message.data)
+        finally:
+            stop.cancel()
+
+    async def __dispatch(self, data:str) -> None:
+        try:
+            await self.__handle(json.loads(data))
+        except Exception:
+            count('ws_message_errors')
+            logger.exception('WebSocket message failed: %.200s', data)
+
+    async def __handle(self, message:dict[str, Any]) -> None:
+        if 'event' in message:
+            if message['event'] == 'error':
+                raise ValueError(f"Error, code: {message.get('code')}, {message.get('msg')}")
+            return
+        channel, instId = message['arg']['channel'], message['arg']['instId']
+        if channel == 'tickers':
+            await self.__on_ticker(message['data'])
+        elif channel.startswith('candle'):
+            closed = [row for row in message['data'] if row[8] == '1']
+            if closed:
+                await self.__on_candles(instId, channel.removeprefix('candle'), parse_candles({'data': closed}))
+
+    async def __on_candles(self, instId:str, timeframe:str, data:PriceDataFrame) -> None:
+        if self.save:
+            try:
+                await asyncio.to_thread(self.__save_candles, instId, timeframe, data)
+            except Exception:
+                count('ws_save_errors')
+                logger.exception('Failed to save candles %s %s', instId, timeframe)
+        # Сбой одного обработчика не мешает остальным и чтению сокета
+        for handler in self.handlers:
+            try:
+                result = handler(instId, timeframe, data)
+                if result is not None:
+                    await result
+            except Exception:
+                count('ws_handler_errors')
+                logger.exception('Candle handler %r failed for %s %s', handler, instId, timeframe)
+
+    def __save_candles(self, instId:str, timeframe:str, data:PriceDataFrame) -> None:
+        self.__db.add_data_bulk(instId=instId, timeframe=timeframe, df=data) #type: ignore
+        self.__archive.append(instId, timeframe, data) #type: ignore
+        self.__cache(instId, timeframe).append_candles(data)
+
+    async def __on_ticker(self, data:list[dict[str, str]]) -> None:
+        if self.save:
+            mapping = {item['instId']: snapshot_json(item['last'], item['ts']) for item in data}
+            await asyncio.to_thread(self.__redis_client().hset, TICKERS_KEY, mapping=mapping)
+
+    def __cache(self, instId:str, timeframe:str) -> RedisCache:
+        if (instId, timeframe) not in self.__caches:
+            self.__caches[(instId, timeframe)] = RedisCache(OkxApiData(instId=instId, timeframe=timeframe))
+        return self.__caches[(instId, timeframe)]
+
+    def __redis_client(self) -> Redis:
+        if self.__redis is None:
+            cache = ConfigsProvider().load_cache_settings()
+            self.__redis = Redis(host=cache.host, port=cache.port, db=cache.db)
+        return self.__redis
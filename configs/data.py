@@ -1,22 +1,33 @@
-from pydantic import BaseModel # type: ignore
+from pydantic import BaseModel, ConfigDict # type: ignore
+
 
 class SystemConfigs(BaseModel):
+    model_config = ConfigDict(frozen=True)
     db_uri: str
+    candle_layout: str = 'dynamic'
+    candle_partition: str|None = None
+    archive_path: str = 'archive'
+    price_cache_ttl: float = 1.0
+    price_max_staleness: float = 5.0
 
 class UserConfigs(BaseModel):
-    timeframes: tuple[str]
-    instIds: tuple[str]
+    model_config = ConfigDict(frozen=True)
+    timeframes: tuple[str, ...]
+    instIds: tuple[str, ...]
     leverage: int
     risk: float
     mgnMode: str
 
 class CacheConfigs(BaseModel):
-    host = str
-    port = int
-    db = int
-    celery_db = int
+    model_config = ConfigDict(frozen=True)
+    host: str
+    port: int
+    db: int
+    celery_db: int
+    celery_result_ttl: int = 3600
 
 class AvslConfigs(BaseModel):
+    model_config = ConfigDict(frozen=True)
     lengthsFast: int
     lengthsSlow: int
     lenT: int
@@ -24,35 +35,38 @@ class AvslConfigs(BaseModel):
     offset: int
 
 class RsiCloudsConfigs(BaseModel):
-    rsi_period = int
-    rsi_scalar = int
-    rsi_drift = int
-    rsi_offset = int
-    rsi_mamode = str
-    rsi_talib_config = bool
-    macd_fast = int
-    macd_slow = int
-    macd_signal = int
-    macd_offset = int
-    calc_data = str
-    macd_talib_config = bool
+    model_config = ConfigDict(frozen=True)
+    rsi_period: int
+    rsi_scalar: int
+    rsi_drift: int
+    rsi_offset: int
+    rsi_mamode: str
+    rsi_talib_config: bool
+    macd_fast: int
+    macd_slow: int
+    macd_signal: int
+    macd_offset: int
+    calc_data: str
+    macd_talib_config: bool
 
 
 class AdxConfigs(BaseModel):
-    timeperiod = int
-    lenghts_sig = int
-    adxr_lenghts = int|None
-    scalar = int
-    talib = bool
-    tvmode = bool
-    mamode = str
-    drift = int
-    offset = int
-    trigger = int
+    model_config = ConfigDict(frozen=True)
+    timeperiod: int
+    lenghts_sig: int
+    adxr_lenghts: int|None
+    scalar: int
+    talib: bool
+    tvmode: bool
+    mamode: str
+    drift: int
+    offset: int
+    trigger: int
 
 
 class OkxApiConfigs(BaseModel):
-    api_key = str
-    secret_key = str
-    passphrase = str
-    flag = bool
\ No newline at end of file
+    model_config = ConfigDict(frozen=True)
+    api_key: str
+    secret_key: str
+    passphrase: str
+    flag: bool
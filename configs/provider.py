@@ -1,89 +1,165 @@
-import os
-from dotenv import load_dotenv
+import os, threading, time
+from typing import Any, Callable, TypeVar
+from dotenv import dotenv_values
 from configs.data import UserConfigs, RsiCloudsConfigs, SystemConfigs,\
     AvslConfigs, OkxApiConfigs, CacheConfigs, AdxConfigs
 
 
+T = TypeVar('T')
+Env = dict[str, str|None]
+
+
 class ConfigsProvider:
-    def __check(self, key:str) -> str:
-        result = os.getenv(key)
+    # Настройки загружаются один раз на процесс и хранятся как неизменяемые снимки. Файл
+    # перечитывается только при смене mtime: проверка не чаще check_interval секунд или
+    # фоновым watcher-потоком, пока он запущен
+    check_interval = 1.0
+    _cache: dict[str, tuple[int, Any, Callable[[Env], Any]]] = {}
+    _checked: dict[str, float] = {}
+    _lock = threading.RLock()
+    _watcher: threading.Thread|None = None
+    _stop = threading.Event()
+
+    def __check(self, env:Env, key:str) -> str:
+        result = os.environ.get(key, env.get(key))
         if result is None:
             raise ValueError(f'Key {key} is not setted')
         return result
 
+    def __get(self, env:Env, key:str) -> str|None:
+        return os.environ.get(key, env.get(key)) or None
+
+    def __load(self, path:str, build:Callable[[Env], T]) -> T:
+        cls = ConfigsProvider
+        cached = cls._cache.get(path)
+        if cached is not None and (cls._watcher is not None or time.monotonic() - cls._checked[path] < cls.check_interval):
+            return cached[1]
+        with cls._lock:
+            cls._checked[path] = time.monotonic()
+            mtime = cls.__mtime(path)
+            cached = cls._cache.get(path)
+            if cached is None or cached[0] != mtime:
+                cached = cls._cache[path] = (mtime, build(dotenv_values(path)), build)
+            return cached[1]
+
+    @staticmethod
+    def __mtime(path:str) -> int:
+        try:
+            return os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return -1
+
+    @classmethod
+    def reload(cls) -> None:
+        with cls._lock:
+            cls._cache.clear()
+            cls._checked.clear()
+
+    @classmethod
+    def start_watcher(cls, interval:float=1.0) -> None:
+        with cls._lock:
+            if cls._watcher is not None:
+                return
+            cls._stop.clear()
+            cls._watcher = threading.Thread(target=cls.__watch, args=(interval,), name='configs-watcher', daemon=True)
+            cls._watcher.start()
+
+    @classmethod
+    def stop_watcher(cls) -> None:
+        cls._stop.set()
+        if cls._watcher is not None:
+            cls._watcher.join()
+            cls._watcher = None
+
+    @classmethod
+    def __watch(cls, interval:float) -> None:
+        while not cls._stop.wait(interval):
+            for path, (mtime, _, build) in list(cls._cache.items()):
+                if cls.__mtime(path) == mtime:
+                    continue
+                try:
+                    with cls._lock:
+                        current = cls.__mtime(path)
+                        cls._cache[path] = (current, build(dotenv_values(path)), build)
+                except Exception:
+                    # Файл мог быть прочитан в момент записи - остаётся прежний снимок
+                    continue
+
     def load_system_settings(self) -> SystemConfigs:
-        load_dotenv(dotenv_path='configs/system_configs.env')
-        return SystemConfigs(
-            db_uri=os.getenv('DB_URI')
-        )
+        return self.__load('configs/system_configs.env', lambda env: SystemConfigs(
+            db_uri=self.__check(env, 'DB_URI'),
+            candle_layout=self.__get(env, 'CANDLE_LAYOUT') or 'dynamic',
+            candle_partition=self.__get(env, 'CANDLE_PARTITION'),
+            archive_path=self.__get(env, 'ARCHIVE_PATH') or 'archive',
+            price_cache_ttl=float(self.__get(env, 'PRICE_CACHE_TTL') or 1.0),
+            price_max_staleness=float(self.__get(env, 'PRICE_MAX_STALENESS') or 5.0)
+        ))
 
     def load_user_settings(self) -> UserConfigs:
-        load_dotenv(dotenv_path='configs/configs_user.env')
-        return UserConfigs(
-            timeframe=tuple(self.__check('TIMEFRAMES').split(',')),
-            instIds = tuple(self.__check('INSTIDS').split(',')),
-            leverage = int(self.__check('LEVERAGE')),
-            risk = float(self.__check('RISK')),
-            mgnMode = str(self.__check('MGNMODE'))
-        )
+        return self.__load('configs/configs_user.env', lambda env: UserConfigs(
+            timeframes = tuple(self.__check(env, 'TIMEFRAMES').split(',')),
+            instIds = tuple(self.__check(env, 'INSTIDS').split(',')),
+            leverage = int(self.__check(env, 'LEVERAGE')),
+            risk = float(self.__check(env, 'RISK')),
+            mgnMode = str(self.__check(env, 'MGNMODE'))
+        ))
 
     def load_rsi_clouds_settings(self) -> RsiCloudsConfigs:
-        load_dotenv(dotenv_path='configs/configs_rsi_clouds.env')
-        return RsiCloudsConfigs(
-            rsi_period = int(self.__check('RSI_LENGHTS')),
-            rsi_scalar = int(self.__check('RSI_SCALAR')),
-            rsi_drift = int(self.__check('RSI_DRIFT')),
-            rsi_offset = int(self.__check('RSI_OFFSET')),
-            rsi_mamode = str(self.__check('MA_MODE')),
-            rsi_talib_config = bool(self.__check('RSI_TALIB_CONFIG')),
-            macd_fast = int(self.__check('MACD_FAST')),
-            macd_slow = int(self.__check('MACD_SLOW')),
-            macd_signal = int(self.__check('MACD_SIGNAL')),
-            macd_offset = int(self.__check('MACD_OFFSET')),
-            calc_data = str(self.__check('CALC_DATA')),
-            macd_talib_config = bool(self.__check('MACD_TALIB_CONFIG'))
-        )
+        return self.__load('configs/configs_rsi_clouds.env', lambda env: RsiCloudsConfigs(
+            rsi_period = int(self.__check(env, 'RSI_LENGHTS')),
+            rsi_scalar = int(self.__check(env, 'RSI_SCALAR')),
+            rsi_drift = int(self.__check(env, 'RSI_DRIFT')),
+            rsi_offset = int(self.__check(env, 'RSI_OFFSET')),
+            rsi_mamode = str(self.__check(env, 'MA_MODE')),
+            rsi_talib_config = bool(self.__check(env, 'RSI_TALIB_CONFIG')),
+            macd_fast = int(self.__check(env, 'MACD_FAST')),
+            macd_slow = int(self.__check(env, 'MACD_SLOW')),
+            macd_signal = int(self.__check(env, 'MACD_SIGNAL')),
+            macd_offset = int(self.__check(env, 'MACD_OFFSET')),
+            calc_data = str(self.__check(env, 'CALC_DATA')),
+            macd_talib_config = bool(self.__check(env, 'MACD_TALIB_CONFIG'))
+        ))
 
     def load_avsl_settings(self) -> AvslConfigs:
-        load_dotenv(dotenv_path='configs/configs_avsl.env')
-        return AvslConfigs(
-            lenghtsFast = int(self.__check('LENGHTS_FAST')),
-            lenghtsSlow = int(self.__check('LENGHTS_SLOW')),
-            lenT = int(self.__check('LEN_T')),
-            standDiv = float(self.__check('STAND_DIV')),
-            offset = int(self.__check('OFFSET'))
-        )
+        return self.__load('configs/configs_avsl.env', lambda env: AvslConfigs(
+            lengthsFast = int(self.__check(env, 'LENGHTS_FAST')),
+            lengthsSlow = int(self.__check(env, 'LENGHTS_SLOW')),
+            lenT = int(self.__check(env, 'LEN_T')),
+            standDiv = float(self.__check(env, 'STAND_DIV')),
+            offset = int(self.__check(env, 'OFFSET'))
+        ))
 
     def load_api_okx_configs(self) -> OkxApiConfigs:
-        load_dotenv(dotenv_path='configs/configs_api_okx.env')
-        return OkxApiConfigs(
-            flag = bool(self.__check('FLAG')),
-            api_key = self.__check('API_KEY'),
-            passphrase = self.__check('PASSPHRASE'),
-            secret_key = self.__check('SECRET_KEY'),
-        )
+        return self.__load('configs/configs_api_okx.env', lambda env: OkxApiConfigs(
+            flag = bool(self.__check(env, 'FLAG')),
+            api_key = self.__check(env, 'API_KEY'),
+            passphrase = self.__check(env, 'PASSPHRASE'),
+            secret_key = self.__check(env, 'SECRET_KEY'),
+        ))
 
     def load_cache_settings(self) -> CacheConfigs:
-        load_dotenv(dotenv_path='configs/configs_cache.env')
-        return CacheConfigs(
-            host = self.__check('HOST'),
-            port = int(self.__check('PORT')),
-            db = int(self.__check('DB')),
-            celery_db = int(self.__check('CELERY_DB'))
-        )
+        return self.__load('configs/configs_cache.env', lambda env: CacheConfigs(
+            host = self.__check(env, 'HOST'),
+            port = int(self.__check(env, 'PORT')),
+            db = int(self.__check(env, 'DB')),
+            celery_db = int(self.__check(env, 'CELERY_DB')),
+            celery_result_ttl = int(self.__get(env, 'CELERY_RESULT_TTL') or 3600)
+        ))
 
     def load_adx_configs(self) -> AdxConfigs:
-        load_dotenv(dotenv_path='configs/configs_adx.env')
-        value_adx = int(self.__check('ADXRLENGHTS'))
+        return self.__load('configs/configs_adx.env', self.__build_adx_configs)
+
+    def __build_adx_configs(self, env:Env) -> AdxConfigs:
+        value_adx = int(self.__check(env, 'ADXRLENGHTS'))
         return AdxConfigs(
-            timeperiod = int(self.__check('TIMEPERIOD')),
-            lenghts_sig = int(self.__check('LENGHTS_SIG')),
+            timeperiod = int(self.__check(env, 'TIMEPERIOD')),
+            lenghts_sig = int(self.__check(env, 'LENGHTS_SIG')),
             adxr_lenghts = None if value_adx == 0 else value_adx,
-            scalar = int(self.__check('SCALAR')),
-            talib = bool(self.__check('TALIB')),
-            tvmode = bool(self.__check('TVMODE')),
-            mamode = str(self.__check('MAMODE')),
-            drift = int(self.__check('DRIFT')),
-            offset = int(self.__check('OFFSET')),
-            trigger = int(self.__check('TRIGGER'))
-        )
\ No newline at end of file
+            scalar = int(self.__check(env, 'SCALAR')),
+            talib = bool(self.__check(env, 'TALIB')),
+            tvmode = bool(self.__check(env, 'TVMODE')),
+            mamode = str(self.__check(env, 'MAMODE')),
+            drift = int(self.__check(env, 'DRIFT')),
+            offset = int(self.__check(env, 'OFFSET')),
+            trigger = int(self.__check(env, 'TRIGGER'))
+        )
@@ -1,23 +1,47 @@
-import uuid, pickle, hmac, hashlib, base64
+import uuid, pickle, hmac, hashlib, base64, threading, time
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from cryptography.hazmat.primitives.hashes import SHA256
 from cryptography.hazmat.backends import default_backend
-from typing import Callable, Any, Tuple, Dict
-from celery import Celery # type: ignore
+from typing import Callable, Any, Iterable
+from celery import Celery, group # type: ignore
+from celery.exceptions import Retry # type: ignore
+from celery.result import AsyncResult # type: ignore
 from redis import Redis
 from configs.provider import ConfigsProvider
+from metrics.methods import timed
 
 
 class SecurePickle:
+    # Производные ключи и объекты Fernet общие для процесса: PBKDF2 выполняется один раз на секрет
+    _ciphers: dict[tuple[bytes, bytes], tuple[bytes, Fernet]] = {}
+    _lock = threading.Lock()
+
     def __init__(self):
         configs = ConfigsProvider().load_api_okx_configs()
-        self._secret_key = bytes(configs.secret_key)
         if configs.api_key is not None and configs.secret_key is not None and configs.flag is not None:
+            self._secret_key = configs.secret_key.encode()
             self.salt = f'{configs.api_key}{configs.secret_key}{configs.flag}'.encode()
         else:
             raise ValueError('All secrets must be setted')
-        self._key = self.__derive_key_from_password()
+        self._key, self._fernet = self.__get_cipher()
+
+    @classmethod
+    def rotate_keys(cls) -> None:
+        # Сбрасывает кэш ключей после смены секретов; новые экземпляры выведут ключи заново
+        with cls._lock:
+            cls._ciphers.clear()
+
+    def __get_cipher(self) -> tuple[bytes, Fernet]:
+        cache_key = (self._secret_key, self.salt)
+        cipher = SecurePickle._ciphers.get(cache_key)
+        if cipher is None:
+            with SecurePickle._lock:
+                cipher = SecurePickle._ciphers.get(cache_key)
+                if cipher is None:
+                    key = self.__derive_key_from_password()
+                    cipher = SecurePickle._ciphers[cache_key] = (key, Fernet(key))
+        return cipher
 
     def __sign_data(self, data: bytes, salt: bytes) -> bytes:
         signature = hmac.new(self._secret_key + salt, data, hashlib.sha256).digest()
@@ -42,29 +66,75 @@ class SecurePickle:
         )
         return base64.urlsafe_b64encode(kdf.derive(self._secret_key))
 
+    @timed('secure_pickle')
     def serialize(self, obj: Any) -> bytes:
         pickled_data = pickle.dumps(obj)
         salt = uuid.uuid4().bytes  # Генерируем уникальную соль для каждого объекта
         signed_data = self.__sign_data(pickled_data, salt)
-        fernet = Fernet(self._key)
-        encrypted_data = fernet.encrypt(signed_data)
+        encrypted_data = self._fernet.encrypt(signed_data)
         return encrypted_data
 
+    @timed('secure_pickle')
     def deserialize(self, encrypted_data: bytes) -> Any:
-        fernet = Fernet(self._key)
-        signed_data = fernet.decrypt(encrypted_data)
+        signed_data = self._fernet.decrypt(encrypted_data)
         pickled_data = self.__verify_data(signed_data)
         obj = pickle.loads(pickled_data)
         return obj
 
+class TaskBatch:
+    # Группа задач, разосланная CeleryUtil.fan_out: метка f'{instId}_{timeframe}' -> id задачи.
+    # Результаты забираются одним MGET на опрос; callback_id - id задачи-колбэка (chord)
+    def __init__(self, util:'CeleryUtil', batch_id:str, task_ids:dict[str, str], callback_id:str|None=None):
+        self.util = util
+        self.batch_id = batch_id
+        self.task_ids = task_ids
+        self.callback_id = callback_id
+
+    def ready(self) -> bool:
+        keys = [f'task:{task_id}' for task_id in self.task_ids.values()]
+        return not keys or self.util.redis_client.exists(*keys) == len(keys)
+
+    def results(self, timeout:float|None=None, interval:float=0.1, propagate:bool=True) -> dict[str, Any]:
+        # Ошибка задачи пробрасывается (propagate) или возвращается как объект исключения
+        values = self.util.wait_results(list(self.task_ids.values()), timeout, interval)
+        for value in values:
+            if propagate and isinstance(value, BaseException):
+                raise value
+        return dict(zip(self.task_ids, values))
+
+    def callback_result(self, timeout:float|None=None, interval:float=0.1) -> Any:
+        if self.callback_id is None:
+            raise ValueError('Batch has no callback')
+        value = self.util.wait_results([self.callback_id], timeout, interval)[0]
+        if isinstance(value, BaseException):
+            raise value
+        return value
+
+
 class CeleryUtil:
-    def __init__(self):
+    # Воркеру передаётся только имя зарегистрированной задачи и аргументы, функции не сериализуются.
+    # Задачи регистрируются декоратором CeleryUtil.register при импорте модуля - одинаково у клиента
+    # и у воркера. Результат хранится в task:{id} (SecurePickle) не дольше result_ttl секунд;
+    # id задачи Celery совпадает с этим id, так что AsyncResult.id подходит для get_result/wait_results
+    _registry: dict[str, Callable[..., Any]] = {}
+
+    def __init__(self, result_ttl:int|None=None):
         self.sp = SecurePickle()
         self.configs = ConfigsProvider().load_cache_settings()
+        self.result_ttl = result_ttl if result_ttl is not None else self.configs.celery_result_ttl
         self.app = self.__create_app()
         self.redis_client = self.__create_redis_client()
         self.__setup_tasks()
 
+    @classmethod
+    def register(cls, name:str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+        def decorator(func:Callable[..., Any]) -> Callable[..., Any]:
+            if cls._registry.get(name, func) is not func:
+                raise ValueError(f"Task {name} is already registered")
+            cls._registry[name] = func
+            return func
+        return decorator
+
     def __create_app(self) -> Celery:
         return Celery('tasks', broker=f'redis://{self.configs.host}:{self.configs.port}/{self.configs.celery_db}')
 
@@ -72,20 +142,131 @@ class CeleryUtil:
         return Redis(host=self.configs.host, port=self.configs.port, db=self.configs.celery_db)
 
     def __setup_tasks(self):
-        @self.app.task(name='tasks.process_task')
-        def __process_task(task_id: str, func_pickle: bytes, *args: Tuple[Any], **kwargs: Dict[str, Any]) -> Any:
-            if not self.redis_client.exists(f"task:{task_id}"):
-                func: Callable = self.sp.deserialize(func_pickle)
-                result: Any = func(*args, **kwargs)
-                result_pickle = self.sp.serialize(result)
-                self.redis_client.set(f"task:{task_id}", result_pickle)
-            result_data = self.redis_client.get(f"task:{task_id}")
-            if result_data is not None and isinstance(result_data, bytes):
-                return self.sp.deserialize(result_data)
-            return None
-        self.process_task = __process_task
-
-    def run_task(self, func: Callable[..., Any], *args: Tuple[Any], **kwargs: Dict[str, Any]) -> Any:
+        @self.app.task(name='tasks.run_named')
+        def __run_named(name:str, task_id:str, args:list[Any], kwargs:dict[str, Any], batch:dict[str, Any]|None=None) -> None:
+            # Группа отмечается только после окончательного результата: повтор (Retry) не сохраняется
+            # и не считается, повторная доставка уже завершённой задачи отмечает её идемпотентно
+            try:
+                if not self.redis_client.exists(f'task:{task_id}'):
+                    self.__store(task_id, self.__resolve(name)(*args, **kwargs))
+            except Retry:
+                raise
+            except Exception as e:
+                self.__store(task_id, e)
+                self.__complete(batch, task_id)
+                raise
+            self.__complete(batch, task_id)
+
+        @self.app.task(name='tasks.run_callback')
+        def __run_callback(name:str, task_id:str, task_ids:dict[str, str]) -> None:
+            try:
+                values = self.fetch_results(list(task_ids.values()))
+                failed = [label for label, value in zip(task_ids, values) if isinstance(value, BaseException)]
+                if failed:
+                    raise ValueError(f"Callback {name} skipped, failed tasks: {', '.join(failed)}")
+                self.__store(task_id, self.__resolve(name)(dict(zip(task_ids, values))))
+            except Exception as e:
+                self.__store(task_id, e)
+                raise
+
+        self.run_named = __run_named
+        self.run_callback = __run_callback
+
+    def __resolve(self, name:str) -> Callable[..., Any]:
+        if name not in CeleryUtil._registry:
+            raise ValueError(f"Task {name} is not registered")
+        return CeleryUtil._registry[name]
+
+    def __task_name(self, task:str|Callable[..., Any]) -> str:
+        if isinstance(task, str):
+            self.__resolve(task)
+            return task
+        for name, func in CeleryUtil._registry.items():
+            if func is task:
+                return name
+        raise ValueError(f"Task {getattr(task, '__name__', task)} is not registered")
+
+    def __store(self, task_id:str, value:Any) -> None:
+        self.redis_client.set(f'task:{task_id}', self.sp.serialize(value), ex=self.result_ttl)
+
+    def __complete(self, batch:dict[str, Any]|None, task_id:str) -> None:
+        # Множество завершённых задач группы: каждая учитывается один раз, колбэк запускает
+        # только та задача, чьё добавление закрыло группу
+        if batch is None:
+            return
+        key = f"batch:{batch['id']}"
+        with self.redis_client.pipeline() as pipe:
+            pipe.sadd(key, task_id)
+            pipe.expire(key, self.result_ttl)
+            pipe.scard(key)
+            added, _, done = pipe.execute()
+        if added and done == batch['total'] and batch.get('callback') is not None:
+            self.run_callback.apply_async(
+                (batch['callback'], batch['callback_id'], batch['task_ids']), task_id=batch['callback_id']
+            )
+
+    def run_task(self, task:str|Callable[..., Any], *args:Any, **kwargs:Any) -> AsyncResult:
         task_id = str(uuid.uuid4())
-        func_pickle = self.sp.serialize(func)
-        return self.process_task.delay(task_id, func_pickle, *args, **kwargs)
\ No newline at end of file
+        return self.run_named.apply_async((self.__task_name(task), task_id, list(args), kwargs), task_id=task_id)
+
+    def fan_out(self, task:str|Callable[..., Any], instIds:Iterable[str], timeframes:Iterable[str],
+                *args:Any, callback:str|Callable[..., Any]|None=None, **kwargs:Any) -> TaskBatch:
+        # Задача вызывается как task(instId, timeframe, *args, **kwargs) для каждой пары.
+        # callback (chord) получает dict метка -> результат после завершения всей группы
+        name = self.__task_name(task)
+        pairs = [(instId, timeframe) for instId in instIds for timeframe in timeframes]
+        task_ids = {f'{instId}_{timeframe}': str(uuid.uuid4()) for instId, timeframe in pairs}
+        batch_id = str(uuid.uuid4())
+        batch = None
+        callback_id = None
+        if callback is not None:
+            callback_id = str(uuid.uuid4())
+            batch = {
+                'id': batch_id, 'total': len(pairs), 'callback': self.__task_name(callback),
+                'callback_id': callback_id, 'task_ids': task_ids
+            }
+        group([
+            self.run_named.s(name, task_ids[f'{instId}_{timeframe}'], [instId, timeframe, *args], kwargs, batch)
+                .set(task_id=task_ids[f'{instId}_{timeframe}'])
+            for instId, timeframe in pairs
+        ]).apply_async()
+        return TaskBatch(self, batch_id, task_ids, callback_id)
+
+    def fetch_results(self, task_ids:list[str]) -> list[Any]:
+        # Один MGET на все ключи; None - результата ещё нет или он истёк
+        values = self.redis_client.mget([f'task:{task_id}' for task_id in task_ids]) if task_ids else []
+        return [self.sp.deserialize(value) if value is not None else None for value in values] #type: ignore
+
+    def wait_results(self, task_ids:list[str], timeout:float|None=None, interval:float=0.1) -> list[Any]:
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        keys = [f'task:{task_id}' for task_id in task_ids]
+        while keys and self.redis_client.exists(*keys) != len(keys):
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f'Results are not ready after {timeout} s')
+            time.sleep(interval)
+        return self.fetch_results(task_ids)
+
+    def get_result(self, task_id:str) -> Any:
+        return self.fetch_results([task_id])[0]
+
+
+@CeleryUtil.register('indicators')
+def _indicators_task(instId:str, timeframe:str, _type:str='close') -> dict[str, Any]:
+    # Импорт внутри задачи: datasets и indicators сами зависят от configs
+    from datasets.methods import PriceDbMethods
+    from indicators.panel import PricePanel, PanelIndicators
+    data = PriceDbMethods().get_marketdata_columnar(instId, timeframe)
+    return PanelIndicators(PricePanel.from_frames({instId: data})).evaluate(_type).loc[instId].to_dict()
+
+
+@CeleryUtil.register('backfill')
+def _backfill_task(instId:str, timeframe:str, start:str, end:str|None=None) -> int:
+    # Даты передаются ISO-строками: аргументы задач идут через JSON-сериализатор Celery
+    import asyncio
+    from datetime import datetime
+    from cache.backfill import HistoryBackfill
+    backfill = HistoryBackfill(
+        [instId], [timeframe], datetime.fromisoformat(start), datetime.fromisoformat(end) if end else None,
+        concurrency=1, checkpoint_path=f'backfill_checkpoint_{instId}_{timeframe}.json'
+    )
+    return asyncio.run(backfill.run())[f'{instId}_{timeframe}']
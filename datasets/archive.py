@@ -0,0 +1,131 @@
+import os, shutil
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from configs.provider import ConfigsProvider
+from indicators.data import PriceDataFrame
+
+
+ARCHIVE_COLUMNS = ('open', 'close', 'high', 'low', 'volume', 'volume_usdt')
+
+
+class CandleArchive:
+    # Архив свечей: на каждую пару instId/timeframe каталог с файлами колонок фиксированной ширины
+    # (timestamp - int64 миллисекунды в том же времени, что и в БД, цены - float64). Новые свечи
+    # дописываются в конец; более старые (бэкфилл) и заполняющие пропуски вливаются перезаписью пары.
+    # Файлы открываются через memmap, выборка по времени - бинарный поиск по timestamp без копирования
+    def __init__(self, path:str|None=None):
+        self.path = path or ConfigsProvider().load_system_settings().archive_path
+        self.__maps: dict[tuple[str, str], tuple[int, dict[str, np.ndarray]]] = {}
+
+    def append(self, instId:str, timeframe:str, df:PriceDataFrame) -> int:
+        # Возвращает число добавленных свечей; уже имеющиеся в архиве пропускаются
+        directory = self.__directory(instId, timeframe)
+        self.__recover(directory)
+        os.makedirs(directory, exist_ok=True)
+        dates = pd.DatetimeIndex(df['date'] if 'date' in df.columns else df.index)
+        timestamps = dates.as_unit('ms').asi8
+        order = np.argsort(timestamps, kind='stable')
+        timestamps = timestamps[order]
+        existing = self.columns(instId, timeframe)['timestamp']
+        last = int(existing[-1]) if len(existing) else np.iinfo(np.int64).min
+        self.__truncate(directory, len(existing))
+        keep = np.flatnonzero(np.diff(timestamps, append=np.iinfo(np.int64).max) != 0)
+        newer = timestamps[keep] > last
+        older = keep[~newer]
+        if older.size:
+            position = np.minimum(np.searchsorted(existing, timestamps[older]), len(existing) - 1)
+            missing = older[existing[position] != timestamps[older]]
+            if missing.size:
+                return self.__merge(instId, timeframe, df, order, timestamps, np.concatenate((missing, keep[newer])))
+        keep = keep[newer]
+        if not keep.size:
+            return 0
+        # Колонка timestamp пишется последней: длина архива - по самой короткой колонке,
+        # поэтому прерванная запись не даёт строк с неполными значениями
+        for name in ARCHIVE_COLUMNS:
+            with open(os.path.join(directory, f'{name}.f8'), 'ab') as file:
+                file.write(df[name].to_numpy(np.float64)[order][keep].tobytes())
+        with open(os.path.join(directory, 'timestamp.i8'), 'ab') as file:
+            file.write(timestamps[keep].astype(np.int64).tobytes())
+        return int(keep.size)
+
+    def columns(self, instId:str, timeframe:str) -> dict[str, np.ndarray]:
+        directory = self.__directory(instId, timeframe)
+        self.__recover(directory)
+        files = {'timestamp': 'timestamp.i8', **{name: f'{name}.f8' for name in ARCHIVE_COLUMNS}}
+        sizes = [self.__size(os.path.join(directory, file)) for file in files.values()]
+        length = min(sizes) // 8
+        cached = self.__maps.get((instId, timeframe))
+        if cached is not None and cached[0] == length:
+            return cached[1]
+        columns = {
+            name: np.memmap(os.path.join(directory, file), dtype=np.int64 if name == 'timestamp' else np.float64,
+                            mode='r', shape=(length,)) if length else
+                  np.empty(0, dtype=np.int64 if name == 'timestamp' else np.float64)
+            for name, file in files.items()
+        }
+        self.__maps[(instId, timeframe)] = (length, columns)
+        return columns
+
+    def read(self, instId:str, timeframe:str, _from:datetime|None=None, to:datetime|None=None) -> PriceDataFrame:
+        columns = self.columns(instId, timeframe)
+        timestamps = columns['timestamp']
+        start = np.searchsorted(timestamps, self.__to_ms(_from), 'left') if _from else 0
+        end = np.searchsorted(timestamps, self.__to_ms(to), 'right') if to else len(timestamps)
+        index = pd.DatetimeIndex(np.asarray(timestamps[start:end]).view('datetime64[ms]'), name='date', copy=False)
+        return PriceDataFrame(
+            {name: np.asarray(columns[name][start:end]) for name in ARCHIVE_COLUMNS},
+            index=index, copy=False
+        )
+
+    def __merge(self, instId:str, timeframe:str, df:PriceDataFrame, order:np.ndarray, timestamps:np.ndarray,
+                rows:np.ndarray) -> int:
+        # Архив пары собирается заново в соседнем каталог .new и подменяется переименованием:
+        # при сбое остаётся либо старая, либо новая версия целиком (см. __recover)
+        directory = self.__directory(instId, timeframe)
+        columns = self.columns(instId, timeframe)
+        merged = np.concatenate((columns['timestamp'], timestamps[rows]))
+        position = np.argsort(merged, kind='stable')
+        staging = f'{directory}.new'
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        for name in ARCHIVE_COLUMNS:
+            values = np.concatenate((columns[name], df[name].to_numpy(np.float64)[order][rows]))
+            values[position].tofile(os.path.join(staging, f'{name}.f8'))
+        merged[position].astype(np.int64).tofile(os.path.join(staging, 'timestamp.i8'))
+        self.__maps.pop((instId, timeframe), None)
+        del columns
+        os.replace(directory, f'{directory}.old')
+        os.replace(staging, directory)
+        shutil.rmtree(f'{directory}.old', ignore_errors=True)
+        return int(rows.size)
+
+    def __recover(self, directory:str) -> None:
+        # Прерванная перезапись: .new без основного каталога - готовая новая версия, иначе недописанная
+        staging = f'{directory}.new'
+        if os.path.isdir(staging):
+            if os.path.isdir(directory):
+                shutil.rmtree(staging)
+            else:
+                os.replace(staging, directory)
+        shutil.rmtree(f'{directory}.old', ignore_errors=True)
+
+    def __truncate(self, directory:str, length:int) -> None:
+        # Хвост прерванной записи отбрасывается, чтобы колонки оставались выровненными
+        for file in ('timestamp.i8', *(f'{name}.f8' for name in ARCHIVE_COLUMNS)):
+            path = os.path.join(directory, file)
+            if self.__size(path) > length * 8:
+                os.truncate(path, length * 8)
+
+    def __directory(self, instId:str, timeframe:str) -> str:
+        return os.path.join(self.path, f'{instId}_{timeframe}')
+
+    def __size(self, path:str) -> int:
+        try:
+            return os.path.getsize(path)
+        except FileNotFoundError:
+            return 0
+
+    def __to_ms(self, date:datetime) -> int:
+        return int(np.datetime64(date, 'ms').astype(np.int64))
@@ -1,5 +1,5 @@
 from datetime import datetime
-from pydantic import BaseModel #type: ignore
+from pydantic import BaseModel, ConfigDict #type: ignore
 
 class InstrumentTimeframeDataSchema(BaseModel):
     timestamp: datetime
@@ -11,39 +11,38 @@ class InstrumentTimeframeDataSchema(BaseModel):
     low: float 
     volume: float 
     volume_usdt: float
+    model_config = ConfigDict(from_attributes=True)
 
-    class Config: 
-        orm_mode = True
 
+class BulkInsertResult(BaseModel):
+    inserted: int
+    skipped: int
+    updated: int = 0
 
-class InstrumentTimeframeOrderData(BaseModel):
-    orderId = str
-    orderType = str
-    status = bool
-    orderVolume = int|float
-    tpOrderVolume = int|float
-    slOrderVolume = int|float
-    balance = int|float
-    instId = str
-    leverage = int
-    sideOfTrade = str
-    enterPrice = float|int
-    time = datetime
-    tpOrderId = str|int|None
-    tpPrice = float|int|None
-    slOrderId = str|int|None
-    slPrice = int|float|None
-    history_of_trade = dict|None
 
-    class Config:
-        orm_mode = True
+class InstrumentTimeframeOrderData(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    orderId: str
+    orderType: str
+    status: bool
+    orderVolume: int|float
+    tpOrderVolume: int|float
+    slOrderVolume: int|float
+    balance: int|float
+    instId: str
+    leverage: int
+    sideOfTrade: str
+    enterPrice: float|int|None = None
+    time: datetime
+    tpOrderId: str|int|None = None
+    tpPrice: float|int|None = None
+    slOrderId: str|int|None = None
+    slPrice: int|float|None = None
+    contractValue: float|None = None
+    history_of_trade: dict|None = None
 
 
-# TO DO 
 class HistoryTradeJSON(BaseModel):
-    key1: str
-    key2: int
-    key3: bool
-
-    class Config:
-        orm_mode = True
+    # errors: этап ордера (enterPrice, tpOrderId, slOrderId) -> текст ошибки биржи
+    model_config = ConfigDict(from_attributes=True, extra='forbid')
+    errors: dict[str, str]|None = None
@@ -1,13 +1,38 @@
+import numpy as np
+import pandas as pd
 from sqlalchemy.sql import exists
-from sqlalchemy import event
+from sqlalchemy import event, Table, Float, select, cast
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from datetime import datetime
-from typing import Any
-from datasets.models import  DynamicClassProvider, Orders, get_session
-from datasets.data import InstrumentTimeframeDataSchema, InstrumentTimeframeOrderData
+from typing import Any, Iterable, Iterator, Sequence
+from configs.provider import ConfigsProvider
+from datasets.models import  DynamicClassProvider, Orders, Candles, CANDLE_LAYOUTS, get_session,\
+    ensure_candle_partitions
+from datasets.data import InstrumentTimeframeDataSchema, InstrumentTimeframeOrderData, BulkInsertResult
 from indicators.data import PriceData, PriceDataFrame
 
 
+# Порядок колонок совпадает с PriceData (get_marketdata)
+PRICE_COLUMNS = ('open', 'high', 'low', 'close', 'volume', 'volume_usdt')
+
+
 class PriceDbMethods:
+    # layout: 'dynamic' - таблица на каждую пару instId/timeframe, 'consolidated' - общая таблица CANDLES.
+    # По умолчанию берётся CANDLE_LAYOUT из системных настроек
+    def __init__(self, layout:str|None=None):
+        self.layout = layout or ConfigsProvider().load_system_settings().candle_layout
+        if self.layout not in CANDLE_LAYOUTS:
+            raise ValueError(f"Invalid candle layout: {self.layout}")
+
+    def __table(self, instId:str, timeframe:str) -> tuple[Any, list[Any]]:
+        if self.layout == 'consolidated':
+            return Candles, [Candles.instrument == instId, Candles.timeframe == timeframe]
+        table_class = DynamicClassProvider().get_class(instId, timeframe)
+        if table_class is None:
+            raise ValueError(f"No table found for {instId} and {timeframe}")
+        return table_class, []
+
     def dataframe_to_schema_list(self, df: PriceDataFrame, instId: str, timeframe: str) -> list[InstrumentTimeframeDataSchema]:
         data_list = [] 
         for _, row in df.iterrows():
@@ -26,25 +51,88 @@ class PriceDbMethods:
         return data_list
 
     def add_data(self, instId:str, timeframe:str, data_list:list[InstrumentTimeframeDataSchema]) -> None:
-        table_class = DynamicClassProvider().get_class(instId, timeframe)
-        if table_class is None: 
-            raise ValueError(f"No table found for {instId} and {timeframe}")
+        table_class, _ = self.__table(instId, timeframe)
+        if table_class is Candles:
+            ensure_candle_partitions(data.timestamp for data in data_list)
         with get_session() as session:
             for data in data_list:
                 validated_data = data.model_dump()
                 record = table_class(**validated_data) 
                 session.add(record)
 
+    def add_data_bulk(self, instId:str, timeframe:str, df:PriceDataFrame, on_conflict:str='ignore') -> BulkInsertResult:
+        table_class, conditions = self.__table(instId, timeframe)
+        if on_conflict not in ('ignore', 'update'):
+            raise ValueError(f"Invalid on_conflict value: {on_conflict}")
+        rows = self.__dataframe_to_rows(df, instId, timeframe)
+        if table_class is Candles:
+            ensure_candle_partitions(row['timestamp'] for row in rows)
+        if not rows:
+            return BulkInsertResult(inserted=0, skipped=len(df))
+        with get_session() as session:
+            dialect = session.get_bind().dialect.name
+            # Один оператор на все строки (executemany): SQL компилируется один раз, а не на каждый чанк
+            stmt = self.__build_insert(table_class.__table__, dialect, rows[0], on_conflict)
+            if on_conflict == 'update':
+                # Upsert затрагивает каждую строку: обновлённые - те, чьи ключи уже были в таблице
+                updated = self.__count_existing(session, table_class, conditions, rows)
+                session.execute(stmt, rows)
+                inserted = len(rows) - updated
+            elif session.get_bind().dialect.supports_sane_multi_rowcount:
+                updated, inserted = 0, session.execute(stmt, rows).rowcount
+            else:
+                # psycopg2 не сообщает rowcount для executemany: вставленные строки считаются по RETURNING
+                updated, inserted = 0, len(session.execute(stmt.returning(table_class.__table__.c.timestamp), rows).all())
+        return BulkInsertResult(inserted=inserted, skipped=len(df) - inserted - updated, updated=updated)
+
+    def __count_existing(self, session:Any, table_class:Any, conditions:list[Any], rows:list[dict[str, Any]]) -> int:
+        # Ключи диапазона читаются одним запросом и сверяются на стороне Python
+        timestamps = [row['timestamp'] for row in rows]
+        query = select(table_class.timestamp).where(
+            *conditions, table_class.timestamp >= min(timestamps), table_class.timestamp <= max(timestamps)
+        )
+        return len(set(session.execute(query).scalars()).intersection(timestamps))
+
+    def __dataframe_to_rows(self, df:PriceDataFrame, instId:str, timeframe:str) -> list[dict[str, Any]]:
+        dates = pd.DatetimeIndex(df['date'] if 'date' in df.columns else df.index)
+        unique = ~dates.duplicated(keep='last')
+        columns = {
+            'timestamp': dates[unique].to_pydatetime().tolist(),
+            **{
+                name: df[name].to_numpy(np.float64)[unique].tolist()
+                for name in PRICE_COLUMNS
+            }
+        }
+        return [
+            {'instrument': instId, 'timeframe': timeframe, **dict(zip(columns, values))}
+            for values in zip(*columns.values())
+        ]
+
+    def __build_insert(self, table:Table, dialect:str, row:dict[str, Any], on_conflict:str) -> Any:
+        # Оператор без значений: строки передаются параметрами executemany
+        match dialect:
+            case 'postgresql':
+                stmt = pg_insert(table)
+            case 'sqlite':
+                stmt = sqlite_insert(table)
+            case _:
+                raise ValueError(f"Bulk insert is not supported for {dialect}")
+        keys = [column.name for column in table.primary_key] if table is Candles.__table__ else ['timestamp']
+        if on_conflict == 'update':
+            return stmt.on_conflict_do_update(
+                index_elements=keys,
+                set_={name: stmt.excluded[name] for name in row if name not in keys}
+            )
+        return stmt.on_conflict_do_nothing(index_elements=keys)
+
     def get_marketdata(self, instId:str, timeframe:str, _from:datetime|None=None, to:datetime|None=None) -> PriceDataFrame:
-        table_class = DynamicClassProvider().get_class(instId, timeframe)
-        if table_class is None:
-            raise ValueError(f"No table found for {instId} and {timeframe}")
+        table_class, conditions = self.__table(instId, timeframe)
         with get_session() as session:
             query = session.query(
                 table_class.timestamp, table_class.open, table_class.close,
                 table_class.high, table_class.low, table_class.volume,
                 table_class.volume_usdt
-            )
+            ).filter(*conditions)
             if _from:
                 query = query.filter(table_class.timestamp >= _from)
             if to:
@@ -64,8 +152,97 @@ class PriceDbMethods:
         df.set_index('date', inplace=True)
         return df
 
+    def get_marketdata_columnar(self, instId:str, timeframe:str, _from:datetime|None=None, to:datetime|None=None) -> PriceDataFrame:
+        chunks = list(self.iter_marketdata(instId, timeframe, _from, to))
+        if not chunks:
+            return self.__rows_to_dataframe([])
+        return chunks[0] if len(chunks) == 1 else PriceDataFrame(pd.concat(chunks))
+
+    def iter_marketdata(self, instId:str, timeframe:str, _from:datetime|None=None, to:datetime|None=None,
+                        chunk_size:int=100_000) -> Iterator[PriceDataFrame]:
+        table_class, conditions = self.__table(instId, timeframe)
+        # Приведение к Float на стороне БД, чтобы драйвер не создавал Decimal на каждое значение
+        query = select(
+            table_class.timestamp, *(cast(getattr(table_class, name), Float) for name in PRICE_COLUMNS)
+        ).where(*conditions)
+        if _from:
+            query = query.where(table_class.timestamp >= _from)
+        if to:
+            query = query.where(table_class.timestamp <= to)
+        query = query.order_by(table_class.timestamp).execution_options(yield_per=chunk_size)
+        # Запрос выполняется через Core-соединение: строки не проходят через загрузку ORM
+        with get_session() as session:
+            for rows in session.connection().execute(query).partitions():
+                yield self.__rows_to_dataframe(rows)
+
+    def get_timestamps(self, instId:str, timeframe:str, _from:datetime|None=None, to:datetime|None=None) -> np.ndarray:
+        table_class, conditions = self.__table(instId, timeframe)
+        query = select(table_class.timestamp).where(*conditions)
+        if _from:
+            query = query.where(table_class.timestamp >= _from)
+        if to:
+            query = query.where(table_class.timestamp <= to)
+        with get_session() as session:
+            result = session.execute(query.order_by(table_class.timestamp)).scalars().all()
+        return np.array(result, dtype='datetime64[ms]')
+
+    def get_marketdata_many(self, instIds:Iterable[str], timeframe:str, _from:datetime|None=None,
+                            to:datetime|None=None) -> dict[str, PriceDataFrame]:
+        # В общей таблице свечи всех инструментов читаются одним запросом
+        instIds = list(instIds)
+        if self.layout != 'consolidated':
+            return {instId: self.get_marketdata_columnar(instId, timeframe, _from, to) for instId in instIds}
+        query = select(
+            Candles.instrument, Candles.timestamp, *(cast(getattr(Candles, name), Float) for name in PRICE_COLUMNS)
+        ).where(Candles.timeframe == timeframe, Candles.instrument.in_(instIds))
+        if _from:
+            query = query.where(Candles.timestamp >= _from)
+        if to:
+            query = query.where(Candles.timestamp <= to)
+        with get_session() as session:
+            rows = session.connection().execute(query.order_by(Candles.instrument, Candles.timestamp)).all()
+        grouped: dict[str, list[Any]] = {instId: [] for instId in instIds}
+        for row in rows:
+            grouped[row[0]].append(row[1:])
+        return {instId: self.__rows_to_dataframe(items) for instId, items in grouped.items()}
+
+    def __rows_to_dataframe(self, rows:Sequence[Any]) -> PriceDataFrame:
+        # Строки чанка транспонируются один раз, каждый столбец собирается в отдельный непрерывный
+        # float64-массив; NULL становится NaN
+        count = len(rows)
+        columns = list(zip(*rows)) or [()] * (len(PRICE_COLUMNS) + 1)
+        index = pd.DatetimeIndex(columns[0], dtype='datetime64[ns]', name='date')
+        return PriceDataFrame(
+            {name: np.fromiter(values, dtype=np.float64, count=count) for name, values in zip(PRICE_COLUMNS, columns[1:])},
+            index=index
+        )
+
     def save_new_order_data(self, data:InstrumentTimeframeOrderData) -> None:
         with get_session() as session:
-            validated_data = data.model_dump()
-            record = Orders(**validated_data)
-            session.add(record)
\ No newline at end of file
+            session.add(Orders(**self.__order_columns(data)))
+
+    def __order_columns(self, data:InstrumentTimeframeOrderData) -> dict[str, Any]:
+        # Схема ордера (camelCase) -> колонки POSITIONS_AND_ORDERS; стоимость позиции известна
+        # только при известных цене входа и размере контракта
+        price = None if data.enterPrice is None or data.contractValue is None else data.contractValue * data.enterPrice
+        return {
+            'order_id': str(data.orderId),
+            'order_type': data.orderType,
+            'instrument': data.instId,
+            'side_of_trade': data.sideOfTrade,
+            'leverage': data.leverage,
+            'open_time': data.time,
+            'status': data.status,
+            'price_of_conrats': price,
+            'number_of_conrats': data.orderVolume,
+            'money_in_deal': None if price is None else price * data.orderVolume / data.leverage,
+            'enter_price': data.enterPrice,
+            'order_volume': data.orderVolume,
+            'takeprofit_price': data.tpPrice,
+            'takeprofit_order_id': None if data.tpOrderId is None else str(data.tpOrderId),
+            'takeprofit_order_volume': data.tpOrderVolume,
+            'stoploss_price': data.slPrice,
+            'stoploss_order_id': None if data.slOrderId is None else str(data.slOrderId),
+            'stoploss_order_volume': data.slOrderVolume,
+            'history_of_trade': data.history_of_trade
+        }
\ No newline at end of file
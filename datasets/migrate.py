@@ -0,0 +1,61 @@
+import sys
+from typing import Iterable
+from sqlalchemy import Float, cast, literal, select, text, true
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from configs.provider import ConfigsProvider
+from datasets.methods import PriceDbMethods, PRICE_COLUMNS
+from datasets.models import DynamicClassProvider, Candles, Orders, PARTITIONED, get_session, ensure_candle_partitions
+
+
+def migrate_to_consolidated(instIds:Iterable[str]|None=None, timeframes:Iterable[str]|None=None) -> dict[str, int]:
+    # Перенос динамических таблиц в CANDLES одним INSERT ... SELECT на таблицу, без выгрузки
+    # строк в Python. Уже перенесённые свечи пропускаются, поэтому команду можно повторять
+    user_settings = ConfigsProvider().load_user_settings()
+    legacy = PriceDbMethods(layout='dynamic')
+    report: dict[str, int] = {}
+    for instId in instIds or user_settings.instIds:
+        for timeframe in timeframes or user_settings.timeframes:
+            table_class = DynamicClassProvider().get_class(instId, timeframe)
+            if table_class is None:
+                raise ValueError(f"No table found for {instId} and {timeframe}")
+            if PARTITIONED:
+                ensure_candle_partitions(legacy.get_timestamps(instId, timeframe).astype(object))
+            source = select(
+                literal(instId), literal(timeframe), table_class.timestamp,
+                *(cast(getattr(table_class, name), Float) for name in PRICE_COLUMNS)
+            ).where(true())
+            columns = ['instrument', 'timeframe', 'timestamp', *PRICE_COLUMNS]
+            with get_session() as session:
+                match session.get_bind().dialect.name:
+                    case 'postgresql':
+                        stmt = pg_insert(Candles).from_select(columns, source)
+                    case 'sqlite':
+                        stmt = sqlite_insert(Candles).from_select(columns, source)
+                    case dialect:
+                        raise ValueError(f"Migration is not supported for {dialect}")
+                report[f'{instId}_{timeframe}'] = session.execute(stmt.on_conflict_do_nothing()).rowcount
+    return report
+
+
+def relax_order_constraints() -> list[str]:
+    # Колонки POSITIONS_AND_ORDERS, ставшие nullable (ордер сохраняется и без стопа / цены входа).
+    # create_all не меняет существующие таблицы; в SQLite ALTER COLUMN нет - таблицу нужно пересоздать
+    columns = ['price_of_conrats', 'stoploss_price', 'stoploss_order_id']
+    with get_session() as session:
+        dialect = session.get_bind().dialect.name
+        if dialect != 'postgresql':
+            raise ValueError(f"Migration is not supported for {dialect}")
+        for column in columns:
+            session.execute(text(f'ALTER TABLE "{Orders.__tablename__}" ALTER COLUMN {column} DROP NOT NULL'))
+    return columns
+
+
+if __name__ == '__main__':
+    # python -m datasets.migrate [instId,...] [timeframe,...] | python -m datasets.migrate orders
+    if sys.argv[1:2] == ['orders']:
+        print(f"Nullable: {', '.join(relax_order_constraints())}")
+        sys.exit(0)
+    args = [arg.split(',') for arg in sys.argv[1:3]]
+    for pair, count in migrate_to_consolidated(*args).items():
+        print(f'{pair}: {count} rows')
@@ -1,16 +1,17 @@
 import itertools
 from typing import Generator, Any
 from pydantic import ValidationError #type: ignore
-from sqlalchemy.orm.interfaces import Mapper
 from sqlalchemy.engine import Connection
-from sqlalchemy import create_engine, event, Table, Column, Integer, String,\
+from sqlalchemy import create_engine, event, text, Table, Column, Index, Integer, String,\
     DateTime, Numeric, Boolean, Float, BigInteger, JSON
-from sqlalchemy.orm import declarative_base, sessionmaker, Session as _Session
+from sqlalchemy.orm import declarative_base, sessionmaker, Mapper, Session as _Session
 from sqlalchemy.ext.declarative import DeclarativeMeta
 from sqlalchemy.pool import QueuePool
 from configs.provider import ConfigsProvider
 from contextlib import contextmanager
+from datetime import datetime
 from datasets.data import HistoryTradeJSON
+from metrics.methods import span, count
 
 
 configs = ConfigsProvider().load_system_settings()
@@ -35,7 +36,7 @@ class SingletonMeta(type):
 
 class BaseModel(Base):#type: ignore
     __abstract__ = True
-    pk = Column(BigInteger, autoincrement=True, primary_key=True)
+    pk = Column(BigInteger().with_variant(Integer, 'sqlite'), autoincrement=True, primary_key=True)
     timestamp = Column(DateTime, unique=True)
     instrument = Column(String) 
     timeframe = Column(String) 
@@ -71,9 +72,58 @@ class DynamicClassProvider(metaclass=SingletonMeta):
         return self.classes.get(class_name)
 
 
+CANDLE_LAYOUTS = ('dynamic', 'consolidated')
+if configs.candle_layout not in CANDLE_LAYOUTS:
+    raise ValueError(f"Invalid candle layout: {configs.candle_layout}")
+if configs.candle_partition not in (None, 'month'):
+    raise ValueError(f"Invalid candle partition: {configs.candle_partition}")
+PARTITIONED = configs.candle_partition == 'month' and engine.dialect.name == 'postgresql'
+
+
+class Candles(Base): #type: ignore
+    # Единая таблица свечей всех инструментов и таймфреймов. При CANDLE_PARTITION=month в PostgreSQL
+    # таблица секционируется по месяцам timestamp, секции создаёт ensure_candle_partitions
+    __tablename__ = 'CANDLES'
+    __table_args__ = (
+        Index('ix_candles_timestamp', 'timestamp'),
+        {'postgresql_partition_by': 'RANGE ("timestamp")'} if PARTITIONED else {}
+    )
+    instrument = Column(String, primary_key=True)
+    timeframe = Column(String, primary_key=True)
+    timestamp = Column(DateTime, primary_key=True)
+    open = Column(Float, nullable=False)
+    close = Column(Float, nullable=False)
+    high = Column(Float, nullable=False)
+    low = Column(Float, nullable=False)
+    volume = Column(Float, nullable=False)
+    volume_usdt = Column(Float, nullable=False)
+
+
+_partitions: set[tuple[int, int]] = set()
+
+
+def ensure_candle_partitions(dates:Any) -> None:
+    # Секции создаются в отдельной транзакции, чтобы откат вставки не удалял их
+    if not PARTITIONED:
+        return
+    months = sorted({(date.year, date.month) for date in dates} - _partitions)
+    if not months:
+        return
+    with engine.begin() as connection:
+        for year, month in months:
+            start = datetime(year, month, 1)
+            end = datetime(year + month // 12, month % 12 + 1, 1)
+            connection.execute(text(
+                f'CREATE TABLE IF NOT EXISTS "CANDLES_{year}_{month:02d}" PARTITION OF "CANDLES" '
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            ))
+    _partitions.update(months)
+
+
 class Orders(Base): #type: ignore
     __tablename__ = 'POSITIONS_AND_ORDERS'
-    pk = Column(BigInteger, autoincrement=True, primary_key=True)
+    # В SQLite автоинкремент есть только у INTEGER PRIMARY KEY
+    pk = Column(BigInteger().with_variant(Integer, 'sqlite'), autoincrement=True, primary_key=True)
     order_id = Column(String, nullable=False)
     order_type = Column(String, nullable=False)
     instrument = Column(String, nullable=False)
@@ -82,7 +132,7 @@ class Orders(Base): #type: ignore
     open_time = Column(DateTime, nullable=False)
     close_time = Column(DateTime, nullable=True)
     status = Column(Boolean, nullable=False)
-    price_of_conrats = Column(Float, nullable=False)
+    price_of_conrats = Column(Float, nullable=True)
     number_of_conrats = Column(Float, nullable=False)
     money_in_deal = Column(Float, nullable=True)
     enter_price = Column(Float, nullable=True)
@@ -90,8 +140,8 @@ class Orders(Base): #type: ignore
     takeprofit_price = Column(Float, nullable=True)
     takeprofit_order_id = Column(String, nullable=True)
     takeprofit_order_volume = Column(Float, nullable=True)
-    stoploss_price = Column(Float, nullable=False)
-    stoploss_order_id = Column(String, nullable=False)
+    stoploss_price = Column(Float, nullable=True)
+    stoploss_order_id = Column(String, nullable=True)
     stoploss_order_volume = Column(Float, nullable=False)
     risk_coefficient = Column(Float, nullable=True)
     close_price = Column(Float, nullable=True)
@@ -114,8 +164,10 @@ def get_session() -> Generator[_Session, None, None]:
     session:_Session = SessionLocal() 
     try: 
         yield session
-        session.commit()
+        with span('db_commit'):
+            session.commit()
     except Exception as e:
+        count('db_rollback')
         session.rollback()
         raise Exception from e
     finally:
@@ -0,0 +1,122 @@
+import asyncio
+import numpy as np
+import pandas as pd
+from typing import Iterable
+from api.data import TIMEFRAME_MS
+from configs.provider import ConfigsProvider
+from datasets.methods import PriceDbMethods
+from indicators.data import PriceDataFrame, TIME_OFFSET, CANDLE_COLUMNS
+
+
+# Таймфреймы по умолчанию для общей таблицы CANDLES и для расчёта без сохранения
+RESAMPLE_TIMEFRAMES = ('5m', '15m', '1H', '4H', '1D')
+# OKX открывает свечи от 6H и старше по гонконгскому времени (UTC+8), недельные - с понедельника
+HK_OFFSET_MS = 8 * 3_600_000
+WEEK_OFFSET_MS = 3 * 86_400_000
+
+
+def bucket_start(ts:int, timeframe:str) -> int:
+    step = TIMEFRAME_MS[timeframe]
+    anchor = 0
+    if step >= TIMEFRAME_MS['6H']:
+        anchor += HK_OFFSET_MS
+    if timeframe == '1W':
+        anchor += WEEK_OFFSET_MS
+    return (ts + anchor) // step * step - anchor
+
+
+class _Bucket:
+    __slots__ = ('start', 'open', 'high', 'low', 'close', 'volume', 'volume_usdt', 'last', 'complete')
+
+    def __init__(self, start:int, ts:int, row:tuple[float, ...]):
+        self.start = start
+        self.open, self.high, self.low, self.close, self.volume, self.volume_usdt = row
+        self.last = ts
+        # Свеча, начатая не с первой базовой свечи интервала, не сохраняется
+        self.complete = ts == start
+
+    def add(self, ts:int, row:tuple[float, ...]) -> None:
+        _, high, low, self.close, volume, volume_usdt = row
+        self.high = max(self.high, high)
+        self.low = min(self.low, low)
+        self.volume += volume
+        self.volume_usdt += volume_usdt
+        self.last = ts
+
+
+class TimeframeResampler:
+    # Строит свечи старших таймфреймов из закрытых базовых свечей: для каждого (instId, timeframe)
+    # хранится открытая свеча с накопленными open/high/low/close/volume. Свеча закрывается на
+    # последней базовой свече интервала (или на первой свече следующего) и пишется через
+    # PriceDbMethods.add_data_bulk, без дополнительных запросов к OKX.
+    # В раскладке dynamic таблицы есть только для TIMEFRAMES из настроек пользователя: по умолчанию
+    # строятся они, а таймфрейм без таблицы отклоняется сразу, а не на записи
+    def __init__(self, targets:Iterable[str]|None=None, base:str='1m', save:bool=True):
+        self.base = base
+        self.base_step = TIMEFRAME_MS[base]
+        self.db = PriceDbMethods() if save else None
+        stored = ConfigsProvider().load_user_settings().timeframes if self.__dynamic() else None
+        if targets is None:
+            targets = stored if stored is not None else RESAMPLE_TIMEFRAMES
+        self.targets = [timeframe for timeframe in targets if TIMEFRAME_MS[timeframe] > self.base_step]
+        for timeframe in self.targets:
+            if TIMEFRAME_MS[timeframe] % self.base_step:
+                raise ValueError(f"Timeframe {timeframe} is not a multiple of {base}")
+            if stored is not None and timeframe not in stored:
+                raise ValueError(f"No tables for timeframe {timeframe}: add it to TIMEFRAMES or use the consolidated layout")
+        self.buckets: dict[tuple[str, str], _Bucket] = {}
+
+    def update(self, instId:str, data:PriceDataFrame) -> dict[str, PriceDataFrame]:
+        dates = pd.DatetimeIndex(data['date'] if 'date' in data.columns else data.index)
+        order = np.argsort(dates.asi8, kind='stable')
+        timestamps = (dates.as_unit('ms').asi8[order] - self.__offset_ms()).tolist()
+        rows = list(zip(*(data[name].to_numpy(np.float64)[order].tolist() for name in CANDLE_COLUMNS)))
+        closed: dict[str, list[_Bucket]] = {timeframe: [] for timeframe in self.targets}
+        for ts, row in zip(timestamps, rows):
+            for timeframe in self.targets:
+                self.__add(instId, timeframe, ts, row, closed[timeframe])
+        result = {timeframe: self.__to_frame(buckets) for timeframe, buckets in closed.items() if buckets}
+        if self.db is not None:
+            for timeframe, df in result.items():
+                self.db.add_data_bulk(instId=instId, timeframe=timeframe, df=df)
+        return result
+
+    async def handle(self, instId:str, timeframe:str, data:PriceDataFrame) -> None:
+        # Обработчик WebSocketStream: старшие таймфреймы считаются только из базовых свечей
+        if timeframe == self.base:
+            await asyncio.to_thread(self.update, instId, data)
+
+    def __add(self, instId:str, timeframe:str, ts:int, row:tuple[float, ...], closed:list[_Bucket]) -> None:
+        key = (instId, timeframe)
+        start = bucket_start(ts, timeframe)
+        bucket = self.buckets.get(key)
+        if bucket is not None and ts <= bucket.last:
+            # Повтор уже учтённой свечи (например, после переподключения)
+            return
+        if bucket is not None and bucket.start != start:
+            if bucket.complete:
+                closed.append(bucket)
+            bucket = None
+        if bucket is None:
+            bucket = self.buckets[key] = _Bucket(start, ts, row)
+        else:
+            bucket.add(ts, row)
+        if ts + self.base_step == start + TIMEFRAME_MS[timeframe]:
+            if bucket.complete:
+                closed.append(bucket)
+            del self.buckets[key]
+
+    def __to_frame(self, buckets:list[_Bucket]) -> PriceDataFrame:
+        dates = pd.to_datetime([bucket.start for bucket in buckets], unit='ms') + TIME_OFFSET
+        df = PriceDataFrame({
+            'date': dates,
+            **{name: [getattr(bucket, name) for bucket in buckets] for name in CANDLE_COLUMNS}
+        })
+        df.index = dates
+        return df
+
+    def __dynamic(self) -> bool:
+        return self.db is not None and self.db.layout == 'dynamic'
+
+    def __offset_ms(self) -> int:
+        return int(TIME_OFFSET.total_seconds() * 1000)
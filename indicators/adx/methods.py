@@ -5,12 +5,14 @@ import pandas_ta as ta #type: ignore
 from typing import Any
 from configs.provider import ConfigsProvider
 from indicators.data import PriceDataFrame
+from metrics.methods import timed
 
 class ADXTrend:
     def __init__(self, data: PriceDataFrame):
         self.configs = ConfigsProvider().load_adx_configs()
         self.data = data
 
+    @timed('indicator')
     def calculate_adx(self) -> Any:
         self.adx = ta.adx(
             self.data.high, self.data.low, self.data.close, 
@@ -6,6 +6,35 @@ import pandas_ta as ta #type: ignore
 from indicators.data import PriceDataFrame
 from configs.provider import ConfigsProvider
 from configs.data import AvslConfigs
+from metrics.methods import timed
+
+
+def rolling_sum_variable(values: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    # Сумма окна переменной длины lengths[i], заканчивающегося на баре i, через префиксные суммы
+    # по оси времени (axis 0, поддерживаются и панели время x инструмент).
+    # Окно, выходящее за начало истории или содержащее NaN, даёт NaN
+    idx = np.arange(values.shape[0]).reshape(-1, *([1] * (values.ndim - 1)))
+    start = idx + 1 - lengths
+    start_c = np.clip(start, 0, None)
+    end = np.broadcast_to(idx + 1, values.shape)
+    valid = np.isfinite(values)
+    zeros = np.zeros((1,) + values.shape[1:])
+    csum = np.concatenate((zeros, np.cumsum(np.where(valid, values, 0.0), axis=0)))
+    cnan = np.concatenate((zeros, np.cumsum(~valid, axis=0)))
+    result = np.take_along_axis(csum, end, axis=0) - np.take_along_axis(csum, start_c, axis=0)
+    nans = np.take_along_axis(cnan, end, axis=0) - np.take_along_axis(cnan, start_c, axis=0)
+    return np.where((start < 0) | (nans > 0), np.nan, result)
+
+
+def avsl_price(low: np.ndarray, vpc: np.ndarray, vpr: np.ndarray, vpci: np.ndarray) -> np.ndarray:
+    with np.errstate(invalid='ignore', divide='ignore'):
+        lenV = np.where(
+            np.isnan(vpci), 0, np.where(vpc < 0, np.round(np.abs(vpci - 3)), np.round(vpci + 3))
+        ).astype(np.int64)
+        lenV = np.clip(lenV, 0, None)
+        VPCc = np.where((vpc > -1) & (vpc < 0), -1, np.where((vpc < 1) & (vpc >= 0), 1, vpc))
+        price = rolling_sum_variable(low / VPCc / vpr, lenV)
+        return np.where(lenV > 0, price / lenV / 100, low)
 
 
 class AVSLIndicator:
@@ -13,6 +42,7 @@ class AVSLIndicator:
         self.settings:AvslConfigs = ConfigsProvider().load_avsl_settings()
         self.data = data
 
+    @timed('indicator')
     def calculate_avsl(self, return_all:bool|None=None) -> pd.Series:
         vwma_f:pd.Series = ta.vwma(self.data.close, self.data.volume, length=self.settings.lengthsFast)
         vwma_s:pd.Series = ta.vwma(self.data.close, self.data.volume, length=self.settings.lengthsSlow)
@@ -31,20 +61,10 @@ class AVSLIndicator:
         return avsl if return_all else avsl.iloc[-1]
 
     def __price_fun(self, vpc: pd.Series, vpr: pd.Series, vpci: pd.Series) -> np.ndarray:
-        lenV = np.where(
-            np.isnan(vpci), 0, np.round(np.abs(vpci - 3)) * (vpc < 0) + np.round(vpci + 3) * (vpc >= 0)
-        ).astype(int)
-        VPCc = np.where(
-            (vpc > -1) & (vpc < 0), -1, np.where((vpc < 1) & (vpc >= 0), 1, vpc)
-        )
-        Price = np.where(
-            lenV > 0, np.sum(
-                np.divide(
-                    self.data['Low'].rolling(window=int(lenV)).apply(lambda x: np.sum(x / VPCc / vpr)), vpr
-                ), axis=1
-            ), self.data['Low']
+        return avsl_price(
+            self.data.low.to_numpy(np.float64), vpc.to_numpy(np.float64),
+            vpr.to_numpy(np.float64), vpci.to_numpy(np.float64)
         )
-        return np.where(lenV > 0, Price / lenV / 100, Price)
 
     def create_avsl_vizualization(self) -> None:
         avsl = self.calculate_avsl(True)
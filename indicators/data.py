@@ -1,6 +1,8 @@
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 from decimal import Decimal
+from typing import Any, Iterable
 from pydantic import BaseModel #type: ignore
 from datetime import datetime, timedelta
 
@@ -74,4 +76,34 @@ def create_dataframe(price_data:PriceData) -> pd.DataFrame:
     data_dict = price_data.model_dump(by_alias=True)
     df = PriceDataFrame(data_dict)
     df.set_index(df.date, inplace=True)
-    return df.sort_values(by='date', ascending=True)
\ No newline at end of file
+    return df.sort_index(ascending=True)
+
+
+# Сдвиг, с которым время свечей OKX (UTC) хранится в PriceDataFrame и БД
+TIME_OFFSET = timedelta(hours=3)
+# Колонка PriceDataFrame -> позиция поля в строке свечи OKX
+CANDLE_COLUMNS = {'open': 1, 'high': 2, 'low': 3, 'close': 4, 'volume': 6, 'volume_usdt': 7}
+
+
+def parse_candles(result: dict[str, Any]) -> PriceDataFrame:
+    return parse_candle_pages([result])
+
+
+def parse_candle_pages(results: Iterable[dict[str, Any]]) -> PriceDataFrame:
+    # Строки OKX: [ts, o, h, l, c, vol, volCcy, volCcyQuote, confirm], новые свечи первыми
+    columns = list(zip(*(item for result in results for item in result["data"])))
+    if not columns:
+        return PriceDataFrame({'date': pd.DatetimeIndex([]), **{name: np.empty(0) for name in CANDLE_COLUMNS}})
+    timestamps = np.array(columns[0], dtype=np.int64)
+    # При повторе свечи на стыке страниц остаётся последняя полученная версия
+    _, last = np.unique(timestamps[::-1], return_index=True)
+    order = timestamps.size - 1 - last
+    dates = pd.to_datetime(timestamps[order], unit='ms') + TIME_OFFSET
+    # float() по строкам заметно быстрее, чем разбор кортежа строк через np.array(..., dtype=float64)
+    df = PriceDataFrame({
+        'date': dates,
+        **{name: np.fromiter(map(float, columns[i]), np.float64, timestamps.size)[order]
+           for name, i in CANDLE_COLUMNS.items()}
+    })
+    df.index = dates
+    return df
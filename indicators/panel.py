@@ -0,0 +1,183 @@
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+from indicators.data import PriceDataFrame
+from indicators.avsl.methods import avsl_price
+from indicators.rsi_clouds.methods import select_source
+from configs.provider import ConfigsProvider
+from configs.data import AvslConfigs, RsiCloudsConfigs, AdxConfigs
+from metrics.methods import timed
+
+
+class PricePanel:
+    # Свечи многих инструментов, выровненные по времени: каждое поле - DataFrame время x instId
+    def __init__(self, open: pd.DataFrame, high: pd.DataFrame, low: pd.DataFrame,
+                 close: pd.DataFrame, volume: pd.DataFrame):
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+
+    @classmethod
+    def from_frames(cls, frames: dict[str, PriceDataFrame]) -> 'PricePanel':
+        fields = {
+            name: pd.DataFrame({instId: df[name].astype(np.float64) for instId, df in frames.items()}).sort_index()
+            for name in ('open', 'high', 'low', 'close', 'volume')
+        }
+        return cls(**fields)
+
+    @property
+    def start(self) -> np.ndarray:
+        # Первая строка с данными для каждого инструмента (инструменты могут начинаться в разное время)
+        return self.close.notna().to_numpy().argmax(axis=0)
+
+
+def _sma(data: pd.DataFrame, length: int) -> pd.DataFrame:
+    return data.rolling(length, min_periods=length).mean()
+
+
+def _rma(data: pd.DataFrame, length: int) -> pd.DataFrame:
+    # pandas_ta 0.4: ewm(alpha=1/length, adjust=False) без min_periods
+    return data.ewm(alpha=1 / length, adjust=False).mean()
+
+
+def _presma(data: pd.DataFrame, length: int, start: np.ndarray) -> pd.DataFrame:
+    # Затравка pandas_ta (presma) для каждого столбца так, будто его ряд начинается со строки start:
+    # строки до start + length - 1 обнуляются в NaN, на ней ставится среднее первых length значений
+    values = data.to_numpy(np.float64, copy=True)
+    rows = np.arange(values.shape[0])[:, None]
+    seed_row = start + length - 1
+    window = (rows >= start) & (rows <= seed_row) & ~np.isnan(values)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        seed = np.where(window, values, 0.0).sum(axis=0) / window.sum(axis=0)
+    values[rows < seed_row] = np.nan
+    in_range = seed_row < values.shape[0]
+    values[seed_row[in_range], np.flatnonzero(in_range)] = seed[in_range]
+    return pd.DataFrame(values, index=data.index, columns=data.columns)
+
+
+def _ema(data: pd.DataFrame, length: int, start: np.ndarray) -> pd.DataFrame:
+    # pandas_ta.ema (sma=True)
+    return _presma(data, length, start).ewm(span=length, adjust=False).mean()
+
+
+def _ma(mamode: str|None, data: pd.DataFrame, length: int, start: np.ndarray) -> pd.DataFrame:
+    match mamode:
+        case 'rma' | None:
+            return _rma(data, length)
+        case 'ema':
+            return _ema(data, length, start)
+        case 'sma':
+            return _sma(data, length)
+        case _:
+            raise ValueError(f"Unsupported mamode in panel mode: {mamode}")
+
+
+def _cross(fast: pd.DataFrame, slow: pd.DataFrame) -> pd.DataFrame:
+    up = (fast.shift(1) < slow.shift(1)) & (fast > slow)
+    down = (fast.shift(1) > slow.shift(1)) & (fast < slow)
+    return pd.DataFrame(np.where(up, 1, np.where(down, -1, 0)), index=fast.index, columns=fast.columns)
+
+
+def _first_valid(data: pd.DataFrame) -> np.ndarray:
+    valid = data.notna().to_numpy()
+    return np.where(valid.any(axis=0), valid.argmax(axis=0), data.shape[0])
+
+
+class PanelIndicators:
+    # Пакетный расчёт ADXTrend, AVSLIndicator и CloudsRsi для всех инструментов панели за один
+    # векторный проход по столбцам. Повторяет нативные расчёты pandas_ta (без talib); значения
+    # совпадают с расчётом по отдельным инструментам, если у каждого свечи идут без пропусков
+    def __init__(self, panel: PricePanel, rsi_configs: RsiCloudsConfigs|None = None,
+                 avsl_configs: AvslConfigs|None = None, adx_configs: AdxConfigs|None = None):
+        provider = ConfigsProvider()
+        self.rsi_configs: RsiCloudsConfigs = rsi_configs or provider.load_rsi_clouds_settings()
+        self.avsl_configs: AvslConfigs = avsl_configs or provider.load_avsl_settings()
+        self.adx_configs: AdxConfigs = adx_configs or provider.load_adx_configs()
+        self.panel = panel
+
+    def calculate_rsi_macd(self, _type: str) -> pd.Series:
+        configs = self.rsi_configs
+        panel = self.panel
+        start = panel.start
+        source = select_source(panel.open, panel.high, panel.low, panel.close, _type)
+        negative = source.diff(configs.rsi_drift)
+        positive = negative.clip(lower=0)
+        negative = negative.clip(upper=0)
+        positive_avg = _ma(configs.rsi_mamode, positive, configs.rsi_period, start)
+        negative_avg = _ma(configs.rsi_mamode, negative, configs.rsi_period, start)
+        self.rsi = configs.rsi_scalar * positive_avg / (positive_avg + negative_avg.abs())
+        if configs.rsi_offset:
+            self.rsi = self.rsi.shift(configs.rsi_offset)
+        fast, slow = sorted((configs.macd_fast, configs.macd_slow))
+        self.macd_line = _ema(self.rsi, fast, start) - _ema(self.rsi, slow, start)
+        self.macd_signal = _ema(self.macd_line, configs.macd_signal, _first_valid(self.macd_line))
+        self.macd_histogram = self.macd_line - self.macd_signal
+        if configs.macd_offset:
+            self.macd_line = self.macd_line.shift(configs.macd_offset)
+            self.macd_signal = self.macd_signal.shift(configs.macd_offset)
+            self.macd_histogram = self.macd_histogram.shift(configs.macd_offset)
+        self.macd_cross_signal = _cross(self.macd_line, self.macd_signal)
+        self.histogram_cross_zero = _cross(self.macd_histogram, pd.DataFrame(0.0, index=panel.close.index, columns=panel.close.columns))
+        return self.macd_cross_signal.replace(0, np.nan).ffill().iloc[-1]
+
+    def calculate_avsl(self) -> pd.Series:
+        configs = self.avsl_configs
+        close, low, volume = self.panel.close, self.panel.low, self.panel.volume
+        fast, slow = configs.lengthsFast, configs.lengthsSlow
+        vwma_f = _sma(close * volume, fast) / _sma(volume, fast)
+        vwma_s = _sma(close * volume, slow) / _sma(volume, slow)
+        vpc = vwma_s - _sma(close, slow)
+        vpr = vwma_f / _sma(close, fast)
+        vm = _sma(volume, fast) / _sma(volume, slow)
+        vpci = vpc * vpr * vm
+        price_v = avsl_price(low.to_numpy(), vpc.to_numpy(), vpr.to_numpy(), vpci.to_numpy())
+        dev = configs.standDiv * vpci * vm
+        self.avsl = _sma(low - price_v + dev, slow)
+        return self.avsl.ffill().iloc[-1]
+
+    def calculate_adx(self) -> pd.Series:
+        configs = self.adx_configs
+        high, low, close = self.panel.high, self.panel.low, self.panel.close
+        drift, scalar = configs.drift, configs.scalar
+        # ATR в pandas_ta.adx всегда rma с presma-затравкой по true range с drift 1 (первая строка NaN)
+        prev_close = close.shift(1)
+        true_range = np.fmax(np.fmax(high - low, (high - prev_close).abs()), (prev_close - low).abs())
+        true_range = true_range.where(prev_close.notna())
+        atr = _rma(_presma(true_range, configs.timeperiod, self.panel.start), configs.timeperiod)
+        up = high - high.shift(drift)
+        down = low.shift(drift) - low
+        positive = ((up > down) & (up > 0)) * up
+        negative = ((down > up) & (down > 0)) * down
+        k = scalar / atr
+        dmp = k * _ma(configs.mamode, positive.where(up.notna()), configs.timeperiod, self.panel.start)
+        dmn = k * _ma(configs.mamode, negative.where(up.notna()), configs.timeperiod, self.panel.start)
+        dx = scalar * (dmp - dmn).abs() / (dmp + dmn)
+        self.adx = _ma(configs.mamode, dx, configs.lenghts_sig, self.panel.start)
+        return self.adx.ffill().iloc[-1]
+
+    @timed('indicator', call='panel_evaluate')
+    def evaluate(self, _type: str) -> pd.DataFrame:
+        return pd.DataFrame({
+            'rsi_clouds': self.calculate_rsi_macd(_type),
+            'avsl': self.calculate_avsl(),
+            'adx': self.calculate_adx()
+        })
+
+
+def _evaluate_timeframe(frames: dict[str, PriceDataFrame], _type: str) -> pd.DataFrame:
+    return PanelIndicators(PricePanel.from_frames(frames)).evaluate(_type)
+
+
+def evaluate_universe(frames: dict[str, dict[str, PriceDataFrame]], _type: str,
+                      processes: int|None = None) -> dict[str, pd.DataFrame]:
+    # frames: timeframe -> instId -> свечи. При processes > 1 таймфреймы считаются в пуле процессов
+    if not processes or processes <= 1 or len(frames) <= 1:
+        return {timeframe: _evaluate_timeframe(data, _type) for timeframe, data in frames.items()}
+    with ProcessPoolExecutor(max_workers=min(processes, len(frames))) as pool:
+        futures: dict[str, Any] = {
+            timeframe: pool.submit(_evaluate_timeframe, data, _type) for timeframe, data in frames.items()
+        }
+        return {timeframe: future.result() for timeframe, future in futures.items()}
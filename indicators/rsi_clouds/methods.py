@@ -1,4 +1,5 @@
 import pandas as pd
+from collections import deque
 import numpy as np
 import matplotlib.pyplot as plt  # type: ignore
 from matplotlib.axes import Axes  # type: ignore
@@ -6,6 +7,24 @@ from typing import Any
 import pandas_ta as ta  # type: ignore
 from indicators.data import PriceDataFrame
 from configs.provider import ConfigsProvider
+from configs.data import RsiCloudsConfigs
+from metrics.methods import timed
+
+
+def select_source(_open: Any, high: Any, low: Any, close: Any, _type: str) -> Any:
+    match _type:
+        case 'open/close' | 'Open/Close' | 'OPEN/CLOSE' | 'o/c' | 'O/C':
+            return (_open + close) / 2
+        case 'high/low' | 'High/Low' | 'HIGH/LOW' | 'h/l' | 'H/L':
+            return (high + low) / 2
+        case 'open' | 'Open' | 'OPEN' | 'o' | 'O':
+            return _open
+        case 'close' | 'Close' | 'CLOSE' | 'c' | 'C':
+            return close
+        case 'high' | 'High' | 'HIGH' | 'h' | 'H':
+            return high
+        case _:
+            raise ValueError(f"Invalid _type value: {_type}")
 
 
 class CloudsRsi:
@@ -14,29 +33,21 @@ class CloudsRsi:
         self.data = self.__prepare_data(data, _type)
 
     def __prepare_data(self, data: PriceDataFrame, _type: str) -> pd.DataFrame:
-        match _type:
-            case 'open/close' | 'Open/Close' | 'OPEN/CLOSE' | 'o/c' | 'O/C':
-                return pd.DataFrame(data=((data.open + data.close) / 2).astype(np.float64), index=data.index)
-            case 'high/low' | 'High/Low' | 'HIGH/LOW' | 'h/l' | 'H/L':
-                return pd.DataFrame(data=((data.high + data.low) / 2).astype(np.float64), index=data.index)
-            case 'open' | 'Open' | 'OPEN' | 'o' | 'O':
-                return pd.DataFrame(data=data.open.astype(np.float64), index=data.index)
-            case 'close' | 'Close' | 'CLOSE' | 'c' | 'C':
-                return pd.DataFrame(data=data.close.astype(np.float64), index=data.index)
-            case 'high' | 'High' | 'HIGH' | 'h' | 'H':
-                return pd.DataFrame(data=data.high.astype(np.float64), index=data.index)
-            case _:
-                raise ValueError(f"Invalid _type value: {_type}")
+        return pd.DataFrame(
+            data=select_source(data.open, data.high, data.low, data.close, _type).astype(np.float64),
+            index=data.index
+        )
 
+    @timed('indicator')
     def calculate_rsi_macd(self) -> Any|None:
         self.rsi: pd.Series = ta.rsi(
-            close=self.data,
+            close=self.data.iloc[:, 0],
             length=self.configs.rsi_period,
             scalar=self.configs.rsi_scalar,
             mamode=self.configs.rsi_mamode,
             talib=self.configs.rsi_talib_config,
             drift=self.configs.rsi_drift,
-            offset=self.configs.rsi_drift
+            offset=self.configs.rsi_offset
         )
         macd: pd.DataFrame = ta.macd(
             close=self.rsi,
@@ -100,3 +111,183 @@ class CloudsRsi:
             ax.set_xlabel('Date')
         plt.tight_layout()
         plt.show()
+
+
+class _Ewm:
+    # Пошаговый аналог pandas ewm(...).mean() с учётом NaN, adjust и min_periods
+    def __init__(self, alpha: float, min_periods: int = 0, adjust: bool = False):
+        self.alpha = alpha
+        self.min_periods = max(min_periods, 1)
+        self.adjust = adjust
+        self.new_wt = 1.0 if adjust else alpha
+        self.weighted = np.nan
+        self.old_wt = 1.0
+        self.nobs = 0
+
+    def update(self, value: float) -> float:
+        is_observation = not np.isnan(value)
+        self.nobs += is_observation
+        if not np.isnan(self.weighted):
+            self.old_wt *= 1 - self.alpha
+            if is_observation:
+                if self.weighted != value:
+                    self.weighted = (self.old_wt * self.weighted + self.new_wt * value) / (self.old_wt + self.new_wt)
+                self.old_wt = self.old_wt + self.new_wt if self.adjust else 1.0
+        elif is_observation:
+            self.weighted = value
+        return self.weighted if self.nobs >= self.min_periods else np.nan
+
+
+class _Ema:
+    # Пошаговый аналог pandas_ta.ema: первое значение - SMA первых length баров (NaN пропускаются)
+    def __init__(self, length: int):
+        self.length = length
+        self.ewm = _Ewm(2 / (length + 1))
+        self.count = 0
+        self.seed_sum = 0.0
+        self.seed_n = 0
+
+    def update(self, value: float) -> float:
+        self.count += 1
+        if self.count < self.length:
+            if not np.isnan(value):
+                self.seed_sum += value
+                self.seed_n += 1
+            return self.ewm.update(np.nan)
+        if self.count == self.length:
+            if not np.isnan(value):
+                self.seed_sum += value
+                self.seed_n += 1
+            return self.ewm.update(self.seed_sum / self.seed_n if self.seed_n else np.nan)
+        return self.ewm.update(value)
+
+
+class _Sma:
+    def __init__(self, length: int):
+        self.window: deque[float] = deque(maxlen=length)
+
+    def update(self, value: float) -> float:
+        self.window.append(value)
+        if len(self.window) < self.window.maxlen: #type: ignore
+            return np.nan
+        return float(np.mean(self.window))
+
+
+class _Shift:
+    def __init__(self, offset: int):
+        if offset < 0:
+            raise ValueError('Negative offset is not supported in stream mode')
+        self.window: deque[float] = deque(maxlen=offset + 1)
+
+    def update(self, value: float) -> float:
+        self.window.append(value)
+        if len(self.window) < self.window.maxlen: #type: ignore
+            return np.nan
+        return self.window[0]
+
+
+class CloudsRsiStream:
+    # Инкрементальная версия CloudsRsi: O(1) на новую закрытую свечу, значения совпадают с
+    # calculate_rsi_macd (нативные расчёты pandas_ta, без talib)
+    def __init__(self, _type: str, configs: RsiCloudsConfigs|None = None):
+        self.configs = configs or ConfigsProvider().load_rsi_clouds_settings()
+        self._type = _type
+        self.reset()
+
+    def reset(self) -> None:
+        fast, slow = self.configs.macd_fast, self.configs.macd_slow
+        if slow < fast:
+            fast, slow = slow, fast
+        self.__prices: deque[float] = deque(maxlen=self.configs.rsi_drift + 1)
+        self.__positive = self.__create_ma()
+        self.__negative = self.__create_ma()
+        self.__rsi_shift = _Shift(self.configs.rsi_offset)
+        self.__fast = _Ema(fast)
+        self.__slow = _Ema(slow)
+        self.__signal = _Ema(self.configs.macd_signal)
+        self.__macd_started = False
+        self.__line_shift = _Shift(self.configs.macd_offset)
+        self.__signal_shift = _Shift(self.configs.macd_offset)
+        self.__histogram_shift = _Shift(self.configs.macd_offset)
+        self.rsi = np.nan
+        self.macd_line = np.nan
+        self.macd_signal = np.nan
+        self.macd_histogram = np.nan
+        self.macd_cross_signal = 0
+        self.histogram_cross_zero = 0
+        self.last_signal: Any|None = None
+
+    def __create_ma(self) -> _Ewm|_Ema|_Sma:
+        length = self.configs.rsi_period
+        match self.configs.rsi_mamode:
+            case 'rma' | None:
+                # pandas_ta 0.4: rma = ewm(alpha=1/length, adjust=False) без min_periods
+                return _Ewm(1 / length)
+            case 'ema':
+                return _Ema(length)
+            case 'sma':
+                return _Sma(length)
+            case _:
+                raise ValueError(f"Unsupported rsi_mamode in stream mode: {self.configs.rsi_mamode}")
+
+    def warm_up(self, data: PriceDataFrame) -> Any|None:
+        source = select_source(
+            data.open.to_numpy(np.float64), data.high.to_numpy(np.float64),
+            data.low.to_numpy(np.float64), data.close.to_numpy(np.float64), self._type
+        )
+        for price in source:
+            self.__update_price(float(price))
+        return self.last_signal
+
+    def update(self, candle: pd.Series|dict[str, float]) -> Any|None:
+        price = select_source(
+            float(candle['open']), float(candle['high']),
+            float(candle['low']), float(candle['close']), self._type
+        )
+        self.__update_price(price)
+        return self.last_signal
+
+    def __update_price(self, price: float) -> None:
+        self.__prices.append(price)
+        rsi = self.__calculate_rsi(price)
+        fast = self.__fast.update(rsi)
+        slow = self.__slow.update(rsi)
+        line = fast - slow
+        if not self.__macd_started and not np.isnan(line):
+            self.__macd_started = True
+        signal = self.__signal.update(line) if self.__macd_started else np.nan
+        self.__update_macd(
+            self.__line_shift.update(line),
+            self.__signal_shift.update(signal),
+            self.__histogram_shift.update(line - signal)
+        )
+
+    def __calculate_rsi(self, price: float) -> float:
+        if len(self.__prices) == self.__prices.maxlen:
+            change = price - self.__prices[0]
+            positive, negative = max(change, 0.0), min(change, 0.0)
+        else:
+            positive = negative = np.nan
+        positive_avg = self.__positive.update(positive)
+        negative_avg = self.__negative.update(negative)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi = self.configs.rsi_scalar * np.float64(positive_avg) / (positive_avg + abs(negative_avg))
+        self.rsi = self.__rsi_shift.update(float(rsi))
+        return self.rsi
+
+    def __update_macd(self, line: float, signal: float, histogram: float) -> None:
+        if self.macd_line < self.macd_signal and line > signal:
+            self.macd_cross_signal = 1
+        elif self.macd_line > self.macd_signal and line < signal:
+            self.macd_cross_signal = -1
+        else:
+            self.macd_cross_signal = 0
+        if self.macd_histogram < 0 and histogram > 0:
+            self.histogram_cross_zero = 1
+        elif self.macd_histogram > 0 and histogram < 0:
+            self.histogram_cross_zero = -1
+        else:
+            self.histogram_cross_zero = 0
+        if self.macd_cross_signal != 0:
+            self.last_signal = self.macd_cross_signal
+        self.macd_line, self.macd_signal, self.macd_histogram = line, signal, histogram
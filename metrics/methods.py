@@ -0,0 +1,187 @@
+import os, threading, time
+from bisect import bisect_left
+from functools import wraps
+from typing import Any, Callable, TypeVar
+
+
+F = TypeVar('F', bound=Callable[..., Any])
+Labels = tuple[tuple[str, str], ...]
+# Границы корзин гистограмм задержек, секунды: от 50 мкс до ~26 с с шагом x2
+LATENCY_BUCKETS = tuple(0.00005 * 2 ** i for i in range(20))
+
+
+def _escape(value:str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Histogram:
+    def __init__(self, buckets:tuple[float, ...]=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value:float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def quantile(self, q:float) -> float:
+        # Оценка по верхним границам корзин, как histogram_quantile без интерполяции
+        with self.lock:
+            counts, total = list(self.counts), self.count
+        if not total:
+            return float('nan')
+        rank, seen = q * total, 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, value:float=1.0) -> None:
+        with self.lock:
+            self.value += value
+
+
+class _Span:
+    __slots__ = ('registry', 'name', 'labels', 'start')
+
+    def __init__(self, registry:'MetricsRegistry', name:str, labels:Labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self) -> '_Span':
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type:Any, *exc_info:Any) -> None:
+        self.registry.histogram(f'{self.name}_seconds', self.labels).observe(time.perf_counter() - self.start)
+        if exc_type is not None:
+            self.registry.counter(f'{self.name}_errors_total', self.labels).inc()
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> '_NoopSpan':
+        return self
+
+    def __exit__(self, *exc_info:Any) -> None:
+        return None
+
+
+_NOOP = _NoopSpan()
+
+
+class MetricsRegistry:
+    # Гистограммы и счётчики в памяти процесса. Пока сбор выключен, span() отдаёт общий пустой
+    # контекст, а timed() сразу вызывает функцию - цена одной проверки флага
+    def __init__(self, enabled:bool=False):
+        self.enabled = enabled
+        self.histograms: dict[tuple[str, Labels], Histogram] = {}
+        self.counters: dict[tuple[str, Labels], Counter] = {}
+        self.lock = threading.Lock()
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def reset(self) -> None:
+        with self.lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    def histogram(self, name:str, labels:Labels=()) -> Histogram:
+        metric = self.histograms.get((name, labels))
+        if metric is None:
+            with self.lock:
+                metric = self.histograms.setdefault((name, labels), Histogram())
+        return metric
+
+    def counter(self, name:str, labels:Labels=()) -> Counter:
+        metric = self.counters.get((name, labels))
+        if metric is None:
+            with self.lock:
+                metric = self.counters.setdefault((name, labels), Counter())
+        return metric
+
+    def span(self, name:str, **labels:str) -> _Span|_NoopSpan:
+        if not self.enabled:
+            return _NOOP
+        return _Span(self, name, tuple(sorted(labels.items())))
+
+    def count(self, name:str, value:float=1.0, **labels:str) -> None:
+        if self.enabled:
+            self.counter(f'{name}_total', tuple(sorted(labels.items()))).inc(value)
+
+    def timed(self, name:str, **labels:str) -> Callable[[F], F]:
+        # Метка call - имя функции, если не задана явно
+        def decorator(func:F) -> F:
+            key = tuple(sorted({'call': func.__name__, **labels}.items()))
+            @wraps(func)
+            def wrapper(*args:Any, **kwargs:Any) -> Any:
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with _Span(self, name, key):
+                    return func(*args, **kwargs)
+            return wrapper #type: ignore
+        return decorator
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        return {
+            self.__series(name, labels): {
+                'count': metric.count, 'mean': metric.sum / metric.count if metric.count else float('nan'),
+                'p50': metric.quantile(0.5), 'p99': metric.quantile(0.99)
+            }
+            for (name, labels), metric in list(self.histograms.items())
+        }
+
+    def dump(self) -> str:
+        # Текстовый формат экспозиции Prometheus
+        lines: list[str] = []
+        typed: set[str] = set()
+        for (name, labels), histogram in sorted(self.histograms.items()):
+            if name not in typed:
+                lines.append(f'# TYPE {name} histogram')
+                typed.add(name)
+            with histogram.lock:
+                counts, total, count = list(histogram.counts), histogram.sum, histogram.count
+            cumulative = 0
+            for bound, value in zip(histogram.buckets + (float('inf'),), counts):
+                cumulative += value
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{self.__series(f"{name}_bucket", labels + (("le", le),))} {cumulative}')
+            lines.append(f'{self.__series(f"{name}_sum", labels)} {total}')
+            lines.append(f'{self.__series(f"{name}_count", labels)} {count}')
+        for (name, labels), counter in sorted(self.counters.items()):
+            if name not in typed:
+                lines.append(f'# TYPE {name} counter')
+                typed.add(name)
+            lines.append(f'{self.__series(name, labels)} {counter.value}')
+        return '\n'.join(lines) + '\n'
+
+    def __series(self, name:str, labels:Labels) -> str:
+        if not labels:
+            return name
+        rendered = ','.join(f'{key}="{_escape(str(value))}"' for key, value in labels)
+        return f'{name}{{{rendered}}}'
+
+
+# Общий реестр процесса; включается METRICS_ENABLED=1 или registry.enable()
+registry = MetricsRegistry(enabled=os.environ.get('METRICS_ENABLED', '') not in ('', '0', 'false', 'False'))
+span = registry.span
+timed = registry.timed
+count = registry.count
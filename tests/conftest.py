@@ -0,0 +1,10 @@
+import os, tempfile
+from benchmarks.suite import prepare_environment
+
+
+# Окружение задаётся до импорта тестовых модулей: движок БД создаётся при импорте datasets.models.
+# Настройки берутся из переменных окружения, .env файлы не нужны
+directory = prepare_environment(tempfile.mkdtemp(prefix='tests-'))
+os.environ.setdefault('ARCHIVE_PATH', os.path.join(directory, 'archive'))
+for key, value in {'HOST': 'localhost', 'PORT': '6379', 'DB': '0', 'CELERY_DB': '1'}.items():
+    os.environ.setdefault(key, value)
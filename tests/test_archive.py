@@ -0,0 +1,48 @@
+import os
+import numpy as np
+import pandas as pd
+from benchmarks.synthetic import generate_candles
+from datasets.archive import CandleArchive, ARCHIVE_COLUMNS
+
+
+INST_ID = 'BTC-USDT-SWAP'
+TIMEFRAME = '1m'
+
+
+def assert_archived(archive, expected):
+    data = archive.read(INST_ID, TIMEFRAME)
+    np.testing.assert_array_equal(data.index, expected.index)
+    for name in ARCHIVE_COLUMNS:
+        np.testing.assert_array_equal(data[name], expected[name].to_numpy(np.float64))
+
+
+def test_append_newer_and_merge_older(tmp_path):
+    archive = CandleArchive(str(tmp_path))
+    data = generate_candles(500)
+    assert archive.append(INST_ID, TIMEFRAME, data.iloc[300:400]) == 100
+    assert archive.append(INST_ID, TIMEFRAME, data.iloc[350:450]) == 50
+    assert archive.append(INST_ID, TIMEFRAME, data.iloc[350:450]) == 0
+    # Бэкфилл истории раньше начала архива и пропуск в середине вливаются перезаписью
+    gapped = data.iloc[100:250]
+    assert archive.append(INST_ID, TIMEFRAME, gapped.drop(gapped.index[50:60])) == 140
+    assert archive.append(INST_ID, TIMEFRAME, pd.concat([data.iloc[140:165], data.iloc[440:500]])) == 60
+    assert_archived(archive, pd.concat([data.iloc[100:250], data.iloc[300:500]]))
+    assert not os.path.exists(os.path.join(tmp_path, f'{INST_ID}_{TIMEFRAME}.new'))
+
+
+def test_interrupted_merge_is_recovered(tmp_path):
+    archive = CandleArchive(str(tmp_path))
+    data = generate_candles(200)
+    archive.append(INST_ID, TIMEFRAME, data.iloc[100:])
+    directory = os.path.join(tmp_path, f'{INST_ID}_{TIMEFRAME}')
+    # Сбой между переименованиями: старая версия уже в .old, полная новая - в .new
+    CandleArchive(str(tmp_path)).append(INST_ID, TIMEFRAME, data.iloc[:100])
+    os.replace(directory, f'{directory}.new')
+    os.makedirs(f'{directory}.old')
+    assert_archived(CandleArchive(str(tmp_path)), data)
+    assert not os.path.exists(f'{directory}.old')
+    # Сбой во время записи .new: основная версия остаётся, недописанная удаляется
+    os.makedirs(f'{directory}.new')
+    open(os.path.join(f'{directory}.new', 'open.f8'), 'wb').close()
+    assert_archived(CandleArchive(str(tmp_path)), data)
+    assert not os.path.exists(f'{directory}.new')
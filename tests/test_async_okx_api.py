@@ -0,0 +1,73 @@
+import asyncio
+import pytest
+from api.async_okx_api import AsyncOkxApi
+from api.data import OkxApiData, TIMEFRAME_MS
+from api.mock_server import OkxMockServer
+from api.throttle import OkxApiError
+from indicators.data import parse_candles
+
+
+def run(scenario):
+    async def main():
+        async with OkxMockServer() as server:
+            async with AsyncOkxApi(base_url=server.url) as api:
+                return await scenario(server, api)
+    return asyncio.run(main())
+
+
+def test_market_data():
+    async def scenario(server, api):
+        return server, await api.get_market_data(OkxApiData(instId='BTC-USDT-SWAP', timeframe='1m', lengths=50))
+    server, result = run(scenario)
+    rows = result['data']
+    assert len(rows) == 50
+    assert int(rows[0][0]) == server.now_ms // 60_000 * 60_000
+    assert [int(row[0]) for row in rows] == sorted((int(row[0]) for row in rows), reverse=True)
+    candles = parse_candles(result)
+    assert len(candles) == 50
+    assert candles.index.is_monotonic_increasing
+
+
+def test_history_pagination():
+    async def scenario(server, api):
+        first = await api.get_market_data_history(OkxApiData(instId='ETH-USDT-SWAP', timeframe='1H', lengths=100))
+        after = first['data'][-1][0]
+        second = await api.get_market_data_history(
+            OkxApiData(instId='ETH-USDT-SWAP', timeframe='1H', lengths=100, after=after)
+        )
+        return first, second
+    first, second = run(scenario)
+    assert int(second['data'][0][0]) == int(first['data'][-1][0]) - TIMEFRAME_MS['1H']
+
+
+def test_prices_and_balance():
+    instIds = ['BTC-USDT-SWAP', 'ETH-USDT-SWAP', 'SOL-USDT-SWAP']
+    async def scenario(server, api):
+        prices = await api.gather_instrument_prices(instIds)
+        return server, prices, await api.check_balance()
+    server, prices, balance = run(scenario)
+    assert prices == {instId: server.price(instId, server.now_ms) for instId in instIds}
+    assert balance == 1000.0
+
+
+def test_orders():
+    data = OkxApiData(instId='BTC-USDT-SWAP', posSide='long', size=3)
+    async def scenario(server, api):
+        order = await api.construct_market_order(data)
+        limit = await api.construct_limit_order(data, 95.5)
+        return server, order, limit, await api.check_position(data, order.orderId), await api.get_all_order_list()
+    server, order, limit, price, pending = run(scenario)
+    assert server.orders[order.orderId]['ordType'] == 'market'
+    assert server.orders[order.orderId]['side'] == 'sell'
+    assert server.orders[order.orderId]['sz'] == '3'
+    assert server.orders[limit.orderId]['px'] == '95.5'
+    assert price == server.price('BTC-USDT-SWAP', server.now_ms)
+    assert {item['ordId'] for item in pending['data']} == {order.orderId, limit.orderId}
+
+
+def test_error_code():
+    async def scenario(server, api):
+        return await api.check_position(OkxApiData(instId='BTC-USDT-SWAP'), 'missing')
+    with pytest.raises(OkxApiError) as error:
+        run(scenario)
+    assert error.value.code == '51603'
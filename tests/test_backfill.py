@@ -0,0 +1,40 @@
+import asyncio
+import numpy as np
+import pandas as pd
+from api.async_okx_api import AsyncOkxApi
+from api.mock_server import OkxMockServer
+from cache.backfill import HistoryBackfill
+from datasets.archive import CandleArchive
+from datasets.methods import PriceDbMethods
+from indicators.data import TIME_OFFSET
+
+
+INST_ID = 'BENCH-USDT-SWAP'
+TIMEFRAME = '1m'
+BARS = 250
+
+
+def test_backfill_writes_database_and_archive(tmp_path):
+    from datasets.models import DynamicClassProvider, get_session
+    with get_session() as session:
+        session.query(DynamicClassProvider().get_class(INST_ID, TIMEFRAME)).delete()
+    server = OkxMockServer()
+    end = pd.Timestamp(server.now_ms // 60_000 * 60_000, unit='ms') + TIME_OFFSET
+    start = end - pd.Timedelta(minutes=BARS - 1)
+
+    async def main():
+        async with server:
+            backfill = HistoryBackfill([INST_ID], [TIMEFRAME], start.to_pydatetime(), end.to_pydatetime(),
+                                       checkpoint_path=str(tmp_path / 'checkpoint.json'),
+                                       api=AsyncOkxApi(base_url=server.url))
+            backfill.archive = CandleArchive(str(tmp_path / 'archive'))
+            return backfill, await backfill.run()
+
+    backfill, counts = asyncio.run(main())
+    assert counts == {f'{INST_ID}_{TIMEFRAME}': BARS}
+    stored = PriceDbMethods().get_marketdata_columnar(INST_ID, TIMEFRAME)
+    archived = backfill.archive.read(INST_ID, TIMEFRAME)
+    assert len(archived) == BARS
+    np.testing.assert_array_equal(archived.index, stored.index)
+    for name in ('open', 'high', 'low', 'close', 'volume', 'volume_usdt'):
+        np.testing.assert_array_equal(archived[name], stored[name])
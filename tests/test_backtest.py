@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+from backtest.data import BacktestConfigs
+from backtest.methods import Backtester
+
+
+def backtester(bars, direction, stop):
+    data = pd.DataFrame(bars, columns=['open', 'high', 'low', 'close'],
+                        index=pd.date_range('2024-01-01', periods=len(bars), freq='1h'))
+    tester = Backtester(data, 'BTC-USDT-SWAP')
+    tester.set_signals(np.array(direction), np.array(stop, dtype=np.float64))
+    return tester
+
+
+def test_market_long_stopped_through_gap():
+    tester = backtester([
+        (100, 101, 99, 100),    # сигнал лонга, стоп 95
+        (100, 102, 99, 101),    # вход по open 100: риск 5, тейк 110, размер min(1000*0.01/5, 1000/100) = 2
+        (90, 92, 88, 89),       # гэп под стоп: исполнение по open 90, а не по 95
+        (89, 90, 88, 89)
+    ], [1, 0, 0, 0], [95, 0, 0, 0])
+    result = tester.run(BacktestConfigs())
+    trade = result.trades.iloc[0]
+    assert len(result.trades) == 1
+    assert trade['side_of_trade'] == 'long'
+    assert trade['enter_price'] == 100
+    assert trade['takeprofit_price'] == 110
+    assert trade['number_of_conrats'] == 2
+    assert trade['close_price'] == 90
+    assert trade['close_time'] == tester.index[2]
+    # Комиссии тейкера: 0.0005 * 100 * 2 + 0.0005 * 90 * 2
+    assert trade['fee'] == pytest.approx(0.19)
+    assert trade['money_income'] == pytest.approx(-20.19)
+    np.testing.assert_allclose(result.equity, [1000, 1001.9, 979.81, 979.81])
+    assert result.final_balance == pytest.approx(979.81)
+    assert result.win_rate == 0
+
+
+def test_limit_short_fill_and_takeprofit():
+    tester = backtester([
+        (100, 100.5, 99, 100),  # сигнал шорта, стоп 104, лимит по 100 * (1 + 0.01) = 101
+        (100, 100.5, 99, 100),  # лимит не задет
+        (100, 101.5, 99.5, 101),  # исполнение по 101: риск 3, тейк 95, размер 1000*0.01/3
+        (100, 100.5, 96, 97),
+        (96, 97, 94, 95)        # тейк 95 по цене тейка
+    ], [-1, 0, 0, 0, 0], [104, 0, 0, 0, 0])
+    result = tester.run(BacktestConfigs(order_type='limit', limit_offset=0.01))
+    trade = result.trades.iloc[0]
+    size = 10 / 3
+    assert len(result.trades) == 1
+    assert trade['side_of_trade'] == 'short'
+    assert trade['open_time'] == tester.index[2]
+    assert trade['enter_price'] == pytest.approx(101)
+    assert trade['takeprofit_price'] == pytest.approx(95)
+    assert trade['number_of_conrats'] == pytest.approx(size)
+    assert trade['close_price'] == pytest.approx(95)
+    assert trade['close_time'] == tester.index[4]
+    # Обе стороны по комиссии мейкера
+    fee = 0.0002 * (101 + 95) * size
+    assert trade['fee'] == pytest.approx(fee)
+    assert trade['money_income'] == pytest.approx(20 - fee)
+    np.testing.assert_allclose(result.equity, [
+        1000, 1000, 1000 - 0.0002 * 101 * size, 1000 - 0.0002 * 101 * size + 4 * size, 1000 + 20 - fee
+    ])
+    assert result.final_balance == pytest.approx(1000 + 20 - fee)
+    assert result.win_rate == 1
+
+
+def test_limit_expires_unfilled():
+    tester = backtester([(100, 100.5, 99, 100)] * 6, [-1, 0, 0, 0, 0, 0], [104] * 6)
+    result = tester.run(BacktestConfigs(order_type='limit', limit_offset=0.01))
+    assert result.trades.empty
+    assert result.final_balance == 1000
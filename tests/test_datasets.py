@@ -0,0 +1,48 @@
+import pandas as pd
+import pytest
+from benchmarks.synthetic import generate_candles
+from datasets.methods import PriceDbMethods
+
+
+INST_ID = 'BENCH-USDT-SWAP'
+TIMEFRAME = '1m'
+
+
+@pytest.fixture(params=['dynamic', 'consolidated'])
+def db(request):
+    from datasets.models import Candles, DynamicClassProvider, get_session
+    db = PriceDbMethods(layout=request.param)
+    table = Candles if request.param == 'consolidated' else DynamicClassProvider().get_class(INST_ID, TIMEFRAME)
+    with get_session() as session:
+        session.query(table).delete()
+    return db
+
+
+def test_add_data_bulk_counts(db):
+    data = generate_candles(300, seed=2)
+    first = db.add_data_bulk(INST_ID, TIMEFRAME, data.iloc[:200])
+    assert (first.inserted, first.updated, first.skipped) == (200, 0, 0)
+    ignored = db.add_data_bulk(INST_ID, TIMEFRAME, data.iloc[100:])
+    assert (ignored.inserted, ignored.updated, ignored.skipped) == (100, 0, 100)
+    upserted = db.add_data_bulk(INST_ID, TIMEFRAME, data, on_conflict='update')
+    assert (upserted.inserted, upserted.updated, upserted.skipped) == (0, 300, 0)
+    extended = generate_candles(350, seed=2)
+    report = db.add_data_bulk(INST_ID, TIMEFRAME, extended.iloc[250:], on_conflict='update')
+    assert (report.inserted, report.updated, report.skipped) == (50, 50, 0)
+    assert len(db.get_marketdata_columnar(INST_ID, TIMEFRAME)) == 350
+
+
+def test_columnar_matches_get_marketdata(db):
+    db.add_data_bulk(INST_ID, TIMEFRAME, generate_candles(250, seed=3))
+    expected = db.get_marketdata(INST_ID, TIMEFRAME)
+    columnar = db.get_marketdata_columnar(INST_ID, TIMEFRAME)
+    chunks = list(db.iter_marketdata(INST_ID, TIMEFRAME, chunk_size=100))
+    assert list(columnar.columns) == list(expected.columns)
+    assert [len(chunk) for chunk in chunks] == [100, 100, 50]
+    pd.testing.assert_frame_equal(columnar, expected.astype('float64'), check_freq=False)
+    assert all(columnar[name].to_numpy().flags['C_CONTIGUOUS'] for name in columnar.columns)
+    pd.testing.assert_frame_equal(pd.concat(chunks), columnar)
+    empty = db.get_marketdata_columnar(INST_ID, TIMEFRAME, _from=columnar.index[-1] + pd.Timedelta(minutes=1))
+    assert empty.empty and list(empty.columns) == list(expected.columns)
+    many = db.get_marketdata_many([INST_ID], TIMEFRAME)
+    pd.testing.assert_frame_equal(many[INST_ID], columnar)
@@ -0,0 +1,71 @@
+import timeit
+import numpy as np
+import pytest
+from benchmarks.synthetic import generate_candles, generate_okx_response
+from indicators.data import CANDLE_COLUMNS, parse_candles, prepare_data_to_dataframe, create_dataframe
+from indicators.panel import PricePanel, PanelIndicators
+from indicators.rsi_clouds.methods import CloudsRsi, CloudsRsiStream
+from indicators.avsl.methods import AVSLIndicator
+from indicators.adx.methods import ADXTrend
+
+
+BARS = 600
+
+
+@pytest.mark.parametrize('_type', ['close', 'h/l'])
+def test_stream_matches_batch(_type):
+    data = generate_candles(BARS, seed=1)
+    batch = CloudsRsi(data, _type)
+    last_signal = batch.calculate_rsi_macd()
+    stream = CloudsRsiStream(_type)
+    rsi, line, signal, cross = [], [], [], []
+    for _, candle in data.iterrows():
+        stream.update(candle)
+        rsi.append(stream.rsi)
+        line.append(stream.macd_line)
+        signal.append(stream.macd_signal)
+        cross.append(stream.macd_cross_signal)
+    np.testing.assert_allclose(rsi, batch.rsi, rtol=1e-9)
+    np.testing.assert_allclose(line, batch.macd_line, rtol=1e-9, atol=1e-12)
+    np.testing.assert_allclose(signal, batch.macd_signal, rtol=1e-9, atol=1e-12)
+    np.testing.assert_array_equal(cross, batch.macd_cross_signal)
+    assert stream.last_signal == last_signal
+    # Прогрев пачкой даёт то же состояние, что и пошаговые обновления
+    warmed = CloudsRsiStream(_type)
+    warmed.warm_up(data.iloc[:-1])
+    assert warmed.update(data.iloc[-1]) == last_signal
+    assert warmed.macd_line == pytest.approx(stream.macd_line, rel=1e-12)
+
+
+def test_panel_matches_single_instruments():
+    frames = {f'INST{seed}-USDT-SWAP': generate_candles(BARS, seed=seed) for seed in range(3)}
+    # У второго инструмента история короче: панель выравнивает его NaN в начале
+    frames['INST1-USDT-SWAP'] = frames['INST1-USDT-SWAP'].iloc[100:]
+    panel = PanelIndicators(PricePanel.from_frames(frames))
+    panel.calculate_rsi_macd('close')
+    panel.calculate_avsl()
+    panel.calculate_adx()
+    for instId, data in frames.items():
+        rsi = CloudsRsi(data, 'close')
+        rsi.calculate_rsi_macd()
+        np.testing.assert_allclose(panel.rsi[instId].loc[data.index], rsi.rsi, rtol=1e-9)
+        np.testing.assert_allclose(panel.macd_line[instId].loc[data.index], rsi.macd_line, rtol=1e-9, atol=1e-12)
+        np.testing.assert_allclose(panel.macd_signal[instId].loc[data.index], rsi.macd_signal, rtol=1e-9, atol=1e-12)
+        avsl = AVSLIndicator(data).calculate_avsl(return_all=True)
+        np.testing.assert_allclose(panel.avsl[instId].loc[data.index], avsl, rtol=1e-9)
+        adx = ADXTrend(data)
+        adx.calculate_adx()
+        expected = adx.adx[f'ADX_{adx.configs.timeperiod}']
+        np.testing.assert_allclose(panel.adx[instId].loc[data.index], expected, rtol=1e-9)
+
+
+def test_parse_candles_matches_and_beats_old_path():
+    response = generate_okx_response(20_000)
+    old = lambda: create_dataframe(prepare_data_to_dataframe(response))
+    new = lambda: parse_candles(response)
+    expected, parsed = old(), new()
+    np.testing.assert_array_equal(parsed.index, expected.index)
+    for name in CANDLE_COLUMNS:
+        np.testing.assert_array_equal(parsed[name], expected[name])
+    # Лучшее из нескольких замеров, чтобы шум машины не решал исход
+    assert min(timeit.repeat(new, number=1, repeat=5)) < min(timeit.repeat(old, number=1, repeat=5))
@@ -0,0 +1,75 @@
+import uuid
+import pytest
+from api.data import OkxApiData, OrderDataOutput
+from api.methods import FastPlaceOrders, OrderContext
+from api.throttle import OkxApiError
+from datasets.models import Orders, get_session
+
+
+INST_ID = 'BTC-USDT-SWAP'
+
+
+class OfflineOrders(FastPlaceOrders):
+    # Сетевые вызовы заменены ответами биржи; тейк-профит отклоняется, если задан reject_tp
+    reject_tp = False
+
+    def check_contract_price_cache(self, data):
+        return 0.01
+
+    def construct_market_order(self, posSide):
+        self.order_id = str(uuid.uuid4())
+        return OrderDataOutput(result={}, orderId=self.order_id, outTime='2024-01-01T00:00:00')
+
+    def check_position(self, orderId):
+        return 42000.5
+
+    def construct_takeprofit_order(self):
+        if self.reject_tp:
+            raise OkxApiError('51000', 'Parameter tpTriggerPx error')
+        return 'tp-1'
+
+    def construct_stoploss_order(self):
+        return 'sl-1'
+
+
+def place(reject_tp):
+    configs = OkxApiData(instId=INST_ID, posSide='long', tpPrice=43000.0, slPrice=41000.0)
+    context = OrderContext(None) #type: ignore
+    context.balance = 1000.0
+    context.leveraged.add(INST_ID)
+    orders = OfflineOrders(configs, context)
+    orders.reject_tp = reject_tp
+    return orders, configs
+
+
+def saved_order(orders):
+    orders.db_future.result()
+    with get_session() as session:
+        record, = session.query(Orders).filter(Orders.order_id == orders.order_id).all()
+        return {column.name: getattr(record, column.name) for column in Orders.__table__.columns}
+
+
+def test_market_order_is_saved():
+    orders, configs = place(reject_tp=False)
+    assert orders.place_market_order() == orders.order_id
+    record = saved_order(orders)
+    assert record['instrument'] == INST_ID and record['side_of_trade'] == 'long' and record['status']
+    assert record['enter_price'] == 42000.5
+    assert record['price_of_conrats'] == pytest.approx(0.01 * 42000.5)
+    assert record['number_of_conrats'] == record['order_volume'] == pytest.approx(configs.size)
+    assert (record['takeprofit_order_id'], record['stoploss_order_id']) == ('tp-1', 'sl-1')
+    assert (record['takeprofit_price'], record['stoploss_price']) == (43000.0, 41000.0)
+    assert record['history_of_trade'] is None
+
+
+def test_entry_is_saved_when_takeprofit_fails():
+    orders, configs = place(reject_tp=True)
+    with pytest.raises(OkxApiError) as error:
+        orders.place_market_order()
+    assert error.value.code == '51000'
+    record = saved_order(orders)
+    assert record['enter_price'] == 42000.5
+    assert record['takeprofit_order_id'] is None and record['stoploss_order_id'] == 'sl-1'
+    assert '51000' in record['history_of_trade']['errors']['tpOrderId']
+    # Размер позиции дробный и сохраняется без усечения
+    assert isinstance(configs.size, float) and record['order_volume'] == pytest.approx(configs.size)
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+from benchmarks.synthetic import generate_candles
+from datasets.resampler import TimeframeResampler
+from indicators.data import CANDLE_COLUMNS, TIME_OFFSET
+
+
+INST_ID = 'BENCH-USDT-SWAP'
+# Таймфрейм -> правило pandas; от 6H свечи OKX открываются по UTC+8
+RULES = {'5m': ('5min', '0h'), '15m': ('15min', '0h'), '1H': ('1h', '0h'), '4H': ('4h', '0h'),
+         '6H': ('6h', '-8h'), '1D': ('1D', '-8h')}
+AGGREGATE = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum', 'volume_usdt': 'sum'}
+
+
+def expected_candles(data, timeframe):
+    rule, offset = RULES[timeframe]
+    utc = data[list(CANDLE_COLUMNS)].set_axis(data.index - TIME_OFFSET)
+    resampled = utc.resample(rule, origin='epoch', offset=offset)
+    # Сохраняются только полные свечи: неполные на краях данных отбрасываются
+    full = resampled['close'].count() == pd.Timedelta(rule) // pd.Timedelta(minutes=1)
+    expected = resampled.agg(AGGREGATE)[full]
+    return expected.set_axis(expected.index + TIME_OFFSET)
+
+
+def test_buckets_match_pandas_resample():
+    data = generate_candles(3 * 1440 + 17, seed=4, start_ms=1_700_000_000_000 // 60_000 * 60_000)
+    resampler = TimeframeResampler(RULES, save=False)
+    # Стык обновлений с повтором уже учтённых свечей
+    first = resampler.update(INST_ID, data.iloc[:2000])
+    second = resampler.update(INST_ID, data.iloc[1990:])
+    for timeframe in RULES:
+        result = pd.concat([part[timeframe] for part in (first, second) if timeframe in part])
+        expected = expected_candles(data, timeframe)
+        assert len(expected) > 1
+        np.testing.assert_array_equal(result.index, expected.index)
+        np.testing.assert_array_equal(result['date'], expected.index)
+        for name in CANDLE_COLUMNS:
+            np.testing.assert_allclose(result[name], expected[name], rtol=1e-12)
+
+
+def test_dynamic_layout_targets_stored_timeframes():
+    # В тестовом окружении TIMEFRAMES=1m: старших таблиц нет, по умолчанию строить нечего
+    assert TimeframeResampler().targets == []
+    with pytest.raises(ValueError):
+        TimeframeResampler(['5m'])
+    assert TimeframeResampler(['5m'], save=False).targets == ['5m']
@@ -0,0 +1,39 @@
+import asyncio
+from cache.subscriber import RedisSubscriber
+
+
+CHANNEL = 'channel_BTC-USDT-SWAP_1m'
+
+
+def test_bad_messages_do_not_stop_dispatch():
+    received = []
+
+    async def main():
+        subscriber = RedisSubscriber([CHANNEL], batch_timeout=0.001)
+
+        def failing(channel, messages):
+            raise RuntimeError('handler failure')
+
+        subscriber.register(CHANNEL, failing)
+        subscriber.register(CHANNEL, lambda channel, messages: received.extend(messages))
+        queue = subscriber.queues[CHANNEL]
+        # Без подключения к Redis: сообщения кладутся прямо в очередь канала
+        for payload in [subscriber.sp.serialize(1), b'not a token', subscriber.sp.serialize(2)]:
+            queue.put_nowait((0.0, payload))
+        task = asyncio.create_task(subscriber._RedisSubscriber__dispatch(CHANNEL))
+        while len(received) < 2:
+            await asyncio.sleep(0.01)
+        queue.put_nowait((0.0, b'still broken'))
+        queue.put_nowait((0.0, subscriber.sp.serialize(3)))
+        while len(received) < 3:
+            await asyncio.sleep(0.01)
+            assert not task.done()
+        task.cancel()
+        await subscriber.stop()
+        return subscriber.stats()[CHANNEL]
+
+    stats = asyncio.run(asyncio.wait_for(main(), 5))
+    assert received == [1, 2, 3]
+    assert stats.dispatched == 3 and stats.queued == 0
+    # Два битых сообщения и по ошибке обработчика на каждую доставленную пачку
+    assert stats.errors == 2 + stats.batches
@@ -0,0 +1,77 @@
+import asyncio
+from aiohttp import web # type: ignore
+from api.mock_server import OkxMockServer, OkxWsReplayServer
+from cache.websocket_stream import WebSocketStream
+
+
+INST_ID = 'BTC-USDT-SWAP'
+CANDLES = 6
+
+
+def test_replay_survives_bad_frames_and_handler_errors():
+    frames = OkxWsReplayServer.candle_frames(OkxMockServer(), INST_ID, '1m', CANDLES)
+    # Битый кадр в середине потока: ошибка разбора логируется, соединение не рвётся
+    frames.insert(4, {'arg': {'channel': 'candle1m', 'instId': INST_ID}, 'data': [['broken']]})
+    received = []
+
+    async def main():
+        async with OkxWsReplayServer(frames, drop_after=5) as server:
+            stream = WebSocketStream([INST_ID], ['1m'], business_url=f'{server.url}/business',
+                                     public_url=f'{server.url}/public', reconnect_delay=0.01, save=False)
+
+            def failing(instId, timeframe, data):
+                raise RuntimeError('handler failure')
+
+            async def collect(instId, timeframe, data):
+                received.extend(data.index)
+                if len(received) == CANDLES:
+                    stream.stop()
+
+            stream.register(failing)
+            stream.register(collect)
+            await asyncio.wait_for(stream.run(), 5)
+            return stream, server
+
+    stream, server = asyncio.run(main())
+    assert len(received) == CANDLES
+    assert received == sorted(set(received))
+    # drop_after обрывает первое соединение business, клиент переподключается и подписывается заново
+    assert stream.reconnects >= 1
+    assert server.subscriptions.count({'channel': 'candle1m', 'instId': INST_ID}) == 2
+
+
+def test_missing_pong_reconnects():
+    connections = 0
+
+    async def silent(request):
+        # Сервер принимает соединение, но не отвечает ни на ping, ни на подписку
+        nonlocal connections
+        connections += 1
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        async for _ in ws:
+            pass
+        return ws
+
+    async def main():
+        app = web.Application()
+        app.router.add_get('/ws', silent)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        url = 'ws://127.0.0.1:%d/ws' % site._server.sockets[0].getsockname()[1]
+        stream = WebSocketStream([INST_ID], ['1m'], business_url=url, public_url=url, ping_interval=0.05,
+                                 pong_timeout=0.05, reconnect_delay=0.01, max_reconnect_delay=0.01, save=False)
+        task = asyncio.create_task(stream.run())
+        try:
+            while stream.reconnects < 4:
+                await asyncio.sleep(0.01)
+                assert not task.done()
+        finally:
+            stream.stop()
+            await asyncio.wait_for(task, 5)
+            await runner.cleanup()
+
+    asyncio.run(asyncio.wait_for(main(), 10))
+    assert connections >= 4